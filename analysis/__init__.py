@@ -0,0 +1,45 @@
+"""
+analysis  –  capacity / throughput / detection tables for the experiment logs
+
+    runs.py    sender_log.csv ⋈ receiver_log.csv: decode accuracy, end-to-end bps
+    stats.py   mean, 95 % CI and count for many groupings in one pass
+    ping.py    tpphase1 ping captures as RTT samples
+    cache.py   aggregated tables cached by input file hash
+    plot.py    the report figures
+
+run_tables() and ping_table() are the cached entry points; the tpphase
+report scripts and `python3 -m analysis` go through them.
+"""
+
+from .stats import aggregate, cells, summarize
+from .runs import CONFIG, load_log, join_runs, bit_accuracy
+from .ping import load_pings, ping_files
+from .cache import cached, file_hash
+
+RUN_VALUES = ["duration", "bps", "rx_bps", "e2e_s", "e2e_bps", "ok", "bit_acc", "retx", "rx_gaps"]
+
+def runs(sender: str, receiver: str = None):
+    """Per-run table: the sender log, joined with the receiver log if given."""
+    s = load_log(sender)
+    return join_runs(s, load_log(receiver)) if receiver else s
+
+def run_tables(sender: str, receiver: str = None, groupings=("nop_bits", "pps", "delay"),
+               conf: float = 0.95, refresh: bool = False) -> dict:
+    """{tuple(keys): table} of RUN_VALUES statistics, cached on the two logs."""
+    groupings = [g if isinstance(g, str) else list(g) for g in groupings]
+
+    def compute():
+        df = runs(sender, receiver)
+        return aggregate(df, groupings, [v for v in RUN_VALUES if v in df], conf)
+
+    return cached([p for p in (sender, receiver) if p],
+                  {"kind": "runs", "groupings": groupings, "conf": conf}, compute, refresh)
+
+def ping_table(directory: str, conf: float = 0.95, refresh: bool = False):
+    """RTT mean / CI / count per delay_ms over every ping reply."""
+    files = ping_files(directory)
+    if not files:
+        raise ValueError(f"no ping_<N>ms.txt files in {directory}")
+    return cached(files, {"kind": "ping", "conf": conf},
+                  lambda: aggregate(load_pings(directory), ["delay_ms"], ["rtt_ms"], conf)[("delay_ms",)],
+                  refresh)
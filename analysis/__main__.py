@@ -0,0 +1,68 @@
+"""
+python3 -m analysis  –  summary tables (and figures) from experiment logs
+
+Usage:
+    python3 -m analysis runs sender_log.csv receiver_log.csv            # by config, nop_bits, pps, delay
+    python3 -m analysis runs sender_log.csv receiver_log.csv --by pps --by nop_bits pps -o tables/
+    python3 -m analysis runs sender_log.csv --plot figs/                # sender side only
+    python3 -m analysis ping tpphase1_report/ping_data
+"""
+
+import os, sys, argparse
+import pandas as pd
+from . import CONFIG, run_tables, ping_table, plot
+
+def _name(keys) -> str:
+    return "_".join(keys)
+
+def main(argv=None):
+    ap  = argparse.ArgumentParser(prog="python3 -m analysis", description="Experiment log tables")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    r = sub.add_parser("runs", help="sender (+ receiver) log statistics per configuration")
+    r.add_argument("sender")
+    r.add_argument("receiver", nargs="?")
+    r.add_argument("--by", action="append", nargs="+", metavar="KEY",
+                   help="one grouping (repeatable); default: the full config, then "
+                        "nop_bits, pps and delay alone")
+    p = sub.add_parser("ping", help="RTT per mean delay from tpphase1 ping captures")
+    p.add_argument("directory")
+    for s in (r, p):
+        s.add_argument("--conf", type=float, default=0.95)
+        s.add_argument("-o", "--out", default="", help="write one CSV per table into this directory")
+        s.add_argument("--plot", default="", help="write the figures into this directory")
+        s.add_argument("--refresh", action="store_true", help="ignore cached tables")
+    args = ap.parse_args(argv)
+
+    if args.out:
+        os.makedirs(args.out, exist_ok=True)
+    if args.plot:
+        os.makedirs(args.plot, exist_ok=True)
+    pd.set_option("display.width", 200)
+
+    if args.cmd == "ping":
+        t = ping_table(args.directory, args.conf, args.refresh)
+        print(t.to_string(index=False))
+        if args.out:
+            t.to_csv(os.path.join(args.out, "rtt_by_delay_ms.csv"), index=False)
+        if args.plot:
+            plot.errorbar(t, "delay_ms", "rtt_ms", os.path.join(args.plot, "rtt_vs_delay_plot.png"),
+                          "Mean Random Delay vs. Average Ping RTT", "Average Ping RTT (ms)")
+        return
+
+    groupings = args.by or [CONFIG, "nop_bits", "pps", "delay"]
+    tables = run_tables(args.sender, args.receiver, groupings, args.conf, args.refresh)
+    for keys, t in tables.items():
+        print(f"\n=== by {', '.join(keys)} ({int(t['count'].sum())} runs) ===")
+        print(t.to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+        if args.out:
+            t.to_csv(os.path.join(args.out, f"by_{_name(keys)}.csv"), index=False)
+        if args.plot and len(keys) == 1:
+            key = keys[0]
+            for value, ylabel in (("bps", "Bits per Second"), ("duration", "Duration (s)"),
+                                  ("e2e_bps", "End-to-end goodput (bps)"), ("ok", "Decoded exactly")):
+                if f"{value}_mean" in t:
+                    plot.errorbar(t, key, value, os.path.join(args.plot, f"{key}_{value}.png"),
+                                  f"{value} mean ± {args.conf:.0%} CI grouped by {key}", ylabel)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+cache.py  –  aggregated tables cached under a hash of their inputs
+
+The key is a digest of the input files' contents plus a description of
+the computation (groupings, values, confidence, VERSION), so a rerun with
+unchanged logs (e.g. only replotting) loads the pickled tables instead of
+aggregating again, and any change to a log or a setting recomputes.
+Cache files live in .analysis_cache/ next to the first input.
+"""
+
+import os, json, pickle, hashlib
+
+VERSION = 1
+DIR     = ".analysis_cache"
+
+def file_hash(path: str, block: int = 1 << 20) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        while chunk := f.read(block):
+            h.update(chunk)
+    return h.hexdigest()
+
+def cached(inputs: list, spec: dict, compute, refresh: bool = False):
+    """compute() once per (input contents, spec); later calls load the result."""
+    key = hashlib.blake2b(json.dumps([VERSION, [file_hash(p) for p in inputs], spec],
+                                     sort_keys=True, default=str).encode(),
+                          digest_size=16).hexdigest()
+    root = os.path.join(os.path.dirname(os.path.abspath(inputs[0])), DIR)
+    path = os.path.join(root, f"{key}.pkl")
+    if not refresh and os.path.exists(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    result = compute()
+    os.makedirs(root, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return result
@@ -0,0 +1,34 @@
+"""
+ping.py  –  RTT samples from the tpphase1 ping_<delay>ms.txt captures
+
+Every "time=... ms" reply line becomes a row, so the RTT per delay gets a
+mean and CI over the individual pings rather than only the summary line.
+"""
+
+import os, re
+import numpy as np
+import pandas as pd
+
+FILE = re.compile(r"ping_(\d+)ms\.txt$")
+RTT  = re.compile(rb"time=([\d.]+) ms")
+
+def load_pings(directory: str) -> pd.DataFrame:
+    """(delay_ms, rtt_ms) rows for every reply in `directory`."""
+    delays, rtts = [], []
+    for name in sorted(os.listdir(directory)):
+        m = FILE.match(name)
+        if not m:
+            continue
+        with open(os.path.join(directory, name), "rb") as f:
+            found = RTT.findall(f.read())
+        if not found:
+            print(f"Warning: No RTT found in {name}")
+            continue
+        rtts.append(np.array(found).astype(np.float64))
+        delays.append(np.full(len(found), int(m.group(1))))
+    if not rtts:
+        return pd.DataFrame({"delay_ms": [], "rtt_ms": []})
+    return pd.DataFrame({"delay_ms": np.concatenate(delays), "rtt_ms": np.concatenate(rtts)})
+
+def ping_files(directory: str) -> list:
+    return sorted(os.path.join(directory, n) for n in os.listdir(directory) if FILE.match(n))
@@ -0,0 +1,45 @@
+"""
+plot.py  –  error-bar figures from aggregated tables (matplotlib on demand)
+"""
+
+def errorbar(table, key: str, value: str, path: str, title: str, ylabel: str,
+             color: str = None, label: str = None):
+    """<value>_mean ± CI against `key`, saved to `path`."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    mean = table[f"{value}_mean"]
+    plt.figure(figsize=(10, 5))
+    plt.errorbar(table[key], mean,
+                 yerr=[mean - table[f"{value}_ci_lower"], table[f"{value}_ci_upper"] - mean],
+                 fmt="o", capsize=5, label=label, color=color)
+    plt.title(title)
+    plt.xlabel(key)
+    plt.ylabel(ylabel)
+    plt.grid(True)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+def line(x, y, path: str, title: str, xlabel: str, ylabel: str,
+         annotate: bool = True, xticks=None):
+    """Marked line plot with the y values written next to the points."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(8, 5))
+    plt.plot(x, y, marker="o")
+    if annotate:
+        for a, b in zip(x, y):
+            plt.text(a + 0.7, b + 0.05, f"{b:.2f}", ha="left", fontsize=10)
+    plt.xlabel(xlabel)
+    plt.ylabel(ylabel)
+    plt.title(title)
+    plt.grid(True)
+    if xticks is not None:
+        plt.xticks(xticks)
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
@@ -0,0 +1,70 @@
+"""
+runs.py  –  sender_log.csv joined with receiver_log.csv, one row per run
+
+The logs share no run id (each tool counts its own runs), so every
+receiver row is matched to the latest sender run with the same nop_bits
+that started before the message was decoded (merge_asof, within
+`tolerance` seconds). A sender run no receiver row matches was lost.
+
+Per run this adds:
+    decoded   the receiver reported a message
+    ok        the message came out exactly as sent
+    bit_acc   fraction of the sent message bits that came out right
+    e2e_s     sender start to receiver decode
+    e2e_bps   message bits / e2e_s for exact decodes, 0 otherwise
+"""
+
+import numpy as np
+import pandas as pd
+
+CONFIG  = ["nop_bits", "pps", "delay", "flows", "encoding", "fec"]
+DEFAULT = {"flows": 1, "encoding": "nop", "fec": "none", "retx": 0, "gaps": 0}
+
+def load_log(path: str) -> pd.DataFrame:
+    """A sender or receiver log; columns older logs lack get their defaults."""
+    df = pd.read_csv(path, dtype={"message": str}, keep_default_na=False,
+                     na_values={c: [""] for c in ("bits", "duration", "bps", "delay")})
+    for col, val in DEFAULT.items():
+        if col not in df:
+            df[col] = val
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="ISO8601").astype("datetime64[ns]")
+    return df
+
+def _packed(msgs, width: int) -> np.ndarray:
+    raw = b"".join(m.encode("latin-1", "replace")[:width].ljust(width, b"\0") for m in msgs)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(len(msgs), width)
+
+def bit_accuracy(sent: pd.Series, got: pd.Series) -> np.ndarray:
+    """Per row, the share of the bits of `sent` that `got` reproduces (NaN got -> 0)."""
+    lens  = sent.str.len().to_numpy()
+    width = int(lens.max()) if len(lens) else 0
+    if width == 0:
+        return np.ones(len(sent))
+    a, b  = _packed(sent.tolist(), width), _packed(got.fillna("").tolist(), width)
+    wrong = np.unpackbits(a ^ b, axis=1).reshape(len(sent), width, 8).sum(axis=2)
+    wrong = np.where(np.arange(width) < lens[:, None], wrong, 0).sum(axis=1)
+    acc   = 1 - wrong / np.maximum(8 * lens, 1)
+    return np.where(got.notna().to_numpy(), acc, 0.0)
+
+def join_runs(sender: pd.DataFrame, receiver: pd.DataFrame, tolerance: float = 120.0) -> pd.DataFrame:
+    s = sender.copy()
+    s["start"] = s["timestamp"] - pd.to_timedelta(s["duration"], unit="s")
+    s = s.sort_values("start", kind="stable").reset_index(drop=True)
+    s["run"] = np.arange(len(s))
+
+    r = receiver[["timestamp", "nop_bits", "bits", "duration", "bps", "message", "gaps"]]
+    r = r.rename(columns=lambda c: c if c == "nop_bits" else f"rx_{c}")
+    m = pd.merge_asof(r.sort_values("rx_timestamp", kind="stable"),
+                      s[["start", "run", "nop_bits"]].astype({"nop_bits": r["nop_bits"].dtype}),
+                      left_on="rx_timestamp", right_on="start", by="nop_bits",
+                      direction="backward", tolerance=pd.Timedelta(seconds=tolerance))
+    m = m.dropna(subset=["run"]).drop_duplicates("run")
+    m = m.drop(columns=["start", "nop_bits"]).astype({"run": np.int64})
+    out = s.merge(m, on="run", how="left")
+
+    out["decoded"] = out["rx_message"].notna()
+    out["ok"]      = out["decoded"] & (out["rx_message"] == out["message"])
+    out["bit_acc"] = bit_accuracy(out["message"], out["rx_message"])
+    out["e2e_s"]   = (out["rx_timestamp"] - out["start"]).dt.total_seconds()
+    out["e2e_bps"] = np.where(out["ok"], out["bits"] / out["e2e_s"], 0.0)
+    return out
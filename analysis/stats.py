@@ -0,0 +1,60 @@
+"""
+stats.py  –  mean / 95 % t-interval / count for many groupings in one pass
+
+aggregate() groups the rows once, at the finest level (the union of all
+grouping keys), collecting count, sum and sum of squares of every value
+column per cell. Any coarser grouping is a sum over those cells, so each
+extra table costs a groupby over the small cell table, not over the rows.
+Values are centred on their overall mean first, which keeps the
+sum-of-squares variance accurate.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+def _keys(grouping) -> list:
+    return [grouping] if isinstance(grouping, str) else list(grouping)
+
+def cells(df: pd.DataFrame, keys: list, values: list) -> pd.DataFrame:
+    """Per-cell n / s / ss of each value column (centred), plus the row count."""
+    x = df[values].astype(np.float64)
+    centre = x.mean()
+    x = x - centre
+    parts = {"count": pd.Series(1, index=df.index, dtype=np.int64)}
+    for v in values:
+        ok = x[v].notna()
+        parts[f"{v}__n"]  = ok.astype(np.int64)
+        parts[f"{v}__s"]  = x[v].where(ok, 0.0)
+        parts[f"{v}__ss"] = parts[f"{v}__s"] ** 2
+    frame = pd.DataFrame(parts)
+    for k in keys:
+        frame[k] = df[k]
+    out = frame.groupby(keys, sort=True, dropna=False).sum()
+    out.attrs["centre"] = centre.to_dict()
+    return out
+
+def summarize(c: pd.DataFrame, grouping, values: list, conf: float = 0.95) -> pd.DataFrame:
+    """<v>_mean, <v>_ci_lower, <v>_ci_upper per value and a row count, by `grouping`."""
+    keys = _keys(grouping)
+    g = c.groupby(level=keys, sort=True).sum() if keys != list(c.index.names) else c
+    out = {}
+    for v in values:
+        n, s, ss = (g[f"{v}__{p}"].to_numpy(np.float64) for p in ("n", "s", "ss"))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s / n
+            var  = np.maximum(ss - s * mean, 0.0) / (n - 1)
+            half = stats.t.ppf((1 + conf) / 2, n - 1) * np.sqrt(var / n)
+        half = np.where(n > 1, half, 0.0)   # one sample: the mean itself
+        mean = mean + c.attrs["centre"][v]
+        out[f"{v}_mean"]     = mean
+        out[f"{v}_ci_lower"] = mean - half
+        out[f"{v}_ci_upper"] = mean + half
+    out["count"] = g["count"].to_numpy()
+    return pd.DataFrame(out, index=g.index).reset_index()
+
+def aggregate(df: pd.DataFrame, groupings: list, values: list, conf: float = 0.95) -> dict:
+    """{tuple(keys): table} for every grouping (a column name or a list of them)."""
+    keys = list(dict.fromkeys(k for gr in groupings for k in _keys(gr)))
+    c = cells(df, keys, values)
+    return {tuple(_keys(gr)): summarize(c, gr, values, conf) for gr in groupings}
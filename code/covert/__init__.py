@@ -0,0 +1 @@
+"""Covert-channel code shared by code/sec and code/insec."""
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+arq.py  –  selective-repeat ARQ for the covert channel
+
+The receiver answers sequence-numbered data symbols (see codec.seq_to_ipid)
+with selective ACKs sent as plain UDP datagrams back to the sender. A SACK
+holds the run id, the cumulative base (first index still missing) and a
+bitmap of the indices received after it. The sender keeps a sliding window
+of in-flight indices and retransmits only those that are still unacked
+when their timer runs out. The RTO follows the measured RTT (Jacobson/Karn)
+and doubles, up to RTO_MAX, on every timeout until the next valid sample,
+so goodput tracks the actual loss instead of a fixed --pps redundancy and
+a dead return path is not hammered at the RTT rate.
+
+Wire format (network order):  b"SACK" | run u16 | base u32 | bitmap
+where bitmap bit j (MSB first) set means index base + 1 + j arrived.
+"""
+
+import struct
+import numpy as np
+
+SACK_HDR   = struct.Struct("!4sHI")
+SACK_MAGIC = b"SACK"
+ACK_PORT   = 8889
+RTO_MIN, RTO_MAX = 0.02, 2.0
+GIVE_UP    = 5.0                    # seconds without ACK progress
+
+def pack_sack(run: int, base: int, bitmap: bytes = b"") -> bytes:
+    return SACK_HDR.pack(SACK_MAGIC, run, base) + bitmap
+
+def parse_sack(data: bytes):
+    """(run, base, bitmap) of a SACK datagram; None if it is not one."""
+    if len(data) < SACK_HDR.size or not data.startswith(SACK_MAGIC):
+        return None
+    _, run, base = SACK_HDR.unpack_from(data)
+    return run, base, data[SACK_HDR.size:]
+
+def sack_bitmap(have, base: int, nbytes: int) -> bytes:
+    """Bitmap of indices base+1 .. base+8*nbytes present in `have` (a set/dict)."""
+    bits = np.fromiter(((base + 1 + j) in have for j in range(8 * nbytes)),
+                       dtype=np.uint8, count=8 * nbytes)
+    bitmap = np.packbits(bits).tobytes()
+    return bitmap.rstrip(b"\x00")
+
+class SendWindow:
+    """Sender-side selective-repeat state for n indices.
+
+    due() hands out indices to (re)transmit, at most `size` beyond the
+    cumulative base; ack() applies a SACK. RTT samples are only taken from
+    indices sent once (Karn), so retransmissions do not skew the RTO, and
+    from the oldest index a SACK covers, so the RTO includes the delay of
+    batching ACKs.
+
+    Every send arms the index's timer with the current RTO. The first
+    retransmission of a timeout doubles the RTO (capped at RTO_MAX); indices
+    whose timers were armed before that backoff belong to the same timeout
+    and go out without doubling it again, even when due() is paced with
+    `limit`. The next RTT sample resets the RTO from srtt/rttvar.
+    """
+
+    def __init__(self, n: int, size: int = 64, rto: float = 0.2):
+        self.n, self.size, self.rto = n, size, rto
+        self.acked   = np.zeros(n, dtype=bool)
+        self.sent_at = np.full(n, -np.inf)
+        self.timer   = np.full(n, -np.inf)  # retransmission due at
+        self.tries   = np.zeros(n, dtype=np.int32)
+        self._backoff_at = -np.inf          # when the RTO was last doubled
+        self.base    = 0
+        self.srtt = self.rttvar = None
+        self.sent = self.retx = 0
+
+    def done(self) -> bool:
+        return self.base >= self.n
+
+    def due(self, now: float, limit: int = None) -> list:
+        hi  = min(self.base + self.size, self.n)
+        win = np.arange(self.base, hi)
+        idx = win[~self.acked[self.base:hi] & (self.timer[self.base:hi] <= now)][:limit]
+        again = self.tries[idx] > 0
+        if (again & (self.sent_at[idx] >= self._backoff_at)).any():
+            self.rto = min(RTO_MAX, self.rto * 2)   # new timeout: back off until a sample
+            self._backoff_at = now
+        self.sent_at[idx] = now
+        self.timer[idx]   = now + self.rto
+        self.tries[idx]  += 1
+        self.sent += len(idx)
+        self.retx += int(np.count_nonzero(again))
+        return idx.tolist()
+
+    def wait(self, now: float) -> float:
+        """Seconds until the next in-window retransmission timer expires."""
+        hi  = min(self.base + self.size, self.n)
+        out = ~self.acked[self.base:hi]
+        if not out.any():
+            return self.rto
+        return max(0.0, float(self.timer[self.base:hi][out].min()) - now)
+
+    def ack(self, base: int, bitmap: bytes, now: float) -> bool:
+        """Apply a SACK; True if it acknowledged anything new."""
+        base = min(base, self.n)
+        new  = np.flatnonzero(~self.acked[:base])
+        if bitmap:
+            bits = np.flatnonzero(np.unpackbits(np.frombuffer(bitmap, dtype=np.uint8)))
+            bits = bits + base + 1
+            bits = bits[bits < self.n]
+            new  = np.concatenate((new, bits[~self.acked[bits]]))
+        if not len(new):
+            return False
+        self.acked[new] = True
+        once = new[self.tries[new] == 1]
+        if len(once):
+            self._sample(now - float(self.sent_at[once].min()))
+        rest = np.flatnonzero(~self.acked[self.base:])
+        self.base = self.base + int(rest[0]) if len(rest) else self.n
+        return True
+
+    def _sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - rtt)
+            self.srtt   = 0.875 * self.srtt + 0.125 * rtt
+        self.rto = min(RTO_MAX, max(RTO_MIN, self.srtt + 4 * self.rttvar))
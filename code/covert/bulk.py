@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+bulk.py  –  streaming bulk payloads over the covert channel
+
+The sender reads a file (or stdin) in fixed-size chunks and turns each one
+into scrambled channel symbols lazily, so only one chunk is ever held in
+memory. Chunks are a whole number of symbols long, so the symbol stream is
+the same as for the payload encoded in one piece. Under FEC every chunk is
+its own set of interleaved RS codewords, and the receiver cuts the stream
+at the same boundaries (both sides need the same --chunk).
+
+The receiver hands voted symbols to BulkWriter in batches. It
+unscrambles them at their running offset, decodes them and appends the
+bytes to the output file. The END tag carries the payload length
+("#bytes"), so block and symbol padding is cut off at the end.
+"""
+
+import time
+from math import gcd
+import numpy as np
+from .codec import bytes_to_symbols, symbols_to_bytes, scramble
+
+CHUNK = 4096                        # payload bytes per chunk (rounded to whole symbols)
+
+def chunk_size(chunk: int, bits: int) -> int:
+    """Largest size <= chunk whose bits split evenly into `bits`-wide symbols."""
+    step = bits // gcd(8, bits)
+    return max(step, chunk - chunk % step)
+
+def read_chunks(f, size: int):
+    """Yield `size`-byte chunks of a binary file object until EOF."""
+    while True:
+        b = f.read(size)
+        if not b:
+            return
+        yield b
+
+def encode_chunks(chunks, bits: int, code=None):
+    """Yield (scrambled symbols, payload bytes) per chunk; keystream offsets run on."""
+    pos = 0
+    for data in chunks:
+        syms = bytes_to_symbols(data, bits) if code is None else code.encode(data)
+        yield scramble(syms, bits, start=pos), len(data)
+        pos += len(syms)
+
+class Progress:
+    """Prints channel bits so far and cumulative/instantaneous bps, at most
+    every `every` seconds (parity included under FEC)."""
+
+    def __init__(self, label: str, every: float = 1.0):
+        self.label, self.every = label, every
+        self.t0 = self.last = time.monotonic()
+        self.last_bits = 0
+
+    def update(self, bits: int):
+        now = time.monotonic()
+        if self.every <= 0 or now - self.last < self.every:
+            return
+        avg = bits / (now - self.t0)
+        cur = (bits - self.last_bits) / (now - self.last)
+        print(f"[{self.label}] {bits} bits in {now - self.t0:.1f}s  "
+              f"avg {avg:.0f} bps  now {cur:.0f} bps", flush=True)
+        self.last, self.last_bits = now, bits
+
+class BulkWriter:
+    """Incremental decoder from masked symbols to an output file.
+
+    feed() takes voted symbols (-1 = erased) in any batch size (the
+    receiver hands over `batch` at a time) and writes whatever forms whole
+    bytes or whole FEC chunks. close() flushes the rest and truncates the
+    file to the announced length.
+    """
+
+    def __init__(self, path: str, bits: int, code=None, chunk: int = CHUNK, progress: float = 1.0):
+        self.path, self.bits, self.code = path, bits, code
+        if code is None:
+            self.unit  = 8 // gcd(8, bits)                  # symbols per whole byte group
+            self.batch = self.unit * max(1, 1024 // self.unit)
+        else:
+            self.chunk = chunk_size(chunk, bits)
+            self.unit  = self.batch = len(code.encode(bytes(self.chunk)))
+        self.every = progress
+        self.f     = None
+        self.size  = None                                   # payload length from END
+
+    def open(self, path: str = None):
+        self.path   = path or self.path
+        self.f      = open(self.path, "wb")
+        self.buf    = np.zeros(0, dtype=np.int64)
+        self.pos    = 0                                     # symbols unscrambled so far
+        self.nbytes = self.fixed = self.failed = 0
+        self.progress = Progress("rx", self.every)
+
+    def pending(self, n: int):
+        """Report progress with n more symbols voted but not yet fed."""
+        if self.f is not None:
+            self.progress.update((self.pos + len(self.buf) + n) * self.bits)
+
+    def feed(self, masked, final: bool = False):
+        if self.f is None:
+            self.open()
+        self.buf = np.concatenate((self.buf, np.asarray(masked, dtype=np.int64)))
+        take = len(self.buf) if final else len(self.buf) - len(self.buf) % self.unit
+        if take:
+            self._write(self.buf[:take])
+            self.buf = self.buf[take:]
+        self.progress.update(self.pos * self.bits)
+
+    def _write(self, masked):
+        erased = np.flatnonzero(masked < 0)
+        syms   = scramble(np.where(masked < 0, 0, masked), self.bits, start=self.pos)
+        self.pos += len(masked)
+        if self.code is None:
+            self._emit(symbols_to_bytes(syms, self.bits))
+            return
+        for lo in range(0, len(syms), self.unit):
+            part = syms[lo:lo + self.unit]
+            era  = (erased[(erased >= lo) & (erased < lo + self.unit)] - lo).tolist()
+            data, fixed, failed = self.code.decode(part, era)
+            self.fixed += fixed
+            self.failed += failed
+            self._emit(data[:self.chunk] if len(part) == self.unit else data)
+
+    def _emit(self, data: bytes):
+        self.f.write(data)
+        self.nbytes += len(data)
+
+    def close(self, masked=()) -> tuple:
+        """Flush and close; (payload bits, note) for the run log."""
+        self.feed(masked, final=True)
+        if self.size is not None and self.size < self.nbytes:
+            self.f.truncate(self.size)
+            self.nbytes = self.size
+        self.f.close()
+        self.f, self.size = None, None
+        if self.code is None:
+            return self.pos * self.bits, ""
+        return self.nbytes * 8, f"  fec: {self.fixed} symbols fixed, {self.failed} blocks failed"
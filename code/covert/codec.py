@@ -0,0 +1,278 @@
+#!/usr/bin/env python3
+"""
+codec.py  –  symbol codec shared by the covert senders and receivers
+
+Bytes <-> symbols of any width go through np.unpackbits / np.packbits, with
+MSB-first bit order as in the original '{:08b}' string code. Each scrambling
+mask is the low `bits` bits of SHA-256(SESSION_KEY || str(idx)), so this
+matches the old per-symbol make_mask(). The digests are computed once per
+key in blocks and cached, and masks for a whole message come back as a
+single array slice.
+
+Alphabets map symbol values to option bytes: the original NOP-count
+layouts (up to 5 bits) and a wide Timestamp-option layout that fills the
+40-byte option space (up to 60 bits). The stripe helpers split a message
+across K flows and put it back together. Sequence mode numbers symbols
+through the IP ID field.
+"""
+
+import hashlib
+import numpy as np
+
+SESSION_KEY = b"2444172"            # shared secret for XOR masking
+TS_HDR      = b"\x44\x04\x00\x00"   # Type=68 (Timestamp), Len=4, dummy data
+MAX_OPT_LEN = 40                    # IPv4 header options limit
+
+# ───────── bytes <-> symbols ───────── #
+def _weights(bits: int) -> np.ndarray:
+    return (1 << np.arange(bits - 1, -1, -1)).astype(np.int64)
+
+def bytes_to_symbols(data: bytes, bits: int) -> np.ndarray:
+    """MSB-first `bits`-wide symbols; the last one is zero-padded."""
+    b = np.unpackbits(np.frombuffer(data, dtype=np.uint8))
+    pad = -len(b) % bits
+    if pad:
+        b = np.concatenate((b, np.zeros(pad, dtype=np.uint8)))
+    return b.reshape(-1, bits).astype(np.int64) @ _weights(bits)
+
+def symbols_to_bytes(symbols, bits: int) -> bytes:
+    """Inverse of bytes_to_symbols(); a trailing partial byte is dropped."""
+    s = np.asarray(symbols, dtype=np.int64).reshape(-1, 1)
+    b = ((s >> np.arange(bits - 1, -1, -1)) & 1).astype(np.uint8).ravel()
+    return np.packbits(b[: len(b) - len(b) % 8]).tobytes()
+
+def bytes_to_symbols_aligned(data: bytes, bits: int) -> np.ndarray:
+    """Each byte on its own ceil(8/bits) symbols, so one bad symbol hits one byte.
+
+    Only differs from bytes_to_symbols() for widths below 8; used under FEC.
+    """
+    if bits >= 8:
+        return bytes_to_symbols(data, bits)
+    per = -(-8 // bits)
+    v = np.frombuffer(data, dtype=np.uint8).astype(np.int64)
+    return ((v[:, None] >> (bits * np.arange(per - 1, -1, -1))) & ((1 << bits) - 1)).ravel()
+
+def symbols_to_bytes_aligned(symbols, bits: int) -> bytes:
+    if bits >= 8:
+        return symbols_to_bytes(symbols, bits)
+    per = -(-8 // bits)
+    s = np.asarray(symbols, dtype=np.int64)
+    s = s[: len(s) - len(s) % per].reshape(-1, per)
+    return ((s @ (1 << (bits * np.arange(per - 1, -1, -1)))) & 0xFF).astype(np.uint8).tobytes()
+
+def text_to_symbols(txt: str, bits: int) -> np.ndarray:
+    return bytes_to_symbols(txt.encode("latin-1"), bits)
+
+def bits_to_text(symbols, bits: int) -> str:
+    return symbols_to_bytes(symbols, bits).decode("latin-1").rstrip("\x00")
+
+# ───────── keystream ───────── #
+class Keystream:
+    """SHA-256 counter-mode masks, block i = SHA-256(key || str(i)).
+
+    Only the low 64 bits of each digest are kept, which covers every
+    symbol width the alphabets allow. The first CACHE masks are kept:
+    that covers ordinary messages and one default bulk chunk (CHUNK bytes at
+    one bit per symbol) in 256 KB. Masks past it are hashed per call,
+    i.e. per chunk or batch of a bulk stream, and not kept.
+    """
+
+    BLOCK = 4096
+    CACHE = 1 << 15
+
+    def __init__(self, key: bytes = SESSION_KEY):
+        self.key  = key
+        self._low = np.zeros(0, dtype=np.uint64)
+
+    def _extend(self, n: int):
+        have = len(self._low)
+        if n <= have:
+            return
+        n = max(n, have + self.BLOCK)
+        self._low = np.concatenate((self._low, self._digests(have, n)))
+
+    def _digests(self, lo: int, hi: int) -> np.ndarray:
+        sha, k = hashlib.sha256, self.key
+        raw = b"".join(sha(k + str(i).encode()).digest()[-8:] for i in range(lo, hi))
+        return np.frombuffer(raw, dtype=">u8").astype(np.uint64)
+
+    def masks(self, n: int, bits: int, start: int = 0) -> np.ndarray:
+        if start + n > self.CACHE:
+            low = self._digests(start, start + n)
+        else:
+            self._extend(start + n)
+            low = self._low[start:start + n]
+        return (low & np.uint64((1 << bits) - 1)).astype(np.int64)
+
+    def mask(self, idx: int, bits: int) -> int:
+        return int(self.masks(1, bits, idx)[0])
+
+_streams = {}
+
+def keystream(key: bytes = SESSION_KEY) -> Keystream:
+    ks = _streams.get(key)
+    if ks is None:
+        ks = _streams[key] = Keystream(key)
+    return ks
+
+def scramble(symbols, bits: int, key: bytes = SESSION_KEY, start: int = 0) -> np.ndarray:
+    s = np.asarray(symbols, dtype=np.int64)
+    return s ^ keystream(key).masks(len(s), bits, start)
+
+def make_mask(idx: int, bits: int, key: bytes = SESSION_KEY) -> int:
+    return keystream(key).mask(idx, bits)
+
+# ───────── IP option bytes ───────── #
+def pad4(opt: bytes) -> bytes:
+    return opt + b"\x00" * ((4 - (len(opt) & 3)) & 3)
+
+def build_opts(n: int, ts: bool = True) -> bytes:
+    """n NOPs, behind a fake Timestamp header if `ts`; empty for n == 0."""
+    if n == 0:
+        return b""
+    return pad4((TS_HDR if ts else b"") + b"\x01" * n)
+
+def framing(bits: int) -> tuple:
+    """(START, END) symbol values for a given width."""
+    return (1 << bits), (1 << bits) + 1
+
+# ───────── alphabets: symbol value <-> option bytes ───────── #
+# layout -> (max bits, description)
+LAYOUTS = {
+    "nop":   (5,  "Timestamp header + v NOPs (sender_covert)"),
+    "plain": (5,  "v NOPs (sender_tpphase2)"),
+    "ts":    (60, "Timestamp option data blocks + NOP run, markers in the flag nibble"),
+}
+WIDE_NOP_BITS = 4                   # low bits carried as a 0..15 NOP run
+TS_FLAG = {"data": 0, "start": 1, "end": 3}   # valid RFC 791 flag values
+
+class Alphabet:
+    """Maps symbol values 0 .. END of one (width, layout) to IP option bytes.
+
+    "nop"/"plain" carry v as a NOP count. "ts" splits v into high bits,
+    stored big-endian in the data blocks of a Timestamp option whose pointer
+    marks it full (so no hop writes into it; the overflow nibble a hop may
+    bump is ignored), and low bits as a NOP run after it. START/END are told
+    apart by the option's flag nibble. The
+    encode table is precomputed for widths up to TABLE_BITS.
+    """
+
+    TABLE_BITS = 16
+
+    def __init__(self, bits: int, layout: str = "nop"):
+        if layout not in LAYOUTS:
+            raise ValueError(f"unknown layout {layout!r}")
+        if not 1 <= bits <= LAYOUTS[layout][0]:
+            raise ValueError(f"layout {layout!r} carries 1..{LAYOUTS[layout][0]} bits per symbol")
+        self.bits, self.layout = bits, layout
+        self.START, self.END = framing(bits)
+        if layout == "ts":
+            self.nop_bits = min(bits, WIDE_NOP_BITS)
+            hi_bytes      = -(-(bits - self.nop_bits) // 8)
+            self.ts_len   = 4 + 4 * -(-hi_bytes // 4)
+        worst = len(self._encode(self.END if layout != "ts" else (1 << bits) - 1))
+        if worst > MAX_OPT_LEN:
+            raise ValueError(f"{bits}-bit symbols need {worst} option bytes (max {MAX_OPT_LEN})")
+        self.table = ([self._encode(v) for v in range(self.END + 1)]
+                      if bits <= self.TABLE_BITS else None)
+
+    def _encode(self, v: int) -> bytes:
+        if self.layout != "ts":
+            return build_opts(v, self.layout == "nop")
+        flag, nops = TS_FLAG["data"], 0
+        if v == self.START:
+            flag, v = TS_FLAG["start"], 0
+        elif v == self.END:
+            flag, v = TS_FLAG["end"], 0
+        else:
+            nops = v & ((1 << self.nop_bits) - 1)
+            v  >>= self.nop_bits
+        L   = self.ts_len
+        hdr = bytes((0x44, L, L + 1, flag))
+        return pad4(hdr + v.to_bytes(L - 4, "big") + b"\x01" * nops)
+
+    def encode(self, v: int) -> bytes:
+        return self.table[v] if self.table is not None else self._encode(v)
+
+    def decode(self, opts) -> int:
+        """Symbol value of raw option bytes; -1 if they are not of this layout."""
+        if self.layout == "nop":
+            return opt_nops(opts)
+        if self.layout == "plain":
+            return opt_nops(opts, skip_ts=False)
+        opts = bytes(opts)
+        L = self.ts_len
+        if len(opts) < L or opts[0] != 0x44 or opts[1] != L:
+            return -1
+        flag = opts[3] & 0x0F
+        if flag == TS_FLAG["start"]:
+            return self.START
+        if flag == TS_FLAG["end"]:
+            return self.END
+        return (int.from_bytes(opts[4:L], "big") << self.nop_bits) | opts[L:].count(0x01)
+
+_alphabets = {}
+
+def alphabet(bits: int, layout: str = "nop") -> Alphabet:
+    a = _alphabets.get((bits, layout))
+    if a is None:
+        a = _alphabets[(bits, layout)] = Alphabet(bits, layout)
+    return a
+
+# ───────── striping over K flows ───────── #
+# Symbol i travels on stripe i % K. Each stripe is framed on its own
+# (START x3, data, END x3) and its payload tags carry "/k/K". In sequence
+# mode every tag also carries "@r", a per-transmission run id, and START/END
+# carry "#n", the message length in symbols: NAME[/k/K][#n][@r].
+def stripe_tag(tag: bytes, k: int, nstripes: int, total: int = None, run: int = None) -> bytes:
+    if nstripes > 1:
+        tag = b"%s/%d/%d" % (tag, k, nstripes)
+    if total is not None:
+        tag = b"%s#%d" % (tag, total)
+    return tag if run is None else b"%s@%d" % (tag, run)
+
+def parse_tag(payload) -> tuple:
+    """(k, K, total, run) from a payload tag; total/run are None when absent."""
+    tag, _, run = bytes(payload).partition(b"@")
+    tag, _, tot = tag.partition(b"#")
+    total = int(tot) if tot.isdigit() else None
+    run   = int(run) if run.isdigit() else None
+    parts = tag.split(b"/")
+    if len(parts) == 3 and parts[1].isdigit() and parts[2].isdigit():
+        return int(parts[1]), int(parts[2]), total, run
+    return 0, 1, total, run
+
+def parse_stripe(payload) -> tuple:
+    """(k, K) from a payload tag; untagged payloads are stripe 0 of 1."""
+    return parse_tag(payload)[:2]
+
+def merge_stripes(stripes) -> list:
+    """Round-robin interleave of per-stripe symbol lists, in stripe order."""
+    out = []
+    for i in range(max((len(s) for s in stripes), default=0)):
+        out += [s[i] for s in stripes if i < len(s)]
+    return out
+
+# ───────── sequence numbers in the IP ID ───────── #
+# ID 0 asks the kernel to pick one, so index i travels as i % SEQ_MOD + 1.
+SEQ_MOD = 65535
+
+def seq_to_ipid(i: int) -> int:
+    return i % SEQ_MOD + 1
+
+def ipid_to_seq(ipid: int, ref: int) -> int:
+    """Unwrap an IP ID to the index closest to `ref`; -1 for ID 0."""
+    if ipid == 0:
+        return -1
+    r    = ipid - 1
+    base = ref - ref % SEQ_MOD
+    return min((c for c in (base - SEQ_MOD + r, base + r, base + SEQ_MOD + r) if c >= 0),
+               key=lambda c: abs(c - ref))
+
+# ───────── receive side ───────── #
+def opt_nops(opts, skip_ts: bool = True) -> int:
+    """NOP count of raw option bytes, ignoring a leading Timestamp header."""
+    opts = bytes(opts)
+    if skip_ts and len(opts) >= 4 and opts[0] == 0x44:
+        opts = opts[4:]
+    return opts.count(0x01)
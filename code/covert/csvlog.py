@@ -0,0 +1,31 @@
+#!/usr/bin/env python3
+"""
+csvlog.py  –  append-only run logs whose header may have grown
+
+sender_log.csv and receiver_log.csv are appended to across runs and
+container restarts, and their CSV_HEADER gains columns as the tools grow
+(flows, encoding, fec, ...). A row is only ever written under the header
+it matches: if an existing log starts with a different header, it is
+moved aside to <name>.<n> (first free n) and a fresh log is started.
+"""
+
+import csv, pathlib
+
+def start_log(path, header: list) -> str:
+    """Make `path` a log with `header`; returns where an old log went, or ""."""
+    p = pathlib.Path(path)
+    if p.exists() and p.stat().st_size:
+        with open(p, newline="") as f:
+            if next(csv.reader(f), None) == list(header):
+                return ""
+        n = 1
+        while p.with_name(f"{p.name}.{n}").exists():
+            n += 1
+        old = p.with_name(f"{p.name}.{n}")
+        p.rename(old)
+        moved = str(old)
+    else:
+        moved = ""
+    with open(p, "w", newline="") as f:
+        csv.writer(f).writerow(header)
+    return moved
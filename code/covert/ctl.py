@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+ctl.py  –  unix-socket control channel for the long-lived sec/insec tools
+
+With --daemon SOCK the senders and receivers import once, keep their
+sockets open and take commands on SOCK instead of being restarted for
+every slice. The protocol is one JSON object per line in each direction.
+A request has a "cmd" plus parameters, and the reply always carries "ok".
+Parameters use the tools' own option names (nop_bits, pps, delay,
+message, ...) and override the command line for that run only.
+
+Every daemon answers "ping" and "quit"; the rest are per tool:
+
+    sender_covert.py    run                 send, reply with bits/dur/bps
+    receiver_covert.py  start / wait        arm the capture / block until decoded
+    sender_ben.py       run                 one echo, reply with the RTT
+    receiver.py         start / stop        bind and echo / close
+
+Run as a script to send one request and print the reply (exit 1 if not ok):
+
+    python3 ctl.py /tmp/sender_covert.sock run nop_bits=3 pps=2 delay=0.01
+"""
+
+import os, sys, json, time, socket, argparse
+
+def coerce(args, params: dict):
+    """Copy of argparse namespace `args` with `params` applied, typed like the defaults."""
+    out = argparse.Namespace(**vars(args))
+    for key, val in params.items():
+        key = key.replace("-", "_")
+        if not hasattr(out, key) or key == "daemon":
+            raise KeyError(f"unknown parameter {key!r}")
+        cur = getattr(out, key)
+        if isinstance(cur, bool):
+            val = val if isinstance(val, bool) else str(val).lower() in ("1", "true", "yes")
+        elif cur is not None:
+            val = type(cur)(val)
+        setattr(out, key, val)
+    return out
+
+def _session(conn, handlers: dict) -> bool:
+    """Answer the requests of one connection; True once "quit" was answered."""
+    with conn, conn.makefile("rwb") as f:
+        for line in f:
+            try:
+                req = json.loads(line)
+                cmd = req.pop("cmd")
+                if cmd == "quit":
+                    f.write(b'{"ok": true}\n')
+                    f.flush()
+                    return True
+                if cmd == "ping":
+                    resp = {}
+                elif cmd in handlers:
+                    resp = handlers[cmd](req)
+                else:
+                    raise KeyError(f"unknown command {cmd!r}")
+                out = json.dumps({"ok": True, **resp})
+            except Exception as e:      # a failing request must not take the daemon down
+                out = json.dumps({"ok": False, "error": str(e) or type(e).__name__})
+            f.write(out.encode() + b"\n")
+            f.flush()
+    return False
+
+def serve(path: str, handlers: dict):
+    """Answer requests on unix socket `path` one connection at a time until "quit"."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    srv = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    srv.bind(path)
+    srv.listen(4)
+    print(f"[*] control socket {path}", flush=True)
+    try:
+        while True:
+            conn, _ = srv.accept()
+            try:
+                if _session(conn, handlers):
+                    return
+            except OSError as e:        # client went away mid-reply
+                print(f"[!] control socket: {e}", flush=True)
+    finally:
+        srv.close()
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+def request(path: str, cmd: str, params: dict = None, timeout: float = None) -> dict:
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    s.settimeout(timeout)
+    try:
+        s.connect(path)
+        s.sendall(json.dumps({"cmd": cmd, **(params or {})}).encode() + b"\n")
+        with s.makefile("rb") as f:
+            line = f.readline()
+        if not line:
+            raise ConnectionError(f"{path}: no reply")
+        return json.loads(line)
+    finally:
+        s.close()
+
+def _value(v: str):
+    try:
+        return json.loads(v)
+    except ValueError:
+        return v
+
+def main():
+    ap = argparse.ArgumentParser(description="Send one command to a --daemon control socket")
+    ap.add_argument("sock")
+    ap.add_argument("cmd")
+    ap.add_argument("params", nargs="*", help="key=value (values parsed as JSON, else strings)")
+    ap.add_argument("--timeout", type=float, default=None,
+                    help="give up waiting for the reply after this many seconds")
+    ap.add_argument("--wait-ready", type=float, default=0,
+                    help="retry connecting for up to this many seconds (daemon still starting)")
+    args = ap.parse_args()
+
+    params = {}
+    for p in args.params:
+        key, sep, val = p.partition("=")
+        if not sep:
+            ap.error(f"parameter {p!r} is not key=value")
+        params[key] = _value(val)
+
+    deadline = time.monotonic() + args.wait_ready
+    while True:
+        try:
+            resp = request(args.sock, args.cmd, params, args.timeout)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.1)
+    print(json.dumps(resp))
+    if not resp.get("ok"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+fec.py  –  Reed–Solomon forward error correction for the covert channel
+
+RS(n, k) over GF(2^m) (first root α^0), systematic, so a block that cannot
+be corrected still yields its data symbols as received. For 3..8-bit
+channel symbols the code works over GF(2^bits), so one channel symbol is
+one code symbol (n <= 2^bits - 1). Other widths use GF(2^8) over bytes,
+each byte on its own group of channel symbols.
+
+The data is zero-padded to whole k-symbol blocks, and all blocks are
+encoded at once (the LFSR runs over a (blocks, parity) array). The
+codewords are then interleaved column-major across the whole message, so a
+burst of bad symbols (e.g. frames swapped by the delay stage) is spread
+over many codewords. On receive, syndromes for all blocks are computed
+together (Horner over the columns). Only blocks with non-zero syndromes or
+erasures go through Berlekamp–Massey / Chien / Forney. Each block corrects
+e errors and f erasures as long as 2e + f <= n - k.
+"""
+
+import numpy as np
+from .codec import (bytes_to_symbols, symbols_to_bytes,
+                    bytes_to_symbols_aligned, symbols_to_bytes_aligned)
+
+PRIM = {2: 0x7, 3: 0xB, 4: 0x13, 5: 0x25, 6: 0x43, 7: 0x89, 8: 0x11D}
+
+class ReedSolomonError(Exception):
+    pass
+
+# ───────── GF(2^m) arithmetic ───────── #
+class GF:
+    """Log/antilog tables for GF(2^m); polynomials are lists, highest degree first."""
+
+    def __init__(self, m: int):
+        self.m, self.q = m, (1 << m) - 1
+        exp, log, x = [0] * (2 * self.q), [0] * (self.q + 1), 1
+        for i in range(self.q):
+            exp[i], log[x] = x, i
+            x <<= 1
+            if x >> m:
+                x ^= PRIM[m]
+        for i in range(self.q, 2 * self.q):
+            exp[i] = exp[i - self.q]
+        self.exp, self.log = exp, log
+        self._exp = np.array(exp, dtype=np.int64)
+        self._log = np.array(log, dtype=np.int64)
+
+    def mul(self, a: int, b: int) -> int:
+        return 0 if a == 0 or b == 0 else self.exp[self.log[a] + self.log[b]]
+
+    def pow(self, x: int, p: int) -> int:
+        return self.exp[(self.log[x] * p) % self.q]
+
+    def inv(self, x: int) -> int:
+        return self.exp[self.q - self.log[x]]
+
+    def vmul(self, a, b):
+        """Element-wise product of integer arrays (broadcasting)."""
+        a, b = np.asarray(a, dtype=np.int64), np.asarray(b, dtype=np.int64)
+        return np.where((a == 0) | (b == 0), 0, self._exp[self._log[a] + self._log[b]])
+
+    def poly_scale(self, p, x):
+        return [self.mul(c, x) for c in p]
+
+    def poly_add(self, p, q):
+        r = [0] * max(len(p), len(q))
+        for i, c in enumerate(p):
+            r[i + len(r) - len(p)] = c
+        for i, c in enumerate(q):
+            r[i + len(r) - len(q)] ^= c
+        return r
+
+    def poly_mul(self, p, q):
+        r = [0] * (len(p) + len(q) - 1)
+        for j, b in enumerate(q):
+            for i, a in enumerate(p):
+                r[i + j] ^= self.mul(a, b)
+        return r
+
+    def poly_eval(self, p, x):
+        y = p[0]
+        for c in p[1:]:
+            y = self.mul(y, x) ^ c
+        return y
+
+    def poly_div(self, dividend, divisor):
+        out = list(dividend)
+        for i in range(len(dividend) - len(divisor) + 1):
+            coef = out[i]
+            if coef:
+                for j in range(1, len(divisor)):
+                    if divisor[j]:
+                        out[i + j] ^= self.mul(divisor[j], coef)
+        sep = -(len(divisor) - 1)
+        return out[:sep], out[sep:]
+
+_fields = {}
+
+def field(m: int) -> GF:
+    f = _fields.get(m)
+    if f is None:
+        f = _fields[m] = GF(m)
+    return f
+
+# ───────── per-block decoder ───────── #
+def _syndromes(gf, msg, nsym):
+    return [0] + [gf.poly_eval(msg, gf.pow(2, i)) for i in range(nsym)]
+
+def _forney_syndromes(gf, synd, pos, n):
+    fsynd = list(synd[1:])
+    for p in pos:
+        x = gf.pow(2, n - 1 - p)
+        for j in range(len(fsynd) - 1):
+            fsynd[j] = gf.mul(fsynd[j], x) ^ fsynd[j + 1]
+    return fsynd
+
+def _error_locator(gf, synd, nsym, erase_count):
+    err_loc, old_loc = [1], [1]
+    for i in range(nsym - erase_count):
+        delta = synd[i]
+        for j in range(1, len(err_loc)):
+            delta ^= gf.mul(err_loc[-(j + 1)], synd[i - j])
+        old_loc = old_loc + [0]
+        if delta:
+            if len(old_loc) > len(err_loc):
+                new_loc = gf.poly_scale(old_loc, delta)
+                old_loc = gf.poly_scale(err_loc, gf.inv(delta))
+                err_loc = new_loc
+            err_loc = gf.poly_add(err_loc, gf.poly_scale(old_loc, delta))
+    while err_loc and err_loc[0] == 0:
+        del err_loc[0]
+    errs = len(err_loc) - 1
+    if errs * 2 + erase_count > nsym:
+        raise ReedSolomonError("too many errors")
+    return err_loc
+
+def _find_errors(gf, err_loc, n):
+    errs = len(err_loc) - 1
+    pos = [n - 1 - i for i in range(n) if gf.poly_eval(err_loc, gf.pow(2, i)) == 0]
+    if len(pos) != errs:
+        raise ReedSolomonError("Chien search found the wrong number of roots")
+    return pos
+
+def _correct_errata(gf, msg, synd, err_pos):
+    coef_pos = [len(msg) - 1 - p for p in err_pos]
+    loc = [1]
+    for i in coef_pos:
+        loc = gf.poly_mul(loc, gf.poly_add([1], [gf.pow(2, i), 0]))
+    _, ev = gf.poly_div(gf.poly_mul(synd[::-1], loc), [1] + [0] * len(loc))
+    ev = ev[::-1]
+    X = [gf.pow(2, p) for p in coef_pos]
+    out = list(msg)
+    for i, Xi in enumerate(X):
+        Xi_inv = gf.inv(Xi)
+        prime = 1
+        for j, Xj in enumerate(X):
+            if j != i:
+                prime = gf.mul(prime, 1 ^ gf.mul(Xi_inv, Xj))
+        if prime == 0:
+            raise ReedSolomonError("could not locate errata")
+        y = gf.mul(Xi, gf.poly_eval(ev[::-1], Xi_inv))
+        out[err_pos[i]] ^= gf.mul(y, gf.inv(prime))
+    return out
+
+def _correct_block(gf, msg, nsym, erase_pos):
+    msg = list(msg)
+    for p in erase_pos:
+        msg[p] = 0
+    if len(erase_pos) > nsym:
+        raise ReedSolomonError("too many erasures")
+    synd = _syndromes(gf, msg, nsym)
+    if max(synd) == 0:
+        return msg
+    fsynd   = _forney_syndromes(gf, synd, erase_pos, len(msg))
+    err_loc = _error_locator(gf, fsynd, nsym, len(erase_pos))
+    err_pos = _find_errors(gf, err_loc[::-1], len(msg))
+    msg = _correct_errata(gf, msg, synd, list(erase_pos) + err_pos)
+    if max(_syndromes(gf, msg, nsym)) != 0:
+        raise ReedSolomonError("could not correct block")
+    return msg
+
+# ───────── block code + interleaver ───────── #
+class RSCode:
+    def __init__(self, n: int, k: int, m: int = 8):
+        self.gf = field(m)
+        if not 0 < k < n <= self.gf.q:
+            raise ValueError(f"RS(n, k) over GF(2^{m}) needs 0 < k < n <= {self.gf.q}")
+        self.n, self.k, self.m, self.nsym = n, k, m, n - k
+        gen = [1]
+        for i in range(self.nsym):
+            gen = self.gf.poly_mul(gen, [1, self.gf.pow(2, i)])
+        self._gen_tail = np.array(gen[1:], dtype=np.int64)
+        self._roots    = self.gf._exp[np.arange(self.nsym)]     # α^0 .. α^(nsym-1)
+
+    def __str__(self):
+        return f"rs:{self.n}:{self.k}"
+
+    def padded_len(self, nsyms: int) -> int:
+        return -(-nsyms // self.k) * self.k
+
+    def encode(self, data) -> np.ndarray:
+        """Zero-pad to whole blocks, encode, interleave column-major."""
+        d = np.asarray(data, dtype=np.int64)
+        d = np.concatenate((d, np.zeros(self.padded_len(len(d)) - len(d), dtype=np.int64)))
+        msg = d.reshape(-1, self.k)
+        rem = np.zeros((len(msg), self.nsym), dtype=np.int64)
+        for j in range(self.k):
+            fb  = msg[:, j] ^ rem[:, 0]
+            rem = np.concatenate((rem[:, 1:], np.zeros((len(msg), 1), dtype=np.int64)), axis=1)
+            rem ^= self.gf.vmul(fb[:, None], self._gen_tail[None, :])
+        return np.concatenate((msg, rem), axis=1).T.ravel()
+
+    def decode(self, stream, erasures=()) -> tuple:
+        """(data symbols, corrected symbol count, failed blocks).
+
+        `stream` is the interleaved codeword stream; symbols beyond the last
+        whole set of codewords are ignored. `erasures` are offsets into
+        `stream` known to be unreliable.
+        """
+        stream = np.asarray(stream, dtype=np.int64) & self.gf.q
+        blocks = len(stream) // self.n
+        if blocks == 0:
+            return np.zeros(0, dtype=np.int64), 0, 0
+        cw  = stream[:blocks * self.n].reshape(self.n, blocks).T.copy()
+        era = [set() for _ in range(blocks)]
+        for p in erasures:
+            if p < blocks * self.n:
+                era[p % blocks].add(p // blocks)
+        synd = np.zeros((blocks, self.nsym), dtype=np.int64)
+        for j in range(self.n):                    # Horner, all blocks and roots at once
+            synd = self.gf.vmul(synd, self._roots[None, :]) ^ cw[:, j:j + 1]
+        dirty = np.flatnonzero(synd.any(axis=1) | np.array([bool(e) for e in era]))
+        fixed = failed = 0
+        for b in dirty.tolist():
+            try:
+                out = _correct_block(self.gf, cw[b].tolist(), self.nsym, sorted(era[b]))
+            except ReedSolomonError:
+                failed += 1
+                continue
+            fixed += int(np.count_nonzero(cw[b] != out))
+            cw[b] = out
+        return cw[:, :self.k].ravel(), fixed, failed
+
+# ───────── message bytes <-> channel symbols ───────── #
+class ChannelFEC:
+    """RS code matched to the channel's symbol width.
+
+    3..8-bit symbols: the message's own symbols are the code symbols, over
+    GF(2^bits). Other widths: GF(2^8) over bytes, each byte on its own
+    ceil(8/bits) channel symbols (codec.*_aligned).
+    """
+
+    def __init__(self, n: int, k: int, bits: int):
+        self.bits = bits
+        self.m    = bits if 3 <= bits <= 8 else 8
+        self.code = RSCode(n, k, self.m)
+
+    def __str__(self):
+        return str(self.code)
+
+    def encode(self, data: bytes) -> np.ndarray:
+        if self.m == self.bits:
+            return self.code.encode(bytes_to_symbols(data, self.bits))
+        cw = self.code.encode(np.frombuffer(data, dtype=np.uint8))
+        return bytes_to_symbols_aligned(cw.astype(np.uint8).tobytes(), self.bits)
+
+    def data_bits(self, nbytes: int) -> int:
+        """Whole message bytes per transmission, block padding included and
+        parity excluded, in bits (what decode() hands back)."""
+        nsyms = -(-nbytes * 8 // self.m)
+        return self.code.padded_len(nsyms) * self.m // 8 * 8
+
+    def decode(self, symbols, erased=()) -> tuple:
+        """(message bytes, corrected code symbols, failed blocks)."""
+        if self.m == self.bits:
+            d, fixed, failed = self.code.decode(symbols, erased)
+            return symbols_to_bytes(d, self.bits), fixed, failed
+        per = -(-8 // self.bits) if self.bits < 8 else None
+        era = set()
+        for i in erased:
+            if per:
+                era.add(i // per)
+            else:
+                era.update(range(i * self.bits // 8, ((i + 1) * self.bits - 1) // 8 + 1))
+        stream = np.frombuffer(symbols_to_bytes_aligned(symbols, self.bits), dtype=np.uint8)
+        d, fixed, failed = self.code.decode(stream, sorted(era))
+        return d.astype(np.uint8).tobytes(), fixed, failed
+
+def parse_fec(spec: str, bits: int):
+    """'none' -> None, 'rs:N:K' -> ChannelFEC(N, K, bits)."""
+    if not spec or spec == "none":
+        return None
+    kind, *args = spec.split(":")
+    if kind != "rs" or len(args) != 2:
+        raise ValueError(f"unknown FEC spec {spec!r} (want none or rs:N:K)")
+    return ChannelFEC(int(args[0]), int(args[1]), bits)
@@ -1,28 +1,67 @@
 #!/usr/bin/env python3
-import socket, os, csv, pathlib, time
+import socket, os, sys, csv, pathlib, time, argparse, threading
 
-def start_udp_listener():
+def start_udp_listener(stop=None, sock=None):
     csv_name = "receiver_ben_log.csv"
     if not pathlib.Path(csv_name).exists():
         with open(csv_name, "w", newline="") as f:
             csv.writer(f).writerow(["ts", "src", "bytes", "service"])
 
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("", 8888))
-    print("UDP listener started on port 8888")
+    if sock is None:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("", 8888))
+    print("UDP listener started on port 8888", flush=True)
 
-    while True:
-        data, address = sock.recvfrom(4096)
+    while stop is None or not stop.is_set():
+        try:
+            data, address = sock.recvfrom(4096)
+        except socket.timeout:
+            continue
         t0 = time.time()
         sent = sock.sendto(data, address)
         t1 = time.time()
         srv = t1 - t0
-        print(f"RX {len(data)}B → TX {sent}B  service={srv:.3f}s")
+        print(f"RX {len(data)}B → TX {sent}B  service={srv:.3f}s", flush=True)
 
         with open(csv_name, "a", newline="") as f:
             csv.writer(f).writerow(
                 [f"{t1:.6f}", address[0], len(data), f"{srv:.4f}"]
             )
 
+def daemon(path: str):
+    """start binds port 8888 and echoes in a thread; stop closes it again, so
+    nothing answers on 8888 between benign slices (as when the process was killed)."""
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from covert.ctl import serve
+    job = {}
+
+    def start(params):
+        stop(params)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("", 8888))
+        sock.settimeout(0.1)
+        ev = threading.Event()
+        t  = threading.Thread(target=start_udp_listener, args=(ev, sock), daemon=True)
+        job.update(sock=sock, ev=ev, thread=t)
+        t.start()
+        return {}
+
+    def stop(params):
+        if job:
+            job["ev"].set()
+            job["thread"].join()
+            job["sock"].close()
+            job.clear()
+        return {}
+
+    serve(path, {"start": start, "stop": stop})
+
 if __name__ == "__main__":
-    start_udp_listener()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--daemon", default="", metavar="SOCK",
+                    help="take start/stop commands on this unix socket (see covert/ctl.py)")
+    args = ap.parse_args()
+    if args.daemon:
+        daemon(args.daemon)
+    else:
+        start_udp_listener()
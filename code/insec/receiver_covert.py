@@ -1,151 +1,486 @@
 #!/usr/bin/env python3
-import os, sys, time, argparse, signal, csv, pathlib, random, hashlib
+import os, sys, time, argparse, signal, csv, pathlib, random, socket, threading, queue
 from datetime import datetime
 from collections import Counter
-from scapy.all import sniff, IP, UDP, raw
+import numpy as np
+from ringcap import RingCapture, bpf_udp_port_src
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from covert.codec import (scramble, bits_to_text, alphabet,
+                          parse_tag, merge_stripes, ipid_to_seq)
+from covert.fec import parse_fec
+from covert.arq import pack_sack, sack_bitmap, ACK_PORT
+from covert.bulk import BulkWriter, CHUNK
+from covert.ctl import serve, coerce
+from covert.csvlog import start_log
 
-# ── SCRAMBLE SETTINGS (must match sender) ─────────────────────────────────
-SESSION_KEY = b"2444172"
-def make_mask(idx: int, bits: int) -> int:
-    data = SESSION_KEY + str(idx).encode()
-    digest = hashlib.sha256(data).digest()
-    return int.from_bytes(digest, byteorder='big') % (1 << bits)
+CSV_NAME   = "receiver_log.csv"
+CSV_HEADER = ["run_idx","nop_bits","pps","port","iface",
+              "bits","duration","bps","message","timestamp","flows","encoding","fec","gaps"]
 
-def count_nops(pkt) -> int:
+def pkt_opts(pkt) -> bytes:
+    from scapy.all import IP, raw
     if not pkt.haslayer(IP):
-        return 0
-        
-    # Extract options more reliably
+        return b""
     ip_layer = pkt[IP]
-    if ip_layer.ihl <= 5:
-        return 0
-        
-    options = raw(ip_layer)[4*5:4*ip_layer.ihl]
-    
-    # Handle timestamp option
-    if len(options) >= 4 and options[0] == 0x44:
-        options = options[4:]
-        
-    return options.count(0x01)
-
-def bits_to_text(symbols, bits_per_symbol):
-    bitstr = ''.join(f'{s:0{bits_per_symbol}b}' for s in symbols)
-    bitstr = bitstr[: len(bitstr) - (len(bitstr) % 8)]
-    return ''.join(
-        chr(int(bitstr[i:i+8], 2)) for i in range(0, len(bitstr), 8)
-    ).rstrip('\x00')
+    return raw(ip_layer)[4*5:4*ip_layer.ihl]
 
-def main():
+def frame_opts(frame, port: int):
+    """IP option bytes of a raw Ethernet frame; None if not UDP to `port`."""
+    ip  = 14
+    ihl = (frame[ip] & 0x0F) * 4
+    if frame[ip + 9] != 17 or len(frame) < ip + ihl + 4:
+        return None
+    if (frame[ip + ihl + 2] << 8 | frame[ip + ihl + 3]) != port:
+        return None
+    return frame[ip + 20:ip + ihl]
+
+def frame_ipid(frame) -> int:
+    return frame[18] << 8 | frame[19]
+
+def frame_payload(frame) -> bytes:
+    """UDP payload of a raw Ethernet/IPv4 frame (Ethernet padding stripped)."""
+    ip  = 14
+    ihl = (frame[ip] & 0x0F) * 4
+    tot = frame[ip + 2] << 8 | frame[ip + 3]
+    return bytes(frame[ip + ihl + 8:ip + tot])
+
+class Stream:
+    """START/END framed, pps-voted symbol stream of one flow (still masked)."""
+
+    def __init__(self, start: int, end: int, pps: int, clock=time.time):
+        self.START, self.END, self.pps, self.clock = start, end, pps, clock
+        self.state, self.pkbuf, self.symbols, self.t0 = "waiting", [], [], None
+        self.start_seen = self.end_seen = 0
+
+    def feed(self, val: int) -> bool:
+        """True once the third END marker closes the stream."""
+        if self.state == "waiting":
+            if val == self.START:
+                self.start_seen += 1
+                if self.start_seen == 3:
+                    self.state, self.pkbuf, self.symbols = "recv", [], []
+                    self.t0 = self.clock()
+                    self.start_seen = 0
+            return False
+
+        if val == self.END:
+            self.end_seen += 1
+            if self.end_seen == 3:
+                self.state    = "waiting"
+                self.end_seen = 0
+                return True
+            return False
+
+        if val == self.START:
+            return False
+
+        self.pkbuf.append(val)
+        while len(self.pkbuf) >= self.pps:
+            block = self.pkbuf[:self.pps]
+            self.symbols.append(Counter(block).most_common(1)[0][0])
+            del self.pkbuf[:self.pps]
+        return False
+
+class SeqRun:
+    """Symbols placed by sequence index (IP ID), tolerant of loss and reordering.
+
+    Complete once every index has `pps` copies, or, after the first END
+    marker, at least one copy. Whatever is still missing when the caller
+    gives up is a gap (-1 symbol, an erasure under FEC).
+    """
+
+    def __init__(self, pps: int, clock=time.time):
+        self.pps, self.total, self.end_at = pps, None, None
+        self.nflows, self.clock = 1, clock
+        self.t0    = clock()
+        self.votes = {}             # index -> [values]
+        self.full  = 0              # indices with pps copies
+        self.top   = 0
+        self.cum   = 0              # first missing index (cumulative ACK)
+        self.fresh = 0              # data packets since the last SACK
+
+    def marker(self, total, end: bool):
+        if total is not None:
+            self.total = total
+        if end and self.end_at is None:
+            self.end_at = self.clock()
+
+    def add(self, ipid: int, val: int):
+        idx = ipid_to_seq(ipid, self.top)
+        if idx < 0 or (self.total is not None and idx >= self.total):
+            return
+        self.top = max(self.top, idx)
+        self.fresh += 1
+        v = self.votes.setdefault(idx, [])
+        v.append(val)
+        if len(v) == self.pps:
+            self.full += 1
+        while self.cum in self.votes:
+            self.cum += 1
+
+    def sack(self, nbytes: int) -> tuple:
+        """(cumulative base, bitmap) for a selective ACK."""
+        self.fresh = 0
+        return self.cum, sack_bitmap(self.votes, self.cum, nbytes)
+
+    def complete(self) -> bool:
+        if self.total is None:
+            return False
+        return self.full == self.total or (self.end_at is not None and len(self.votes) == self.total)
+
+    def symbols(self) -> tuple:
+        """(masked symbols with -1 for gaps, gap count)."""
+        n   = self.total if self.total is not None else self.top + 1
+        out = [Counter(self.votes[i]).most_common(1)[0][0] if i in self.votes else -1
+               for i in range(n)]
+        return out, n - sum(1 for i in range(n) if i in self.votes)
+
+def parser():
     ap = argparse.ArgumentParser()
     ap.add_argument("--repeat",    type=int,   default=1,
                     help="Capture this many messages before quitting")
     ap.add_argument("--nop-bits",  dest="nop_bits", type=int, default=3,
-                    help="Bits per symbol (max 5)")
+                    help="Bits per symbol (max 5 for --encoding nop, 60 for ts)")
+    ap.add_argument("--encoding",  choices=("nop", "ts"), default="nop",
+                    help="must match the sender's --encoding")
+    ap.add_argument("--fec",       default="none",
+                    help="must match the sender's --fec (none or rs:N:K)")
     ap.add_argument("--pps",       type=int,   default=1,
                     help="Packets per symbol expected")
+    ap.add_argument("--seq",       action="store_true",
+                    help="place symbols by the sender's IP ID sequence numbers")
+    ap.add_argument("--grace",     type=float, default=1.0,
+                    help="--seq: seconds to wait for stragglers after END")
+    ap.add_argument("--arq",       action="store_true",
+                    help="send selective ACKs to the sender (implies --seq, one copy per symbol)")
+    ap.add_argument("--ack-port",  type=int,   default=ACK_PORT,
+                    help="--arq: sender's UDP port for SACKs")
+    ap.add_argument("--ack-every", type=int,   default=16,
+                    help="--arq: SACK after this many data packets (and on every poll)")
+    ap.add_argument("--sack-bytes", type=int,  default=32,
+                    help="--arq: bitmap bytes per SACK (8 indices each)")
+    ap.add_argument("--out",       default="",
+                    help="bulk mode: write decoded bytes to this file as they arrive "
+                         "(.N appended per run with --repeat > 1)")
+    ap.add_argument("--chunk",     type=int,   default=CHUNK,
+                    help="--out: the sender's --chunk (only matters under --fec)")
+    ap.add_argument("--progress",  type=float, default=1.0,
+                    help="--out: seconds between progress lines (0 = off)")
     ap.add_argument("--done-flag", default="",
                     help="Touch this file when message completes")
     ap.add_argument("--port",      type=int,   default=8888)
     ap.add_argument("--timeout",   type=int,   default=60)
     ap.add_argument("-i", "--iface", default=os.getenv("SNIFF_IFACE", "eth0"))
-    args = ap.parse_args()
+    ap.add_argument("--capture", choices=("ring", "scapy"), default="ring",
+                    help="ring: AF_PACKET TPACKET_V3 mmap ring; scapy: sniff()")
+    ap.add_argument("--daemon",    default="", metavar="SOCK",
+                    help="stay up and take start/wait commands on this unix socket (see covert/ctl.py)")
+    return ap
 
-    if args.nop_bits > 5:
-        sys.exit("receiver supports ≤ 5 bits per symbol")
+def log_row(row: list):
+    with open(CSV_NAME, "a", newline="") as f:
+        csv.writer(f).writerow(row)
 
-    START, END = (1 << args.nop_bits), (1 << args.nop_bits) + 1
+class Decoder:
+    """Decoding state of one capture, independent of where frames come from.
 
-    csv_name = "receiver_log.csv"
-    if not pathlib.Path(csv_name).exists():
-        with open(csv_name, "w", newline="") as f:
-            csv.writer(f).writerow([
-                "run_idx","nop_bits","pps","port","iface",
-                "bits","duration","bps","message","timestamp"
-            ])
+    on_frame() takes raw Ethernet frames, on_value() an already decoded
+    option value with its UDP payload and IP ID; tick() closes --seq runs
+    whose grace time is up. Every decoded message is printed, handed to
+    `log` as a receiver_log.csv row and appended to .results. `clock` is
+    time.time for a live capture (simulate.py passes its virtual clock);
+    `send_sack(rid, base, bitmap)` answers --arq senders.
+    Raises ValueError on a bad configuration.
+    """
 
-    runs, state, pkbuf, symbols, t0 = 0, "waiting", [], [], None
-    start_seen, end_seen = 0, 0
-    done = {"stop": False}
+    def __init__(self, args, clock=time.time, log=log_row, send_sack=None):
+        self.alpha = alphabet(args.nop_bits, args.encoding)
+        self.code  = parse_fec(args.fec, args.nop_bits)
+        self.START, self.END = self.alpha.START, self.alpha.END
+        if args.arq:
+            args.seq, args.pps = True, 1
+        if args.out and args.seq:
+            raise ValueError("--out streams one framed flow (no --seq or --arq)")
+        self.args, self.clock, self.log = args, clock, log
+        self.send_sack = send_sack or (lambda *_: None)
+        self.bulk = (BulkWriter(args.out, args.nop_bits, self.code, args.chunk, args.progress)
+                     if args.out else None)
+        self.results = []
+        self.runs    = 0
+        self.done    = False
+        self.streams = {}           # stripe index -> Stream
+        self.closed  = {}           # stripe index -> (t0, masked symbols) of a finished stripe
+        self.seqruns = {}           # --seq: run id -> SeqRun
+        self.seqdone = {}           # --seq: run id -> length, of runs already reported
 
-    def finish():
-        nonlocal runs, symbols, t0
-        if not symbols:
+    def finish(self, t0, masked, nflows, gaps=0):
+        args, bulk, code = self.args, self.bulk, self.code
+        if not masked and (bulk is None or bulk.f is None):
             return
-        runs += 1
-        dur  = time.time() - t0
-        bits = len(symbols) * args.nop_bits
-        bps  = bits / dur
-        msg  = bits_to_text(symbols, args.nop_bits)
-        print(f"[run {runs}/{args.repeat}] {bits} bits in {dur:.2f}s → {bps:.2f} bps  msg={msg!r}")
-
-        with open(csv_name, "a", newline="") as f:
-            csv.writer(f).writerow([
-                runs, args.nop_bits, args.pps, args.port, args.iface,
-                bits, f"{dur:.4f}", f"{bps:.2f}", msg,
-                datetime.now().isoformat()
-            ])
+        self.runs += 1
+        masked  = np.asarray(masked, dtype=np.int64)
+        now  = self.clock()
+        dur  = now - t0
+        note = ""
+        if bulk is not None:                            # rest of the stream, then close
+            bits, note = bulk.close(masked)             # unscrambles at its own offset
+            msg  = bulk.path
+        else:
+            erased  = np.flatnonzero(masked < 0)        # undecodable options
+            symbols = scramble(np.where(masked < 0, 0, masked), args.nop_bits)   # unscramble (XOR)
+            if code is not None:
+                data, fixed, failed = code.decode(symbols, erased.tolist())
+                bits = len(data) * 8
+                msg  = data.decode("latin-1").rstrip("\x00")
+                note = f"  fec: {fixed} symbols fixed, {failed} blocks failed"
+            else:
+                bits = len(symbols) * args.nop_bits
+                msg  = bits_to_text(symbols, args.nop_bits)
+        bps  = bits / dur if dur > 0 else 0.0          # START..END within one clock tick
+        if args.seq:
+            note = f"  gaps: {gaps}" + note
+        print(f"[run {self.runs}/{args.repeat}] {bits} bits in {dur:.2f}s → {bps:.2f} bps  msg={msg!r}{note}")
+
+        self.log([
+            self.runs, args.nop_bits, args.pps, args.port, args.iface,
+            bits, f"{dur:.4f}", f"{bps:.2f}", msg,
+            datetime.fromtimestamp(now).isoformat(), nflows, args.encoding, args.fec, gaps
+        ])
+        self.results.append({"bits": bits, "duration": round(dur, 4), "bps": round(bps, 2),
+                             "message": msg, "gaps": gaps})
 
         if args.done_flag:
             pathlib.Path(args.done_flag).touch()
-        symbols.clear()
+        self.done = self.runs >= args.repeat
 
-        if runs >= args.repeat:
-            done["stop"] = True
-        else:
-            signal.alarm(args.timeout)
+    def close_seq(self, rid):
+        run = self.seqruns.pop(rid)
+        masked, gaps = run.symbols()
+        self.seqdone[rid] = len(masked)
+        if self.args.arq:
+            self.send_sack(rid, len(masked))
+        self.finish(run.t0, masked, run.nflows, gaps)
 
-    def handler(pkt):
-        nonlocal state, pkbuf, symbols, t0, start_seen, end_seen
+    def tick(self):
+        args, now = self.args, self.clock()
+        for rid, run in list(self.seqruns.items()):
+            if run.end_at is not None and now - run.end_at > args.grace:
+                self.close_seq(rid)
+            elif args.arq and run.fresh:
+                self.send_sack(rid, *run.sack(args.sack_bytes))
 
-        if UDP not in pkt or pkt[UDP].dport != args.port:
+    def on_seq(self, val, payload, ipid):
+        # place by index; markers carry the length, the tag carries the run id
+        args = self.args
+        _, nflows, total, rid = parse_tag(payload)
+        if rid is None:
             return
-        val = count_nops(pkt)
-
-        if state == "waiting":
-            if val == START:
-                start_seen += 1
-                if start_seen == 3:
-                    state, pkbuf, symbols = "recv", [], []
-                    t0 = time.time()
-                    start_seen = 0
+        if rid in self.seqdone:
+            if args.arq:                    # our final SACK was lost: repeat it
+                self.send_sack(rid, self.seqdone[rid])
             return
+        run = self.seqruns.get(rid)
+        if run is None:
+            run = self.seqruns[rid] = SeqRun(args.pps, self.clock)
+        run.nflows = nflows
+        if val in (self.START, self.END):
+            run.marker(total, val == self.END)
+        else:
+            run.add(ipid, val)
+        if run.complete():
+            self.close_seq(rid)
+        elif args.arq and run.fresh >= args.ack_every:
+            self.send_sack(rid, *run.sack(args.sack_bytes))
 
-        if state == "recv":
-            if val == END:
-                end_seen += 1
-                if end_seen == 3:
-                    state    = "waiting"
-                    end_seen = 0
-                    finish()
-                return
-
-            if val in (START, END):
-                return
+    def on_value(self, val, payload=b"", ipid=0):
+        args, bulk = self.args, self.bulk
+        if val < 0 and self.code is None:
+            return
+        if args.seq:
+            return self.on_seq(val, payload, ipid)
+        # demultiplex by stripe; merge once every stripe of the run has closed
+        k, nflows, total, _ = parse_tag(payload)
+        st = self.streams.get(k)
+        if st is None:
+            st = self.streams[k] = Stream(self.START, self.END, args.pps, self.clock)
+        if bulk is not None and val == self.END and total is not None:
+            bulk.size = total                   # payload length, only END knows it
+        closing = st.feed(val)
+        if bulk is not None and st.state == "recv":
+            if bulk.f is None:
+                bulk.open(args.out if args.repeat == 1 else f"{args.out}.{self.runs + 1}")
+            # hand voted symbols over in batches instead of keeping them all
+            if len(st.symbols) >= bulk.batch:
+                bulk.feed(st.symbols)
+                st.symbols.clear()
+            bulk.pending(len(st.symbols))
+        if not closing:
+            return
+        closed = self.closed
+        closed[k] = (st.t0, st.symbols)
+        if all(i in closed for i in range(nflows)):
+            parts = [closed.pop(i) for i in range(nflows)]
+            closed.clear()
+            self.finish(min(t0 for t0, _ in parts),
+                        merge_stripes([syms for _, syms in parts]), nflows)
 
-            pkbuf.append(val)
-            while len(pkbuf) >= args.pps:
-                block = pkbuf[:args.pps]
-                voted = Counter(block).most_common(1)[0][0]
-                # Unscramble the masked symbol
-                idx = len(symbols)
-                plain = voted ^ make_mask(idx, args.nop_bits)
-                symbols.append(plain)
-                del pkbuf[:args.pps]
+    def on_frame(self, frame):
+        opts = frame_opts(frame, self.args.port)
+        if opts is not None and not self.done:
+            self.on_value(self.alpha.decode(opts), frame_payload(frame), frame_ipid(frame))
 
-    signal.signal(signal.SIGALRM, lambda *_: done.__setitem__("stop", True))
-    signal.alarm(args.timeout)
+def receive(args, ready=None, halt=None) -> list:
+    """Capture and decode up to args.repeat messages; one result dict per message.
 
-    print(f"[*] Sniffing UDP/{args.port} on {args.iface}")
+    `ready` (an Event) is set once the capture is attached; setting `halt`
+    ends the capture early. Raises ValueError on a bad configuration.
+    """
     sec_ip = os.getenv("SECURENET_HOST_IP", "10.0.0.20")
+    acksock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM) if args.arq else None
+
+    def send_sack(rid, base, bitmap=b""):
+        try:
+            acksock.sendto(pack_sack(rid, base, bitmap), (sec_ip, args.ack_port))
+        except OSError:
+            pass
+
+    dec  = Decoder(args, send_sack=send_sack)
+    done = {"stop": False, "runs": 0}
+    # per-message timeout; SIGALRM additionally unblocks sniff() in the main thread
+    deadline = [time.time() + args.timeout]
+    use_alarm = threading.current_thread() is threading.main_thread()
+
+    def rearm():
+        deadline[0] = time.time() + args.timeout
+        if use_alarm:
+            signal.alarm(args.timeout)
+
+    def stop():
+        if args.seq:
+            dec.tick()
+        if dec.runs != done["runs"]:            # a message finished: next one's timeout
+            done["runs"] = dec.runs
+            if not dec.done:
+                rearm()
+        if dec.done or time.time() > deadline[0] or (halt is not None and halt.is_set()):
+            done["stop"] = True
+        return done["stop"]
+
+    if use_alarm:
+        signal.signal(signal.SIGALRM, lambda *_: done.__setitem__("stop", True))
+    rearm()
+
+    print(f"[*] Sniffing UDP/{args.port} on {args.iface}", flush=True)
     pcap_filter = f"udp and port {args.port} and src host {sec_ip}"
 
-    sniff(
-        iface=args.iface,
-        filter=pcap_filter,
-        prn=handler,
-        store=False,
-        stop_filter=lambda *_: done["stop"]
-    )
+    if args.capture == "scapy":
+        from scapy.all import AsyncSniffer, IP, UDP
+
+        def handler(pkt):
+            if UDP not in pkt or pkt[UDP].dport != args.port or dec.done:
+                return
+            dec.on_value(dec.alpha.decode(pkt_opts(pkt)), bytes(pkt[UDP].payload), pkt[IP].id)
+
+        # the sniffer thread only queues packets: decoding and stop() stay
+        # here, and stop() runs every 0.1 s even when nothing arrives, so a
+        # timeout or `halt` ends an idle capture too
+        pkts = queue.Queue()
+        sn = AsyncSniffer(
+            iface=args.iface,
+            filter=pcap_filter,
+            prn=pkts.put,
+            store=False,
+            started_callback=ready.set if ready is not None else None
+        )
+        sn.start()
+        try:
+            while not stop() and sn.thread.is_alive():
+                try:
+                    handler(pkts.get(timeout=0.1))
+                except queue.Empty:
+                    pass
+        finally:
+            if sn.running:
+                sn.stop()
+            else:
+                sn.join()
+            if acksock is not None:
+                acksock.close()
+        return dec.results
+
+    def on_frame(frame):
+        if not done["stop"]:
+            dec.on_frame(frame)
+
+    cap = RingCapture(args.iface, bpf_udp_port_src(args.port, sec_ip))
+    if ready is not None:
+        ready.set()
+    try:
+        cap.loop(on_frame, stop=stop)
+    finally:
+        pkts, drops = cap.stats()
+        print(f"[*] capture: {pkts} packets, {drops} dropped by kernel", flush=True)
+        cap.close()
+        if acksock is not None:
+            acksock.close()
+    return dec.results
+
+def daemon(args):
+    """Serve start/wait: "start" arms a capture and returns once it is attached,
+    "wait" blocks until that capture has decoded its messages or timed out."""
+    job = {}
+
+    def start(params):
+        if job.get("thread") is not None and job["thread"].is_alive():
+            job["halt"].set()
+            job["thread"].join()
+        cfg = coerce(args, params)
+        ready, halt, box = threading.Event(), threading.Event(), {}
+
+        def work():
+            try:
+                box["results"] = receive(cfg, ready, halt)
+            except (ValueError, OSError) as e:
+                box["error"] = str(e)
+            finally:
+                ready.set()
+
+        t = threading.Thread(target=work, daemon=True)
+        job.update(thread=t, halt=halt, box=box)
+        t.start()
+        ready.wait()
+        if "error" in box:
+            raise ValueError(box["error"])
+        return {}
+
+    def wait(params):
+        t = job.get("thread")
+        if t is None:
+            raise ValueError("no capture started")
+        t.join(params.get("timeout"))
+        if t.is_alive():                    # give up: stop the capture, keep what it has
+            job["halt"].set()
+            t.join()
+        box = job.pop("box")
+        job.clear()
+        if "error" in box:
+            raise ValueError(box["error"])
+        res = box.get("results", [])
+        return {"done": len(res) > 0, "runs": res}
+
+    serve(args.daemon, {"start": start, "wait": wait})
+
+def main():
+    args = parser().parse_args()
+    moved = start_log(CSV_NAME, CSV_HEADER)
+    if moved:
+        print(f"{CSV_NAME} had an older header, moved to {moved}")
+    if args.daemon:
+        return daemon(args)
+    try:
+        receive(args)
+    except ValueError as e:
+        sys.exit(str(e))
 
 if __name__ == "__main__":
     main()
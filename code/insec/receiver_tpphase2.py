@@ -2,16 +2,12 @@ import os, sys, time, argparse, signal, csv, pathlib
 from datetime import datetime
 from collections import Counter
 from scapy.all import sniff, IP, UDP, raw
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from covert.codec import bits_to_text, framing, opt_nops
 
 def count_nops(pkt) -> int:
     ihl = pkt[IP].ihl
-    return 0 if ihl <= 5 else raw(pkt[IP])[20:20 + (ihl - 5) * 4].count(0x01)
-
-def bits_to_text(symbols, bits_per_symbol):
-    bitstr = ''.join(f'{s:0{bits_per_symbol}b}' for s in symbols)
-    bitstr = bitstr[: len(bitstr) - (len(bitstr) % 8)]        
-    return ''.join(chr(int(bitstr[i:i+8], 2))                 
-                    for i in range(0, len(bitstr), 8)).rstrip('\x00')
+    return 0 if ihl <= 5 else opt_nops(raw(pkt[IP])[20:20 + (ihl - 5) * 4], skip_ts=False)
 
 def main():
     ap = argparse.ArgumentParser()
@@ -31,7 +27,7 @@ def main():
     if args.nop_bits > 5:
         sys.exit("receiver supports ≤ 5 bits per symbol")
 
-    START, END = (1 << args.nop_bits), (1 << args.nop_bits) + 1
+    START, END = framing(args.nop_bits)
 
     csv_name = "receiver_log.csv"
     if not pathlib.Path(csv_name).exists():
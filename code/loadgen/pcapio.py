@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+pcapio.py  –  minimal stdlib reader for pcap and pcapng (Ethernet only)
+
+read_frames(path) yields (timestamp_sec, frame_bytes) in file order;
+write_frames(path, frames) writes such pairs as a microsecond pcap.
+"""
+
+import struct
+
+LINKTYPE_ETHERNET = 1
+
+_PCAP_MAGIC = {
+    b"\xd4\xc3\xb2\xa1": ("<", 1e-6), b"\xa1\xb2\xc3\xd4": (">", 1e-6),
+    b"\x4d\x3c\xb2\xa1": ("<", 1e-9), b"\xa1\xb2\x3c\x4d": (">", 1e-9),
+}
+_PCAPNG_SHB = 0x0A0D0D0A
+
+def _read_pcap(f, head):
+    end, res = _PCAP_MAGIC[head[:4]]
+    rest = f.read(20)
+    linktype = struct.unpack(end + "I", rest[16:20])[0]
+    if linktype != LINKTYPE_ETHERNET:
+        raise ValueError(f"unsupported linktype {linktype}")
+    rec = struct.Struct(end + "IIII")
+    while True:
+        hdr = f.read(16)
+        if len(hdr) < 16:
+            return
+        sec, frac, incl, _ = rec.unpack(hdr)
+        data = f.read(incl)
+        if len(data) < incl:
+            return
+        yield sec + frac * res, data
+
+def _tsresol(opts: bytes, end: str) -> float:
+    i = 0
+    while i + 4 <= len(opts):
+        code, ln = struct.unpack_from(end + "HH", opts, i)
+        if code == 0:
+            break
+        if code == 9 and ln >= 1:
+            v = opts[i + 4]
+            return 2.0 ** -(v & 0x7F) if v & 0x80 else 10.0 ** -v
+        i += 4 + ((ln + 3) & ~3)
+    return 1e-6
+
+def _read_pcapng(f, head):
+    end, ifaces = "<", []
+    buf = head
+    while True:
+        if len(buf) < 8:
+            buf += f.read(8 - len(buf))
+            if len(buf) < 8:
+                return
+        btype = struct.unpack("<I", buf[:4])[0]
+        if btype == _PCAPNG_SHB:
+            bom = f.read(4)
+            end = "<" if bom == b"\x4d\x3c\x2b\x1a" else ">"
+            blen = struct.unpack(end + "I", buf[4:8])[0]
+            f.read(blen - 12)
+            ifaces = []
+        else:
+            btype, blen = struct.unpack(end + "II", buf[:8])
+            body = f.read(blen - 8)
+            if len(body) < blen - 8:
+                return
+            body = body[:-4]                    # trailing block length
+            if btype == 1:                      # Interface Description
+                linktype = struct.unpack_from(end + "H", body, 0)[0]
+                ifaces.append((linktype, _tsresol(body[8:], end)))
+            elif btype == 6:                    # Enhanced Packet
+                ifid, hi, lo, cap, _ = struct.unpack_from(end + "IIIII", body, 0)
+                linktype, res = ifaces[ifid]
+                if linktype == LINKTYPE_ETHERNET:
+                    yield ((hi << 32) | lo) * res, body[20:20 + cap]
+            elif btype == 3:                    # Simple Packet (no timestamp)
+                if ifaces and ifaces[0][0] == LINKTYPE_ETHERNET:
+                    orig = struct.unpack_from(end + "I", body, 0)[0]
+                    yield 0.0, body[4:4 + orig]
+        buf = b""
+
+def read_frames(path: str):
+    with open(path, "rb") as f:
+        head = f.read(4)
+        if head in _PCAP_MAGIC:
+            yield from _read_pcap(f, head)
+        elif struct.unpack("<I", head)[0] == _PCAPNG_SHB:
+            yield from _read_pcapng(f, head)
+        else:
+            raise ValueError(f"{path}: not a pcap/pcapng file")
+
+def write_frames(path: str, frames) -> int:
+    """Write (timestamp_sec, frame_bytes) pairs as a pcap; returns the count."""
+    n = 0
+    with open(path, "wb") as f:
+        f.write(struct.pack("<IHHiIII", 0xA1B2C3D4, 2, 4, 0, 0, 65535, LINKTYPE_ETHERNET))
+        for ts, data in frames:
+            sec = int(ts)
+            f.write(struct.pack("<IIII", sec, int(round((ts - sec) * 1e6)), len(data), len(data)))
+            f.write(data)
+            n += 1
+    return n
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+replay.py  –  pcap-driven stand-in for the mitm switch
+
+Publishes the Ethernet frames of a pcap/pcapng file to inpktsec/inpktinsec
+(IPv4 frames whose source is outside --sec-net go to inpktinsec, everything
+else to inpktsec), listens on outpktsec/outpktinsec, matches the returned frames
+byte-for-byte and reports throughput, drops and processor latency.
+
+With --shards N it publishes like the switch with MITM_SHARDS=N instead:
+to inpktsec.<k> / inpktinsec.<k>, k = frame.flow_hash() % N (the same hash
+as switch.c, over the 5-tuple with --shard-ports), so it can drive
+`cluster.py -n N --dispatch mitm`.
+
+Usage:
+    python3 replay.py capture.pcap                       # original timing
+    python3 replay.py capture.pcap --mode pps --pps 5000
+    python3 replay.py capture.pcap --mode max --loop 20 -s nats://127.0.0.1:4222
+    python3 replay.py capture.pcap --mode max --shards 4    # cluster.py -n 4 --dispatch mitm
+"""
+
+import os, sys, time, asyncio, argparse, ipaddress
+from collections import defaultdict, deque
+from pcapio import read_frames
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python-processor"))
+from frame import flow_hash
+
+def percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return float("nan")
+    k = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+def load(path: str, sec_net, shards: int = 1, ports: bool = False) -> list:
+    frames = []
+    for ts, data in read_frames(path):
+        subj = "inpktsec"
+        if len(data) >= 34 and data[12:14] == b"\x08\x00":
+            if ipaddress.IPv4Address(data[26:30]) not in sec_net:
+                subj = "inpktinsec"
+        if shards > 1:
+            subj = f"{subj}.{flow_hash(data, ports) % shards}"
+        frames.append((ts, subj, data))
+    return frames
+
+class Matcher:
+    """Pairs returned frames with their send times (FIFO per identical frame)."""
+
+    def __init__(self):
+        self.pending = defaultdict(deque)
+        self.lat     = []
+        self.unknown = 0
+
+    def sent(self, data: bytes, t: float):
+        self.pending[data].append(t)
+
+    async def on_msg(self, msg):
+        q = self.pending.get(msg.data)
+        if not q:
+            self.unknown += 1
+            return
+        self.lat.append(time.perf_counter() - q.popleft())
+        if not q:
+            del self.pending[msg.data]
+
+async def replay(args):
+    from nats.aio.client import Client as NATS
+    sec_net = ipaddress.IPv4Network(args.sec_net, strict=False)
+    frames  = load(args.pcap, sec_net, args.shards, args.shard_ports)
+    if args.count:
+        frames = frames[:args.count]
+    if not frames:
+        sys.exit("no Ethernet frames in capture")
+
+    nc = NATS()
+    await nc.connect(args.server)
+    m = Matcher()
+    await nc.subscribe("outpktsec",   cb=m.on_msg)
+    await nc.subscribe("outpktinsec", cb=m.on_msg)
+    await nc.flush()
+
+    sent, t_first = 0, frames[0][0]
+    span   = (frames[-1][0] - t_first) or 0.0
+    period = 1.0 / args.pps if args.mode == "pps" else 0.0
+    t0 = time.perf_counter()
+    for rnd in range(args.loop):
+        for i, (ts, subj, data) in enumerate(frames):
+            if args.mode == "original":
+                due = t0 + (rnd * (span + 1e-3) + ts - t_first) / args.speed
+            elif args.mode == "pps":
+                due = t0 + sent * period
+            else:
+                due = 0.0
+            wait = due - time.perf_counter()
+            if wait > 0.001:
+                await nc.flush()
+                await asyncio.sleep(wait)
+            m.sent(data, time.perf_counter())
+            await nc.publish(subj, data)
+            sent += 1
+            if sent % args.batch == 0:
+                await nc.flush()
+    await nc.flush()
+    t_tx = time.perf_counter() - t0
+
+    deadline = time.perf_counter() + args.drain
+    while len(m.lat) < sent and time.perf_counter() < deadline:
+        await asyncio.sleep(0.05)
+    t_rx = time.perf_counter() - t0
+    await nc.close()
+
+    lat  = sorted(m.lat)
+    recv = len(lat)
+    print(f"sent      {sent} frames in {t_tx:.2f}s  ({sent / t_tx:.0f} pps offered)")
+    print(f"received  {recv} frames in {t_rx:.2f}s  ({recv / t_rx:.0f} pps)")
+    print(f"dropped   {sent - recv}  ({100 * (sent - recv) / sent:.2f}%)  unmatched {m.unknown}")
+    if lat:
+        print("latency   p50 {:.2f} ms  p99 {:.2f} ms  p999 {:.2f} ms  max {:.2f} ms".format(
+            *(1e3 * percentile(lat, q) for q in (0.5, 0.99, 0.999)), 1e3 * lat[-1]))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pcap")
+    ap.add_argument("--mode", choices=("original", "pps", "max"), default="original")
+    ap.add_argument("--pps",   type=float, default=1000, help="rate for --mode pps")
+    ap.add_argument("--speed", type=float, default=1.0,
+                    help="time-scale factor for --mode original")
+    ap.add_argument("--loop",  type=int, default=1, help="replay the capture N times")
+    ap.add_argument("--count", type=int, default=0, help="only use the first N frames")
+    ap.add_argument("--batch", type=int, default=256, help="flush every N publishes")
+    ap.add_argument("--drain", type=float, default=5.0,
+                    help="seconds to wait for stragglers after sending")
+    ap.add_argument("--shards", type=int, default=1,
+                    help="publish to inpkt*.<flow_hash %% N> like the switch with MITM_SHARDS=N")
+    ap.add_argument("--shard-ports", action="store_true",
+                    default=os.getenv("DET_FLOW_PORTS", "0") == "1",
+                    help="shard on the 5-tuple (MITM_SHARD_PORTS=1)")
+    ap.add_argument("--sec-net", default=os.getenv("SECURE_NET", "10.1.0.0/16"))
+    ap.add_argument("-s", "--server",
+                    default=os.getenv("NATS_SURVEYOR_SERVERS", "nats://127.0.0.1:4222"))
+    asyncio.run(replay(ap.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+scaling.py  –  throughput of cluster.py against the number of workers
+
+For each worker count N it starts `cluster.py -n N --dispatch mitm`
+(MITM_SHARDS=N) against a running nats-server, drives it with
+`replay.py --mode max --shards N` and reports the pps that came back out
+of the processor.
+
+The shards are keyed on the host pair (see frame.flow_hash), so the gain
+needs traffic between many host pairs: the capture is synthesised with
+--pairs sec/insec host pairs (UDP, a third of the frames carrying a
+Timestamp option like the covert sender's), or taken from --pcap. With
+--pairs 1 (the stock sec <-> insec topology) every frame lands on one
+worker and adding workers cannot help.
+
+Usage (nats-server listening on 127.0.0.1:4222):
+    python3 scaling.py --workers 1,2,4 --pairs 64 --frames 50000
+"""
+
+import os, re, sys, random, struct, signal, argparse, tempfile, threading, subprocess
+from pcapio import write_frames
+
+HERE    = os.path.dirname(os.path.abspath(__file__))
+CLUSTER = os.path.join(HERE, "..", "python-processor", "cluster.py")
+REPLAY  = os.path.join(HERE, "replay.py")
+
+def _csum(h: bytes) -> int:
+    s = sum(struct.unpack(f"!{len(h) // 2}H", h))
+    s = (s >> 16) + (s & 0xFFFF)
+    s += s >> 16
+    return ~s & 0xFFFF
+
+def udp_frame(src: bytes, dst: bytes, sport: int, dport: int, opts: bytes = b"") -> bytes:
+    ihl  = 5 + len(opts) // 4
+    udp  = struct.pack("!HHHH", sport, dport, 8 + 32, 0) + bytes(32)
+    hdr  = struct.pack("!BBHHHBBH4s4s", 0x40 | ihl, 0, ihl * 4 + len(udp),
+                       random.getrandbits(16), 0, 64, 17, 0, src, dst) + opts
+    hdr  = hdr[:10] + struct.pack("!H", _csum(hdr)) + hdr[12:]
+    return b"\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00" + hdr + udp
+
+def synth(path: str, pairs: int, frames: int) -> int:
+    """`frames` frames round-robin over `pairs` 10.1.x.y -> 10.0.x.y host pairs."""
+    def gen():
+        for i in range(frames):
+            k = i % pairs
+            host = bytes([k >> 8 & 0xFF, 1 + (k & 0xFF) % 254])
+            opts = b"\x44\x04\x05\x00" if i % 3 == 0 else b""
+            yield i * 1e-4, udp_frame(b"\x0a\x01" + host, b"\x0a\x00" + host,
+                                      random.randint(1024, 65535), 8888, opts)
+    return write_frames(path, gen())
+
+def run(n: int, pcap: str, server: str, tmp: str) -> dict:
+    env = dict(os.environ, MITM_SHARDS=str(n), PROC_METRICS="0",
+               NATS_SURVEYOR_SERVERS=server, RAW_CSV=os.path.join(tmp, f"raw{n}.csv"))
+    proc = subprocess.Popen([sys.executable, CLUSTER, "-n", str(n), "--dispatch", "mitm"],
+                            env=env, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    online = threading.Semaphore(0)
+
+    def drain():                            # keep the pipe empty, count workers up
+        for line in proc.stdout:            # workers share the pipe: lines can merge
+            for _ in range(line.count(" online ")):
+                online.release()
+    threading.Thread(target=drain, daemon=True).start()
+    try:
+        for _ in range(n):
+            if not online.acquire(timeout=30):
+                raise RuntimeError(f"{n} workers did not come up")
+        out = subprocess.run([sys.executable, REPLAY, pcap, "--mode", "max", "--shards", str(n),
+                              "--drain", "10", "-s", server],
+                             capture_output=True, text=True, check=True).stdout
+    finally:
+        proc.send_signal(signal.SIGTERM)
+        proc.wait()
+    rx = re.search(r"received\s+(\d+) frames in ([\d.]+)s\s+\((\d+) pps\)", out)
+    tx = re.search(r"sent\s+(\d+) frames", out)
+    p50 = re.search(r"p50 ([\d.]+) ms", out)
+    return {"workers": n, "sent": int(tx.group(1)), "received": int(rx.group(1)),
+            "pps": int(rx.group(3)), "p50_ms": float(p50.group(1)) if p50 else float("nan")}
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    ap.add_argument("--pairs",   type=int, default=64, help="host pairs in the synthetic capture")
+    ap.add_argument("--frames",  type=int, default=50000)
+    ap.add_argument("--pcap",    help="replay this capture instead of a synthetic one")
+    ap.add_argument("--seed",    type=int, default=1)
+    ap.add_argument("-s", "--server", default=os.getenv("NATS_SURVEYOR_SERVERS", "nats://127.0.0.1:4222"))
+    args = ap.parse_args()
+
+    random.seed(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        pcap = args.pcap
+        if not pcap:
+            pcap = os.path.join(tmp, "synth.pcap")
+            synth(pcap, args.pairs, args.frames)
+        print(f"{'workers':>7} {'sent':>8} {'received':>8} {'pps':>7} {'speedup':>7} {'p50 ms':>7}")
+        base = None
+        for n in (int(w) for w in args.workers.split(",")):
+            r = run(n, pcap, args.server, tmp)
+            base = base or r["pps"]
+            print(f"{r['workers']:>7} {r['sent']:>8} {r['received']:>8} {r['pps']:>7} "
+                  f"{r['pps'] / base:>7.2f} {r['p50_ms']:>7.2f}", flush=True)
+
+if __name__ == "__main__":
+    main()
@@ -89,6 +89,7 @@
 #include <pthread.h>
 #include <netpacket/packet.h>
 #include <stdbool.h>
+#include <stdint.h>
 #include <nats/nats.h>
 
 #define BUF_SIZE 65536
@@ -109,6 +110,7 @@ bool configure_nats();
 char *get_interface_for_subnet(char *subnet);
 void query_mac_address(char *interface, char *host_ip, unsigned char *mac_address);
 void print_packet(unsigned char *buffer, int size, char *iface, bool is_outgoing);
+uint32_t flow_shard(const unsigned char *buffer, int size);
 
 // NOT A GOOD EXERCISE TO USE GLOBAL VARIABLES
 // But for the sake of simplicity, we are using them here
@@ -119,6 +121,8 @@ char *insecure_net_host_ip;
 char *secure_net_subnet;
 char *insecure_net_subnet;
 char *nats_url;
+int mitm_shards = 1;    // >1: publish to inpktsec.<shard> / inpktinsec.<shard>
+int mitm_shard_ports = 0;   // 1: shard on the 5-tuple instead of the host pair
 
 natsConnection *conn = NULL;
 natsOptions *opts = NULL;
@@ -210,22 +214,58 @@ void *capture_packets(void *arg) {
 }
 
 
+// Direction-independent FNV-1a, plus a final mix, over the IPv4 address
+// pair (and the TCP/UDP port pair with MITM_SHARD_PORTS=1), reduced modulo
+// mitm_shards. Ports are left out by default: the covert senders change
+// source port per packet, and one shard must see the whole channel. Must
+// stay in sync with flow_hash() in code/python-processor/frame.py.
+// Non-IPv4 frames go to shard 0.
+uint32_t flow_shard(const unsigned char *buffer, int size) {
+    if (mitm_shards <= 1 || size < 34 || buffer[12] != 0x08 || buffer[13] != 0x00)
+        return 0;
+    const unsigned char *ip = buffer + 14;
+    const unsigned char *lo = ip + 12, *hi = ip + 16;
+    if (memcmp(lo, hi, 4) > 0) {
+        lo = ip + 16;
+        hi = ip + 12;
+    }
+    uint32_t h = 2166136261u;
+    for (int i = 0; i < 4; i++) { h ^= lo[i]; h *= 16777619u; }
+    for (int i = 0; i < 4; i++) { h ^= hi[i]; h *= 16777619u; }
+    int off = 14 + (ip[0] & 0x0F) * 4;
+    if (mitm_shard_ports && (ip[9] == 6 || ip[9] == 17) && size >= off + 4) {
+        const unsigned char *p = buffer + off, *q = buffer + off + 2;
+        if (memcmp(p, q, 2) > 0) {
+            p = buffer + off + 2;
+            q = buffer + off;
+        }
+        for (int i = 0; i < 2; i++) { h ^= p[i]; h *= 16777619u; }
+        for (int i = 0; i < 2; i++) { h ^= q[i]; h *= 16777619u; }
+    }
+    // FNV's low bits barely mix: finish with murmur3's fmix32
+    h ^= h >> 16;
+    h *= 0x85ebca6bu;
+    h ^= h >> 13;
+    h *= 0xc2b2ae35u;
+    h ^= h >> 16;
+    return h % (uint32_t)mitm_shards;
+}
+
 void handle_packet_from_interface(unsigned char *buffer, int size, char *in_iface) {
     
     natsStatus s;
+    char subject[32];
+    const char *base = (strcmp(in_iface, ethsec) == 0) ? "inpktsec" : "inpktinsec";
     print_packet(buffer, size, in_iface, false);
-    if (strcmp(in_iface, ethsec) == 0) {
-        // Publish the packet to NATS
-        s = natsConnection_Publish(conn, "inpktsec", buffer, size);
-        if (s != NATS_OK) {
-            fprintf(stderr, "Error publishing packet to NATS: %s\n", natsStatus_GetText(s));
-        }
-    } else {                
-        s = natsConnection_Publish(conn, "inpktinsec", buffer, size);
-        if (s != NATS_OK) {
-            fprintf(stderr, "Error publishing packet to NATS: %s\n", natsStatus_GetText(s));
-        }
-    }    
+    if (mitm_shards > 1) {
+        snprintf(subject, sizeof(subject), "%s.%u", base, flow_shard(buffer, size));
+        base = subject;
+    }
+    // Publish the packet to NATS
+    s = natsConnection_Publish(conn, base, buffer, size);
+    if (s != NATS_OK) {
+        fprintf(stderr, "Error publishing packet to NATS: %s\n", natsStatus_GetText(s));
+    }
 }
 
 
@@ -299,6 +339,16 @@ bool configure_switch(){
     }
     printf("INSECURE_NET: %s\n", insecure_net_subnet);
 
+    // Optional: shard captured frames by flow for multi-worker processors
+    char *shards = getenv("MITM_SHARDS");
+    if (shards != NULL && atoi(shards) > 1) {
+        mitm_shards = atoi(shards);
+    }
+    printf("MITM_SHARDS: %d\n", mitm_shards);
+    char *shard_ports = getenv("MITM_SHARD_PORTS");
+    mitm_shard_ports = shard_ports != NULL && atoi(shard_ports) == 1;
+    printf("MITM_SHARD_PORTS: %d\n", mitm_shard_ports);
+
     // Get the interface names for the secure and insecure subnets
     ethsec = get_interface_for_subnet(secure_net_subnet);
     ethinsec = get_interface_for_subnet(insecure_net_subnet);
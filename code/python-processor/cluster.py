@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+cluster.py  –  run N python-processor workers with flow-affine sharding
+
+Frames are partitioned by frame.flow_hash() onto inpktsec.<shard> /
+inpktinsec.<shard>, either by the mitm switch (--dispatch mitm, which needs
+MITM_SHARDS=N set for the switch too) in C before any frame reaches
+Python, or by a small dispatcher process started here (--dispatch python)
+for a switch that publishes the plain subjects. The default follows
+MITM_SHARDS: mitm if it is above 1, python otherwise. The switch only
+shards when MITM_SHARDS is set explicitly, because a sharded switch stops
+feeding anything subscribed to the plain subjects (the go processors).
+The python dispatcher is one Python process re-publishing every frame,
+so it caps the whole cluster at one core's rate.
+By default the hash covers the host pair only (see flow_hash), so all
+traffic between two hosts, in both directions and over any ports, shares
+one worker: the workers scale with the number of host pairs, not with one
+pair's rate. In the stock sec <-> insec topology that is a single pair, so
+one worker does all the work. With DET_FLOW_PORTS=1 (5-tuple flows, each
+with its own detector) the shards are pinned by 5-tuple as well
+(MITM_SHARD_PORTS=1 on the switch), which spreads one pair's connections
+over the workers without splitting any flow's state.
+code/loadgen/scaling.py measures pps against the worker count.
+Worker i subscribes only to its own shard, keeps its own detector state and
+writes RAW_CSV with .<i> before the extension (/tmp/logs_raw.<i>.csv by
+default); --merge folds those into RAW_CSV ordered by timestamp. With RAW_COLS set the shards are columnar logs
+(collog.py) and are merged into RAW_COLS the same way.
+
+Usage:
+    python3 cluster.py -n 4                    # dispatcher + 4 workers
+    MITM_SHARDS=4 python3 cluster.py -n 4      # switch shards (MITM_SHARDS=4 there too)
+    python3 cluster.py -n 4 --merge          # write merged logs_raw.csv
+"""
+
+import os, sys, csv, heapq, signal, asyncio, argparse, subprocess
+from frame import flow_hash
+
+HERE     = os.path.dirname(os.path.abspath(__file__))
+SHARDS   = int(os.getenv("MITM_SHARDS", "1") or 1)      # what the switch publishes
+RAW_CSV  = os.getenv("RAW_CSV", "/tmp/logs_raw.csv")   # as main.py
+RAW_COLS = os.getenv("RAW_COLS", "")
+SUBJECTS = ("inpktsec", "inpktinsec")
+PORTS    = os.getenv("DET_FLOW_PORTS", "0") == "1"    # shard on the 5-tuple
+
+def shard_log(i: int, path: str = RAW_CSV) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.{i}{ext}"
+
+# ───────── dispatcher ───────── #
+async def dispatch(n: int, server: str):
+    from nats.aio.client import Client as NATS
+    nc = NATS()
+    await nc.connect(server)
+
+    async def cb(msg):
+        await nc.publish(f"{msg.subject}.{flow_hash(msg.data, PORTS) % n}", msg.data)
+
+    for subj in SUBJECTS:
+        await nc.subscribe(subj, cb=cb)
+    print(f"dispatcher online – {n} shards")
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+    try:
+        await stop.wait()
+    finally:
+        await nc.drain()
+
+# ───────── merge ───────── #
+def merge(n: int, out: str = RAW_CSV) -> int:
+    """k-way merge of the per-shard logs by `ts`; returns rows written."""
+    files = [open(shard_log(i), newline="") for i in range(n)
+             if os.path.exists(shard_log(i))]
+    rows, header = 0, None
+    try:
+        readers = []
+        for f in files:
+            r = csv.reader(f)
+            header = next(r, None) or header
+            readers.append(r)
+        tmp = out + ".tmp"
+        with open(tmp, "w", newline="") as f:
+            w = csv.writer(f)
+            if header:
+                w.writerow(header)
+            for row in heapq.merge(*readers, key=lambda r: float(r[0])):
+                w.writerow(row)
+                rows += 1
+        os.replace(tmp, out)
+    finally:
+        for f in files:
+            f.close()
+    return rows
+
+def merge_logs(n: int) -> str:
+    if RAW_COLS:
+        import collog
+        rows = collog.merge([shard_log(i, RAW_COLS) for i in range(n)], RAW_COLS)
+        return f"merged {rows} rows → {RAW_COLS}"
+    return f"merged {merge(n)} rows → {RAW_CSV}"
+
+# ───────── launcher ───────── #
+def run(n: int, mode: str, server: str):
+    procs = []
+    for i in range(n):
+        env = dict(os.environ, RAW_CSV=shard_log(i))
+        if n > 1 or mode == "python":       # an unsharded switch publishes the plain subjects
+            env["PROC_SHARD"] = str(i)
+        if RAW_COLS:
+            env["RAW_COLS"] = shard_log(i, RAW_COLS)
+        if env.get("FEAT_CSV"):
+            env["FEAT_CSV"] = shard_log(i, env["FEAT_CSV"])
+        procs.append(subprocess.Popen([sys.executable, os.path.join(HERE, "main.py")], env=env))
+    if mode == "python":
+        procs.append(subprocess.Popen(
+            [sys.executable, __file__, "-n", str(n), "--dispatcher", "-s", server]))
+
+    def stop(*_):
+        for p in procs:
+            p.send_signal(signal.SIGTERM)
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    for p in procs:
+        p.wait()
+    print(merge_logs(n))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", "--workers", type=int,
+                    default=int(os.getenv("PROC_WORKERS", str(os.cpu_count() or 1))))
+    ap.add_argument("--dispatch", choices=("python", "mitm"),
+                    default=os.getenv("PROC_DISPATCH") or ("mitm" if SHARDS > 1 else "python"),
+                    help="who publishes the sharded subjects (default: mitm if MITM_SHARDS > 1)")
+    ap.add_argument("--merge", action="store_true",
+                    help="only merge per-shard logs and exit")
+    ap.add_argument("--dispatcher", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("-s", "--server",
+                    default=os.getenv("NATS_SURVEYOR_SERVERS", "nats://nats:4222"))
+    args = ap.parse_args()
+
+    if args.merge:
+        print(merge_logs(args.workers))
+    elif args.dispatcher:
+        asyncio.run(dispatch(args.workers, args.server))
+    elif args.dispatch == "mitm" and SHARDS != args.workers:
+        sys.exit(f"--dispatch mitm needs MITM_SHARDS={args.workers} (got {SHARDS}): "
+                 f"frames of shards without a worker would be lost")
+    else:
+        run(args.workers, args.dispatch, args.server)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+collog.py  –  typed columnar packet log (NumPy structured segments)
+
+logs_raw.csv repeats the config string, a float-formatted timestamp and
+dotted IPs on every line. A columnar log is a directory instead:
+
+    meta.json         record dtype + dictionaries for config and proto
+    seg-000000.bin    fixed-size records, appended in batches
+    seg-000001.bin    ... a new segment every SEG_ROWS records
+
+Records hold the timestamp in nanoseconds, run/truth/pred as small ints,
+config/proto as dictionary codes, delay as float64 and IPv4 addresses as
+uint32 (0 = none, e.g. ARP). A segment is raw records with no header, so
+np.memmap maps it directly; a trailing partial record (crash mid-write) is
+ignored. Loaders get typed arrays without parsing anything.
+
+Usage:
+    python3 collog.py info   logs_raw.cols
+    python3 collog.py export logs_raw.cols [-o logs_raw.csv]
+    python3 collog.py import logs_raw.csv  [-o logs_raw.cols]
+"""
+
+import os, sys, csv, json, glob, socket, argparse
+import numpy as np
+
+RAW_HEADER = ["ts","run","truth","pred","config","delay","src","dst","proto"]
+RAW_DTYPE  = np.dtype([("ts_ns", "<i8"), ("run", "<i4"), ("truth", "i1"), ("pred", "i1"),
+                       ("config", "<u2"), ("proto", "u1"), ("delay", "<f8"),
+                       ("src", "<u4"), ("dst", "<u4")])
+DICT_COLS  = ("config", "proto")
+SEG_ROWS   = 1 << 20
+META       = "meta.json"
+
+def _seg_path(path: str, i: int) -> str:
+    return os.path.join(path, f"seg-{i:06d}.bin")
+
+def read_meta(path: str) -> dict:
+    with open(os.path.join(path, META)) as f:
+        return json.load(f)
+
+def _write_meta(path: str, dicts: dict):
+    tmp = os.path.join(path, META + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump({"version": 1, "columns": RAW_HEADER, "dtype": RAW_DTYPE.descr,
+                   "dicts": dicts}, f)
+    os.replace(tmp, os.path.join(path, META))
+
+def is_columnar(path: str) -> bool:
+    return os.path.isfile(os.path.join(path, META))
+
+# ───────── writing ───────── #
+class SegmentWriter:
+    """Appends rows (ts_ns, run, truth, pred, config, delay, src, dst, proto).
+
+    Reopening an existing log continues it (dictionaries and last segment).
+    """
+
+    def __init__(self, path: str, seg_rows: int = SEG_ROWS):
+        self.path, self.seg_rows = path, seg_rows
+        os.makedirs(path, exist_ok=True)
+        self.dicts = {c: [] for c in DICT_COLS}
+        if is_columnar(path):
+            self.dicts.update(read_meta(path)["dicts"])
+        self._codes = {c: {v: i for i, v in enumerate(vals)} for c, vals in self.dicts.items()}
+        self._ips   = {"": 0}
+        segs = sorted(glob.glob(os.path.join(path, "seg-*.bin")))
+        self.seg  = len(segs) - 1 if segs else 0
+        self.rows = os.path.getsize(segs[-1]) // RAW_DTYPE.itemsize if segs else 0
+        self._f   = open(_seg_path(path, self.seg), "ab")
+        _write_meta(path, self.dicts)
+
+    def _code(self, col: str, val) -> int:
+        c = self._codes[col].get(val)
+        if c is None:
+            c = self._codes[col][val] = len(self.dicts[col])
+            self.dicts[col].append(val)
+            self._dirty = True
+        return c
+
+    def _ip(self, s: str) -> int:
+        v = self._ips.get(s)
+        if v is None:
+            v = self._ips[s] = int.from_bytes(socket.inet_aton(s), "big")
+        return v
+
+    def append(self, rows):
+        if not rows:
+            return
+        self._dirty = False
+        ts, run, truth, pred, cfg, delay, src, dst, proto = zip(*rows)
+        rec = np.empty(len(rows), RAW_DTYPE)
+        rec["ts_ns"]  = ts
+        rec["run"]    = run
+        rec["truth"]  = truth
+        rec["pred"]   = pred
+        rec["config"] = [self._code("config", str(c)) for c in cfg]
+        rec["proto"]  = [self._code("proto", str(p)) for p in proto]
+        rec["delay"]  = delay
+        rec["src"]    = [self._ip(s) for s in src]
+        rec["dst"]    = [self._ip(s) for s in dst]
+        if self._dirty:                     # codes must be on disk before the records
+            _write_meta(self.path, self.dicts)
+        lo = 0
+        while lo < len(rec):
+            take = min(len(rec) - lo, self.seg_rows - self.rows)
+            self._f.write(rec[lo:lo + take].tobytes())
+            self.rows += take
+            lo += take
+            if self.rows >= self.seg_rows:
+                self._f.close()
+                self.seg, self.rows = self.seg + 1, 0
+                self._f = open(_seg_path(self.path, self.seg), "ab")
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        self._f.close()
+        _write_meta(self.path, self.dicts)
+
+# ───────── reading ───────── #
+def segments(path: str):
+    """Yield each segment as a read-only memmap of RAW_DTYPE records (no copy)."""
+    for seg in sorted(glob.glob(os.path.join(path, "seg-*.bin"))):
+        n = os.path.getsize(seg) // RAW_DTYPE.itemsize
+        if n:
+            yield np.memmap(seg, dtype=RAW_DTYPE, mode="r", shape=(n,))
+
+def load(path: str) -> tuple:
+    """(records, meta). A single segment is returned as its memmap; several are concatenated."""
+    segs = list(segments(path))
+    if not segs:
+        recs = np.zeros(0, RAW_DTYPE)
+    else:
+        recs = segs[0] if len(segs) == 1 else np.concatenate(segs)
+    return recs, read_meta(path)
+
+def ip_str(v: int) -> str:
+    return socket.inet_ntoa(int(v).to_bytes(4, "big")) if v else ""
+
+def ts_str(ns: int) -> str:
+    us = (int(ns) + 500) // 1000
+    return f"{us // 1_000_000}.{us % 1_000_000:06d}"
+
+def export_csv(path: str, out: str) -> int:
+    """Write the log as logs_raw.csv (same columns and formatting); returns rows."""
+    meta = read_meta(path)
+    cfgs, protos = meta["dicts"]["config"], meta["dicts"]["proto"]
+    ips, n = {0: ""}, 0
+    with open(out, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(RAW_HEADER)
+        for seg in segments(path):
+            for ts, run, truth, pred, cfg, proto, delay, src, dst in seg.tolist():
+                for ip in (src, dst):
+                    if ip not in ips:
+                        ips[ip] = ip_str(ip)
+                w.writerow([ts_str(ts), run, truth, pred, cfgs[cfg], delay,
+                            ips[src], ips[dst], protos[proto]])
+                n += 1
+    return n
+
+def import_csv(src: str, path: str) -> int:
+    """Convert an existing logs_raw.csv into a columnar log; returns rows."""
+    w, n, batch = SegmentWriter(path), 0, []
+    with open(src, newline="") as f:
+        r = csv.reader(f)
+        next(r, None)
+        for ts, run, truth, pred, cfg, delay, s, d, proto in r:
+            sec, _, frac = ts.partition(".")
+            batch.append((int(sec) * 1_000_000_000 + int(frac.ljust(9, "0")[:9]),
+                          int(run), int(truth), int(pred), cfg, float(delay), s, d, proto))
+            if len(batch) >= 65536:
+                w.append(batch)
+                n += len(batch)
+                batch = []
+    w.append(batch)
+    w.close()
+    return n + len(batch)
+
+def merge(paths, out: str) -> int:
+    """Merge per-shard columnar logs into `out`, ordered by timestamp; returns rows."""
+    parts, dicts = [], {c: [] for c in DICT_COLS}
+    index = {c: {} for c in DICT_COLS}
+    for p in paths:
+        if not is_columnar(p):
+            continue
+        recs, meta = load(p)
+        recs = np.array(recs)               # remapped below, so take a copy
+        for c in DICT_COLS:
+            remap = np.array([index[c].setdefault(v, len(index[c])) for v in meta["dicts"][c]]
+                             or [0], dtype=np.int64)
+            recs[c] = remap[recs[c]] if len(recs) else recs[c]
+        parts.append(recs)
+    for c in DICT_COLS:
+        dicts[c] = sorted(index[c], key=index[c].get)
+    recs = np.concatenate(parts) if parts else np.zeros(0, RAW_DTYPE)
+    recs = recs[np.argsort(recs["ts_ns"], kind="stable")]
+    tmp = out + ".tmp"
+    os.makedirs(tmp, exist_ok=True)
+    for old in glob.glob(os.path.join(tmp, "*")):
+        os.unlink(old)
+    for i in range(0, max(len(recs), 1), SEG_ROWS):
+        with open(_seg_path(tmp, i // SEG_ROWS), "wb") as f:
+            f.write(recs[i:i + SEG_ROWS].tobytes())
+    _write_meta(tmp, dicts)
+    if os.path.isdir(out):
+        for old in glob.glob(os.path.join(out, "*")):
+            os.unlink(old)
+        os.rmdir(out)
+    os.replace(tmp, out)
+    return len(recs)
+
+def main():
+    ap = argparse.ArgumentParser(description="Columnar packet log tools")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("info");   p.add_argument("path")
+    p = sub.add_parser("export"); p.add_argument("path"); p.add_argument("-o", "--out", default="")
+    p = sub.add_parser("import"); p.add_argument("path"); p.add_argument("-o", "--out", default="")
+    args = ap.parse_args()
+
+    if args.cmd == "info":
+        recs, meta = load(args.path)
+        size = sum(os.path.getsize(s) for s in glob.glob(os.path.join(args.path, "*")))
+        print(f"{len(recs)} rows, {size} bytes, {len(meta['dicts']['config'])} configs, "
+              f"protos {meta['dicts']['proto']}")
+    elif args.cmd == "export":
+        out = args.out or os.path.splitext(args.path.rstrip("/"))[0] + ".csv"
+        print(f"{export_csv(args.path, out)} rows → {out}")
+    else:
+        out = args.out or os.path.splitext(args.path)[0] + ".cols"
+        print(f"{import_csv(args.path, out)} rows → {out}")
+
+if __name__ == "__main__":
+    sys.exit(main())
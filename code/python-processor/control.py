@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+control.py  –  in-memory experiment labels + live detector reconfiguration
+
+The processor keeps run/truth/config/delay (previously re-read from four
+/tmp files per packet) and the detector thresholds in a ControlState that
+is updated from JSON messages on CONTROL_SUBJECT, e.g.
+
+    {"run": 7, "truth": 1, "config": "pps2_nop3_d0.01", "delay": 0.01,
+     "thr_ent": 1.2}
+
+Requests with a reply subject are answered with the resulting state, so a
+runner can wait until the labels are in place. {"flush": true} is answered
+only once the processor's log writers have written out every row logged
+so far, so the runner can copy the logs right after. The old /tmp files are still
+honoured: watch_files() polls their mtimes and applies changes.
+
+Run as a script to publish one update:
+
+    python3 control.py --run 7 --truth 1 --config pps2_nop3_d0.01 --delay 0.01
+
+Every worker of cluster.py answers; --replies (default PROC_WORKERS) says
+how many answers to wait for.
+"""
+
+import os, json, asyncio, argparse
+
+CONTROL_SUBJECT = os.getenv("CONTROL_SUBJECT", "processor.control")
+
+FLAG_FILE  = "/tmp/channel_flag"
+RUN_FILE   = "/tmp/run_id"
+CFG_FILE   = "/tmp/config_str"
+DELAY_FILE = "/tmp/delay_sec"
+
+# control key -> (file, parser)
+FILES = {
+    "truth":  (FLAG_FILE,  int),
+    "run":    (RUN_FILE,   int),
+    "config": (CFG_FILE,   str),
+    "delay":  (DELAY_FILE, float),
+}
+
+# control key -> (detector attribute, parser); keys of detectors that are
+# not enabled in the pipeline are rejected
+DET_KEYS = {
+    "win_sec":   ("win_sec",     float),
+    "thr_opts":  ("thr_opts",    float),
+    "thr_ent":   ("thr_entropy", float),
+    "thr_comp":  ("thr_comp",    float),
+    "thr_types": ("thr_types",   float),
+    "thr_cv":    ("thr_cv",      float),
+    "thr_ipid":  ("thr_ipid",    float),
+    "thr_ttl":   ("thr_ttl",     float),
+    "thr_sport": ("thr_sport",   float),
+    "vote":      ("vote",        str),
+}
+
+class ControlState:
+    __slots__ = ("truth", "run", "config", "delay", "det", "logs", "_mtimes")
+
+    def __init__(self, det=None, logs=()):
+        self.truth, self.run, self.config, self.delay = 0, 0, "unknown", -1.0
+        self.det     = det
+        self.logs    = list(logs)           # logwriter writers a "flush" waits for
+        self._mtimes = {}
+
+    def apply(self, upd: dict):
+        """Apply all of `upd` or, if any key is unknown or any value bad, none of it."""
+        if not isinstance(upd, dict):
+            raise TypeError(f"control update must be a JSON object, not {type(upd).__name__}")
+        todo = []                       # (object, attribute, parsed value)
+        for key, val in upd.items():
+            if key in FILES:
+                todo.append((self, key, FILES[key][1](val)))
+            elif key in DET_KEYS and self.det is not None and hasattr(self.det, DET_KEYS[key][0]):
+                attr, parse = DET_KEYS[key]
+                todo.append((self.det, attr, parse(val)))
+            else:
+                raise KeyError(f"unknown control key {key!r}")
+        done = []
+        try:
+            for obj, attr, val in todo:     # setters can still refuse, e.g. vote
+                old = getattr(obj, attr)
+                setattr(obj, attr, val)
+                done.append((obj, attr, old))
+        except Exception:
+            for obj, attr, old in reversed(done):
+                setattr(obj, attr, old)
+            raise
+
+    def snapshot(self) -> dict:
+        out = {k: getattr(self, k) for k in FILES}
+        if self.det is not None:
+            out.update({k: getattr(self.det, a) for k, (a, _) in DET_KEYS.items()
+                        if hasattr(self.det, a)})
+            if hasattr(self.det, "stats"):
+                out["flows"] = self.det.stats()
+        return out
+
+    def poll_files(self):
+        """Apply any label file whose mtime changed since the last poll."""
+        upd = {}
+        for key, (path, _) in FILES.items():
+            try:
+                mt = os.stat(path).st_mtime_ns
+            except FileNotFoundError:
+                continue
+            if self._mtimes.get(path) == mt:
+                continue
+            self._mtimes[path] = mt
+            try:
+                with open(path) as f:
+                    upd[key] = f.read().strip()
+            except OSError:
+                continue
+        if upd:
+            try:
+                self.apply(upd)
+            except ValueError as e:         # half-written file, retry next poll
+                print(f"control: bad label file ({e})")
+                self._mtimes.clear()
+
+    async def flush_logs(self, timeout: float = 10.0):
+        flushed = await asyncio.gather(*(asyncio.to_thread(w.flush, timeout) for w in self.logs))
+        if not all(flushed):
+            raise RuntimeError("log writer did not flush (timeout or writer failed)")
+
+    async def watch_files(self, interval: float = 0.1):
+        while True:
+            self.poll_files()
+            await asyncio.sleep(interval)
+
+    async def subscribe(self, nc, subject: str = CONTROL_SUBJECT):
+        async def on_msg(msg):
+            try:
+                upd   = json.loads(msg.data)
+                flush = isinstance(upd, dict) and bool(upd.pop("flush", False))
+                self.apply(upd)
+                if flush:
+                    await self.flush_logs()
+                resp = {"ok": True, **self.snapshot()}
+            except Exception as e:          # every request gets an answer
+                resp = {"ok": False, "error": str(e) or type(e).__name__}
+            print(f"control: {resp}", flush=True)
+            if msg.reply:
+                await nc.publish(msg.reply, json.dumps(resp).encode())
+        return await nc.subscribe(subject, cb=on_msg)
+
+async def send(server: str, upd: dict, timeout: float = 2.0, replies: int = 1) -> dict:
+    """Publish `upd`; with replies > 1, wait for that many processors to answer."""
+    from nats.aio.client import Client as NATS
+    from nats.errors import TimeoutError as NatsTimeout
+    nc = NATS()
+    await nc.connect(server)
+    try:
+        if replies <= 1:
+            msg = await nc.request(CONTROL_SUBJECT, json.dumps(upd).encode(), timeout=timeout)
+            return json.loads(msg.data)
+        inbox = nc.new_inbox()
+        sub   = await nc.subscribe(inbox, max_msgs=replies)
+        await nc.publish(CONTROL_SUBJECT, json.dumps(upd).encode(), reply=inbox)
+        answers, deadline = [], asyncio.get_running_loop().time() + timeout
+        try:
+            while len(answers) < replies:
+                left = deadline - asyncio.get_running_loop().time()
+                answers.append(json.loads((await sub.next_msg(timeout=max(left, 0.001))).data))
+        except NatsTimeout:
+            pass
+        ok = len(answers) == replies and all(a.get("ok") for a in answers)
+        out = {"ok": ok, "replies": answers}
+        if len(answers) < replies:
+            out["error"] = f"{len(answers)} of {replies} processors answered"
+        return out
+    finally:
+        await nc.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="Publish a processor control update")
+    ap.add_argument("--run",    type=int)
+    ap.add_argument("--truth",  type=int)
+    ap.add_argument("--config")
+    ap.add_argument("--delay",  type=float)
+    ap.add_argument("--win-sec",  dest="win_sec",  type=float)
+    ap.add_argument("--thr-opts", dest="thr_opts", type=float)
+    ap.add_argument("--thr-ent",  dest="thr_ent",  type=float)
+    ap.add_argument("--thr-comp", dest="thr_comp", type=float)
+    ap.add_argument("--thr-types", dest="thr_types", type=float)
+    ap.add_argument("--thr-cv",    dest="thr_cv",    type=float)
+    ap.add_argument("--thr-ipid",  dest="thr_ipid",  type=float)
+    ap.add_argument("--thr-ttl",   dest="thr_ttl",   type=float)
+    ap.add_argument("--thr-sport", dest="thr_sport", type=float)
+    ap.add_argument("--vote", help="any, all, majority or a detector count")
+    ap.add_argument("--flush", action="store_true", default=None,
+                    help="answer once the packet logs are written out")
+    ap.add_argument("--replies", type=int, default=int(os.getenv("PROC_WORKERS", "1")),
+                    help="processors that must answer (cluster.py workers)")
+    ap.add_argument("--timeout", type=float, default=15.0)
+    ap.add_argument("-s", "--server",
+                    default=os.getenv("NATS_SURVEYOR_SERVERS", "nats://nats:4222"))
+    args = ap.parse_args()
+
+    opts = ("server", "replies", "timeout")
+    upd  = {k: v for k, v in vars(args).items() if k not in opts and v is not None}
+    resp = asyncio.run(send(args.server, upd, args.timeout, args.replies))
+    print(resp)
+    if not resp.get("ok"):
+        raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
@@ -2,53 +2,154 @@
 
 import time, math, zlib
 from collections import deque, Counter
-from scapy.all import IP, raw
+from functools import lru_cache
 
-def _count_nops(pkt) -> int:
+def _opt_bytes(pkt) -> bytes:
+    from scapy.all import IP, raw       # only needed for scapy packets
     if IP not in pkt:
-        return 0
+        return b''
     ihl = pkt[IP].ihl
-    return 0 if ihl <= 5 else raw(pkt[IP])[20:20 + (ihl - 5) * 4].count(0x01)
+    return b'' if ihl <= 5 else raw(pkt[IP])[20:20 + (ihl - 5) * 4]
+
+def _count_nops(pkt) -> int:
+    return _opt_bytes(pkt).count(0x01)
 
 def _entropy(counter: Counter) -> float:
     total = sum(counter.values())
     return -sum(n / total * math.log2(n / total) for n in counter.values())
 
+@lru_cache(maxsize=1024)
+def comp_len(opts: bytes) -> int:
+    # option blobs repeat a lot (one per symbol value), so memoise them
+    return len(zlib.compress(opts))
+
+def packet_features(opts) -> tuple:
+    """(NOP count, option bytes kept in the window) for one packet."""
+    if not opts:
+        return 0, b''
+    opts    = bytes(opts)
+    nop_cnt = opts.count(0x01)
+    return nop_cnt, (opts if nop_cnt else b'')
+
 class SlidingEntropyDetector:
+    """Sliding-window NOP/entropy/compression detector.
+
+    The window's counts and byte sums are kept incrementally: every packet is
+    added once and evicted once, so feed() costs O(evicted) instead of
+    O(window). The entropy is recomputed from the NOP-count histogram (a few
+    dozen keys at most) with the original formula, summing in the order
+    the counts first appear in the window, so it matches the original
+    detector bit for bit. `max_len` optionally caps the window length
+    (oldest entries go first).
+    """
+
+    PARAMS   = ("win_sec", "thr_opts", "thr_entropy", "thr_comp")
+    FEATURES = ("opts",)        # features.FEATURES groups read by update()
+
+    __slots__ = ("win_sec", "thr_opts", "thr_entropy", "thr_comp", "max_len",
+                 "_ts", "_nops", "_raw", "_comp",
+                 "hist", "n_opts", "raw_sum", "comp_sum", "_seq")
+
     def __init__(self,
                  win_sec: float = 2.0,
                  thr_opts: float = 0.01,
                  thr_entropy: float = 1.0,
-                 thr_comp: float = 0.5):
+                 thr_comp: float = 0.5,
+                 max_len: int = None):
         self.win_sec     = win_sec
         self.thr_opts    = thr_opts
         self.thr_entropy = thr_entropy
         self.thr_comp    = thr_comp
-        self.win: deque  = deque()
+        self.max_len     = max_len
+        # parallel deques instead of (ts, cnt, bytes) tuples
+        self._ts:   deque = deque()
+        self._nops: deque = deque()
+        self._raw:  deque = deque()
+        self._comp: deque = deque()
+        self.hist = {}              # nop count -> deque of its packets' seq (only cnt > 0)
+        self.n_opts   = 0           # packets with cnt > 0
+        self.raw_sum  = 0
+        self.comp_sum = 0
+        self._seq     = 0           # packets pushed so far
 
-    def feed(self, pkt) -> bool:
-        now = time.time()
-        nop_cnt = _count_nops(pkt)
-        opt_bytes = b'' if nop_cnt == 0 else raw(pkt[IP])[20:20 + (pkt[IP].ihl - 5) * 4]
+    def __len__(self) -> int:
+        return len(self._ts)
 
-        self.win.append((now, nop_cnt, opt_bytes))
-        while self.win and now - self.win[0][0] > self.win_sec:
-            self.win.popleft()
+    def _push(self, now: float, nop_cnt: int, opts: bytes):
+        self._ts.append(now)
+        self._nops.append(nop_cnt)
+        self._raw.append(len(opts))
+        self._comp.append(comp_len(opts))
+        self.raw_sum  += len(opts)
+        self.comp_sum += self._comp[-1]
+        if nop_cnt > 0:
+            self.n_opts += 1
+            q = self.hist.get(nop_cnt)
+            if q is None:
+                q = self.hist[nop_cnt] = deque()
+            q.append(self._seq)
+        self._seq += 1
 
-        n = len(self.win)
-        if n == 0:
-            return False
+    def _pop(self):
+        self._ts.popleft()
+        c = self._nops.popleft()
+        self.raw_sum  -= self._raw.popleft()
+        self.comp_sum -= self._comp.popleft()
+        if c > 0:
+            self.n_opts -= 1
+            q = self.hist[c]
+            q.popleft()
+            if not q:
+                del self.hist[c]
+
+    def _evict(self, now: float):
+        ts = self._ts
+        while ts and now - ts[0] > self.win_sec:
+            self._pop()
+        if self.max_len is not None:
+            while len(ts) > self.max_len:
+                self._pop()
+
+    def entropy(self) -> float:
+        if not self.hist:
+            return 0.0
+        # first-appearance order, as Counter(window) iterates in the original
+        order = sorted(self.hist.values(), key=lambda q: q[0])
+        return _entropy({i: len(q) for i, q in enumerate(order)})
 
-        n_opts = sum(1 for _, c, _ in self.win if c > 0)
-        pct_opts = n_opts / n
+    def feed_opts(self, opts: bytes, now: float = None) -> bool:
+        """Feed the raw IPv4 option bytes of one packet (b'' if none).
 
-        counts = Counter(c for _, c, _ in self.win if c > 0)
-        ent     = _entropy(counts) if counts else 0.0
+        `opts` may be a memoryview (see frame.parse); it is copied only if
+        it is non-empty.
+        """
+        if now is None:
+            now = time.time()
+        return self._decide(now, *packet_features(opts))
 
-        raw_len  = sum(len(o) for *_, o in self.win) or 1
-        comp_len = sum(len(zlib.compress(o)) for *_, o in self.win)
-        comp_ratio = comp_len / raw_len
+    def update(self, f) -> bool:
+        """Pipeline entry (pipeline.py): the packet_features() of a features.Features."""
+        return self._decide(f.ts, f.raw_nops, f.opts)
+
+    def _decide(self, now: float, nop_cnt: int, opts: bytes) -> bool:
+        self._push(now, nop_cnt, opts)
+        self._evict(now)
+
+        n = len(self._ts)
+        if n == 0:
+            return False
+
+        pct_opts   = self.n_opts / n
+        ent        = self.entropy()
+        comp_ratio = self.comp_sum / (self.raw_sum or 1)
 
         return (pct_opts   > self.thr_opts and
                 ent        > self.thr_entropy and
                 comp_ratio > self.thr_comp)
+
+    def feed_frame(self, fr, data=None, now: float = None) -> bool:
+        """FlowTable entry: a frame.parse() result (only its options are used)."""
+        return self.feed_opts(fr.opts, now)
+
+    def feed(self, pkt) -> bool:
+        return self.feed_opts(_opt_bytes(pkt))
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+features.py  –  one feature vector per frame, shared by every detector
+
+FeatureExtractor.extract() reads each header field once and keeps only
+O(1) amortised state per stream, and the detectors (pipeline.py) share
+the one vector instead of reparsing the frame. Fields come in groups
+(FEATURES), and an extractor fills only the groups it is asked for; the
+others keep a neutral value (0, b'', (), -1):
+
+    opts     raw_nops   every 0x01 option byte, as detector.packet_features
+                        counts them (the entropy detector's NOP count)
+             opts       the option bytes kept for compression (b'' if none)
+    types    nops       NOP options
+             types      option-type histogram ((type, count) pairs)
+             mask       option-type bitmask
+    dt       dt         seconds since the previous frame of the stream
+    ip       ttl, ipid  IPv4 TTL and IP ID (0 for non-IPv4 frames)
+             dipid      IP ID delta mod 2^16 to the previous IPv4 frame (-1: none)
+    sport    sport      TCP/UDP source port (-1: none)
+             sport_ent  entropy (bits) of the source ports seen in the window
+
+For `types` the options are walked type by type (EOL ends the list, NOP
+is one byte, anything else is type/length/data), so a NOP is a NOP option
+rather than any 0x01 byte. Option blobs repeat a lot, so the walk is
+memoised like detector.comp_len.
+"""
+
+import math
+from collections import deque, Counter
+from functools import lru_cache
+from frame import ETH_HLEN
+from detector import packet_features
+
+OPT_EOL, OPT_NOP = 0x00, 0x01
+FEATURES = ("opts", "types", "dt", "ip", "sport")
+
+@lru_cache(maxsize=1024)
+def parse_opts(opts: bytes) -> tuple:
+    """(NOP count, ((type, count), ...), type bitmask) of raw option bytes."""
+    hist, i, n = Counter(), 0, len(opts)
+    while i < n:
+        t = opts[i]
+        hist[t] += 1
+        if t == OPT_EOL:
+            break
+        if t == OPT_NOP:
+            i += 1
+            continue
+        if i + 1 >= n or opts[i + 1] < 2:   # truncated / malformed: stop here
+            break
+        i += opts[i + 1]
+    mask = 0
+    for t in hist:
+        mask |= 1 << t
+    return hist[OPT_NOP], tuple(sorted(hist.items())), mask
+
+class Features:
+    __slots__ = ("ts", "dt", "raw_nops", "opts", "nops", "types", "mask",
+                 "ttl", "ipid", "dipid", "sport", "sport_ent")
+
+    def types_str(self) -> str:
+        return " ".join(f"{t}:{c}" for t, c in self.types)
+
+class FeatureExtractor:
+    """Per-stream state behind the vector: the previous frame's time and IP
+    ID, and a `win_sec` window of source ports with its entropy kept
+    incrementally. `need` names the FEATURES groups to fill; the source
+    port window only exists when `sport` is among them."""
+
+    __slots__ = ("win_sec", "max_len", "_opts", "_types", "_dt", "_ip", "_sport",
+                 "_last_ts", "_last_ipid", "_ts", "_sports", "_hist", "_nlogn")
+
+    def __init__(self, win_sec: float = 2.0, max_len: int = None, need=FEATURES):
+        bad = set(need) - set(FEATURES)
+        if bad:
+            raise ValueError(f"unknown feature group(s) {sorted(bad)}; choose from {', '.join(FEATURES)}")
+        self.win_sec   = win_sec
+        self.max_len   = max_len
+        self._opts, self._types, self._dt, self._ip, self._sport = (g in need for g in FEATURES)
+        self._last_ts  = None
+        self._last_ipid = None
+        self._ts:     deque = deque()
+        self._sports: deque = deque()
+        self._hist    = {}          # sport -> packets in the window
+        self._nlogn   = 0.0         # sum(n * log2 n) over _hist
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    def _hist_add(self, port: int, d: int):
+        hist = self._hist
+        n = hist.get(port, 0)
+        if n > 1:
+            self._nlogn -= n * math.log2(n)
+        n += d
+        if n:
+            hist[port] = n
+            if n > 1:
+                self._nlogn += n * math.log2(n)
+        else:
+            del hist[port]
+
+    def _sport_entropy(self, now: float, sport: int) -> float:
+        ts, sports = self._ts, self._sports
+        if sport >= 0:
+            ts.append(now)
+            sports.append(sport)
+            self._hist_add(sport, 1)
+        while ts and (now - ts[0] > self.win_sec or
+                      (self.max_len is not None and len(ts) > self.max_len)):
+            ts.popleft()
+            self._hist_add(sports.popleft(), -1)
+        t = len(sports)
+        if not t:
+            self._nlogn = 0.0       # drop accumulated float error
+            return 0.0
+        return max(0.0, math.log2(t) - self._nlogn / t)
+
+    def extract(self, fr, data, now: float) -> Features:
+        """Vector of one frame.parse() result `fr` over the raw frame `data`."""
+        f = Features()
+        f.ts = now
+        if self._dt:
+            f.dt = now - self._last_ts if self._last_ts is not None else 0.0
+            self._last_ts = now
+        else:
+            f.dt = 0.0
+
+        opts = bytes(fr.opts) if len(fr.opts) else b''
+        if self._opts:
+            f.raw_nops, f.opts = packet_features(opts)
+        else:
+            f.raw_nops, f.opts = 0, b''
+        if self._types:
+            f.nops, f.types, f.mask = parse_opts(opts)
+        else:
+            f.nops, f.types, f.mask = 0, (), 0
+
+        f.ttl = f.ipid = 0
+        f.sport, f.dipid, f.sport_ent = -1, -1, 0.0
+        if fr.is_ip and self._ip:
+            ip = ETH_HLEN
+            f.ttl  = data[ip + 8]
+            f.ipid = (data[ip + 4] << 8) | data[ip + 5]
+            if self._last_ipid is not None:
+                f.dipid = (f.ipid - self._last_ipid) & 0xFFFF
+            self._last_ipid = f.ipid
+        if self._sport:
+            off = ETH_HLEN + fr.ihl * 4
+            if fr.is_ip and fr.proto in (6, 17) and len(data) >= off + 2:
+                f.sport = (data[off] << 8) | data[off + 1]
+            f.sport_ent = self._sport_entropy(now, f.sport)
+        return f
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+flows.py  –  per-flow detector state in a bounded LRU table
+
+Every flow (frame.flow_key: host pair and protocol, plus the ports with
+DET_FLOW_PORTS=1) gets its own detector (a SlidingEntropyDetector, or
+whatever `make` builds, e.g. a pipeline.Pipeline) so benign ARP/UDP
+traffic no longer dilutes the covert flow's window. Host-pair keys keep a
+covert sender that changes source port per packet in one window, at the
+cost of sharing it with other traffic between the same two hosts.
+
+The table is an OrderedDict in recency order: lookups and LRU/idle
+eviction are O(1), and both the number of flows and each flow's window
+length are capped, so a spoofed-source flood can only churn entries,
+never grow memory past max_flows × max_win window entries. With the
+defaults that is 4096 × 4096 ≈ 16.7M entries, reached only when every
+flow fills its window; stats() reports the current count next to it.
+"""
+
+import time
+from collections import OrderedDict
+from detector import SlidingEntropyDetector
+
+class _Flow:
+    __slots__ = ("det", "last", "pkts", "bytes")
+
+    def __init__(self, det):
+        self.det, self.last, self.pkts, self.bytes = det, 0.0, 0, 0
+
+class FlowTable:
+    # detector parameters (the keyword arguments besides the table limits)
+    # are attributes of the table too, so ControlState can reconfigure
+    # every flow with a plain setattr()
+
+    def __init__(self,
+                 make=SlidingEntropyDetector,
+                 max_flows: int = 4096,
+                 idle_sec: float = 30.0,
+                 max_win: int = 4096,
+                 **params):
+        self.make      = make
+        self.params    = params
+        self.max_flows = max_flows
+        self.idle_sec  = idle_sec
+        self.max_win   = max_win
+        self.flows     = OrderedDict()
+        self.created = self.evicted_lru = self.evicted_idle = 0
+
+    def __getattr__(self, name):
+        params = self.__dict__.get("params", {})
+        if name in params:
+            return params[name]
+        raise AttributeError(name)
+
+    def __setattr__(self, name, val):
+        if name in self.__dict__.get("params", ()):
+            if not self.flows:              # no detector to refuse a bad value yet
+                self.make(max_len=self.max_win, **{**self.params, name: val})
+            for fl in self.flows.values():
+                setattr(fl.det, name, val)
+            self.params[name] = val
+        else:
+            object.__setattr__(self, name, val)
+
+    def __len__(self) -> int:
+        return len(self.flows)
+
+    @property
+    def last(self):
+        """Feature vector of the most recently fed flow (pipeline detectors)."""
+        if not self.flows:
+            return None
+        return getattr(next(reversed(self.flows.values())).det, "last", None)
+
+    def _expire(self, now: float):
+        flows = self.flows
+        while flows:
+            key, fl = next(iter(flows.items()))
+            if now - fl.last <= self.idle_sec:
+                break
+            del flows[key]
+            self.evicted_idle += 1
+
+    def lookup(self, key, now: float) -> _Flow:
+        fl = self.flows.get(key)
+        if fl is not None:
+            self.flows.move_to_end(key)
+            return fl
+        if len(self.flows) >= self.max_flows:
+            self.flows.popitem(last=False)
+            self.evicted_lru += 1
+        fl = _Flow(self.make(max_len=self.max_win, **self.params))
+        self.flows[key] = fl
+        self.created += 1
+        return fl
+
+    def feed(self, key, fr, data, now: float = None) -> bool:
+        """Feed one frame (frame.parse result + raw bytes) to the detector of flow `key`."""
+        if now is None:
+            now = time.time()
+        self._expire(now)
+        fl = self.lookup(key, now)
+        fl.last   = now
+        fl.pkts  += 1
+        fl.bytes += len(data)
+        return fl.det.feed_frame(fr, data, now)
+
+    def stats(self) -> dict:
+        n     = len(self.flows)
+        slots = sum(len(fl.det) for fl in self.flows.values())
+        tx    = sum(fl.bytes for fl in self.flows.values())   # traffic, not state
+        return {
+            "active_flows":   n,
+            "created":        self.created,
+            "evicted_lru":    self.evicted_lru,
+            "evicted_idle":   self.evicted_idle,
+            "window_entries": slots,
+            "window_entries_max": self.max_flows * self.max_win,
+            "traffic_bytes_per_flow": tx / n if n else 0.0,
+        }
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+frame.py  –  scapy-free Ethernet/IPv4 header decoder for the hot path
+
+parse() works on a memoryview of the NATS payload and never copies the
+frame; only the fields the processor logs or feeds to the detector are
+pulled out. `name` mirrors scapy's `Ether(data).payload.__class__.__name__`
+so logs_raw.csv keeps the same `proto` column.
+"""
+
+import socket
+
+ETH_HLEN  = 14
+ETH_IP    = 0x0800
+ETH_ARP   = 0x0806
+ETH_IPV6  = 0x86DD
+ETH_DOT1Q = 0x8100
+
+_NAMES = {ETH_IP: "IP", ETH_ARP: "ARP", ETH_IPV6: "IPv6", ETH_DOT1Q: "Dot1Q"}
+_EMPTY = memoryview(b"")
+
+class Frame:
+    __slots__ = ("ethertype", "ihl", "proto", "src", "dst", "opts", "name")
+
+    def __init__(self, ethertype, ihl=0, proto=0, src="", dst="", opts=_EMPTY):
+        self.ethertype = ethertype
+        self.ihl       = ihl
+        self.proto     = proto          # IPv4 protocol number (0 if not IPv4)
+        self.src       = src
+        self.dst       = dst
+        self.opts      = opts           # memoryview of the IPv4 options
+        self.name      = _NAMES.get(ethertype, "Raw")
+
+    @property
+    def is_ip(self) -> bool:
+        return self.ethertype == ETH_IP
+
+    @property
+    def has_opts(self) -> bool:
+        return len(self.opts) > 0
+
+def parse(data) -> Frame:
+    mv = data if isinstance(data, memoryview) else memoryview(data)
+    if len(mv) < ETH_HLEN:
+        return Frame(-1)
+    ethertype = (mv[12] << 8) | mv[13]
+    if ethertype != ETH_IP or len(mv) < ETH_HLEN + 20:
+        return Frame(ethertype)
+
+    ihl   = mv[ETH_HLEN] & 0x0F
+    proto = mv[ETH_HLEN + 9]
+    src   = socket.inet_ntoa(mv[ETH_HLEN + 12:ETH_HLEN + 16])
+    dst   = socket.inet_ntoa(mv[ETH_HLEN + 16:ETH_HLEN + 20])
+    opts  = mv[ETH_HLEN + 20:ETH_HLEN + ihl * 4] if ihl > 5 else _EMPTY
+    return Frame(ethertype, ihl, proto, src, dst, opts)
+
+def flow_key(f: Frame, data, ports: bool = False) -> tuple:
+    """(src, dst, proto) for IPv4, plus (sport, dport) for TCP/UDP if `ports`;
+    (ethertype, src MAC, dst MAC) for everything else.
+
+    Ports are off by default: the covert senders pick a fresh source port
+    per packet, so a 5-tuple key turns every covert packet into its own
+    one-packet flow and no window ever sees the channel. With ports on,
+    concurrent connections between two hosts get separate windows instead.
+    """
+    if not f.is_ip:
+        return (f.ethertype, bytes(data[6:12]), bytes(data[0:6]))
+    if ports and f.proto in (6, 17):
+        off = ETH_HLEN + f.ihl * 4
+        if len(data) >= off + 4:
+            sport = (data[off] << 8) | data[off + 1]
+            dport = (data[off + 2] << 8) | data[off + 3]
+            return (f.src, f.dst, f.proto, sport, dport)
+    return (f.src, f.dst, f.proto)
+
+_FNV_OFF, _FNV_PRIME = 2166136261, 16777619
+
+def flow_hash(data, ports: bool = False) -> int:
+    """Direction-independent 32-bit FNV-1a (with a final mix) over the IPv4
+    address pair, plus the TCP/UDP port pair if `ports`.
+
+    Both directions hash alike. Ports are left out by default: the covert
+    senders change source port per packet, and one shard must see the whole
+    channel, not 1/N of it. So without ports all traffic between two hosts
+    lands on one shard. With ports (DET_FLOW_PORTS=1, whose 5-tuple flows
+    are independent anyway) the connections of one host pair spread out.
+    Non-IPv4 frames hash to 0. Must stay in sync with flow_shard() in
+    code/mitm/switch/switch.c.
+    """
+    mv = data if isinstance(data, memoryview) else memoryview(data)
+    if len(mv) < ETH_HLEN + 20 or mv[12] != 0x08 or mv[13] != 0x00:
+        return 0
+    ip = ETH_HLEN
+    a  = bytes(mv[ip + 12:ip + 16])
+    b  = bytes(mv[ip + 16:ip + 20])
+    if a > b:
+        a, b = b, a
+    key = a + b
+    if ports and mv[ip + 9] in (6, 17):
+        off = ip + (mv[ip] & 0x0F) * 4
+        if len(mv) >= off + 4:
+            p = bytes(mv[off:off + 2])
+            q = bytes(mv[off + 2:off + 4])
+            key += p + q if p <= q else q + p
+    h = _FNV_OFF
+    for byte in key:
+        h = ((h ^ byte) * _FNV_PRIME) & 0xFFFFFFFF
+    # FNV's low bits barely mix (hosts differing in one byte all land on
+    # one shard mod 4), so finish with murmur3's fmix32 before the modulo
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & 0xFFFFFFFF
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & 0xFFFFFFFF
+    h ^= h >> 16
+    return h
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+logwriter.py  –  batched log writers running off the event loop
+
+Rows go through a bounded queue to a single thread that owns the open file
+and writes them in one call once `batch` rows are pending or `interval`
+seconds have passed, whichever comes first. CsvLogWriter appends CSV
+lines; ColumnarLogWriter appends typed records to a collog directory.
+
+write() never blocks the event loop: a row that finds the queue full, or
+the writer thread dead (its exception is kept in `error`), is counted in
+`dropped` instead. flush() is the handshake for a reader of the file: it
+returns once every row queued before it is written out.
+"""
+
+import csv, os, sys, queue, threading, time
+
+_STOP = object()
+
+class _Flush:
+    __slots__ = ("done",)
+
+    def __init__(self):
+        self.done = threading.Event()
+
+class _BatchWriter:
+    name = "log-writer"
+
+    def __init__(self, path: str, batch: int = 512, interval: float = 0.5,
+                 maxsize: int = 65536):
+        self.path     = path
+        self.batch    = batch
+        self.interval = interval
+        self.q        = queue.Queue(maxsize)
+        self.written  = 0
+        # each counter has one writing thread: the caller's, the writer's
+        self._dropped_caller = self._dropped_thread = 0
+        self.error    = None
+        self._buf     = []              # rows taken off the queue, not yet written
+        self._t = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._t.start()
+
+    @property
+    def dropped(self) -> int:
+        return self._dropped_caller + self._dropped_thread
+
+    def write(self, row):
+        if not self._t.is_alive():
+            self._dropped_caller += 1
+            return
+        try:
+            self.q.put_nowait(row)
+        except queue.Full:              # writer `maxsize` rows behind
+            self._dropped_caller += 1
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until the rows queued so far are on disk; False on timeout or a dead writer."""
+        req = _Flush()
+        deadline = time.monotonic() + timeout
+        while self._t.is_alive():
+            try:
+                self.q.put(req, timeout=0.1)
+                break
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    return False
+        else:
+            return False
+        while not req.done.wait(0.1):
+            if not self._t.is_alive() or time.monotonic() >= deadline:
+                return False
+        return True
+
+    def qsize(self) -> int:
+        return self.q.qsize()
+
+    def _run(self):
+        try:
+            self._loop()
+        except Exception as e:
+            self.error = e
+            self._dropped_thread += len(self._buf)
+            print(f"[{self.name}] {self.path}: {e!r}, dropping further rows",
+                  file=sys.stderr, flush=True)
+            try:
+                self._close()
+            except Exception:
+                pass
+
+    def _loop(self):
+        buf, deadline = self._buf, time.monotonic() + self.interval
+        while True:
+            try:
+                row = self.q.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                row = None
+            if row is _STOP:
+                break
+            if type(row) is _Flush:
+                self._flush(buf)
+                row.done.set()
+                deadline = time.monotonic() + self.interval
+                continue
+            if row is not None:
+                buf.append(row)
+            if len(buf) >= self.batch or time.monotonic() >= deadline:
+                self._flush(buf)
+                deadline = time.monotonic() + self.interval
+        waiting = []
+        while True:                     # rows queued behind the sentinel
+            try:
+                row = self.q.get_nowait()
+            except queue.Empty:
+                break
+            if type(row) is _Flush:
+                waiting.append(row)
+            elif row is not _STOP:
+                buf.append(row)
+        self._flush(buf)
+        self._close()
+        for req in waiting:
+            req.done.set()
+
+    def _flush(self, buf):
+        if buf:
+            self._writerows(buf)
+            self.written += len(buf)
+            buf.clear()
+        self._f.flush()
+
+    def close(self):
+        """Write out everything queued so far and close the file."""
+        while self._t.is_alive():
+            try:
+                self.q.put(_STOP, timeout=0.1)
+                break
+            except queue.Full:          # don't wait forever on a writer that dies
+                pass
+        self._t.join()
+        while True:                     # rows a failed writer never took
+            try:
+                row = self.q.get_nowait()
+            except queue.Empty:
+                break
+            self._dropped_caller += row is not _STOP and type(row) is not _Flush
+
+class CsvLogWriter(_BatchWriter):
+    name = "csv-writer"
+
+    def __init__(self, path: str, header: list, **kw):
+        new = not os.path.exists(path)
+        self._f = open(path, "a", newline="")
+        self._w = csv.writer(self._f)
+        if new:
+            self._w.writerow(header)
+            self._f.flush()
+        super().__init__(path, **kw)
+
+    def _writerows(self, buf):
+        self._w.writerows(buf)
+
+    def _close(self):
+        self._f.close()
+
+class ColumnarLogWriter(_BatchWriter):
+    """Rows are (ts_ns, run, truth, pred, config, delay, src, dst, proto); see collog.py."""
+    name = "cols-writer"
+
+    def __init__(self, path: str, **kw):
+        from collog import SegmentWriter        # needs numpy; CSV logging does not
+        self._f = SegmentWriter(path)
+        super().__init__(path, **kw)
+
+    def _writerows(self, buf):
+        self._f.append(buf)
+
+    def _close(self):
+        self._f.close()
@@ -1,79 +1,183 @@
 #!/usr/bin/env python3
 
-import os, time, asyncio, random, csv
+import os, time, asyncio, signal
 from nats.aio.client import Client as NATS
-from scapy.all import Ether, IP
-from detector import SlidingEntropyDetector
+from detector import comp_len
+from flows import FlowTable
+from pipeline import Pipeline, param_names
+from features import FEATURES
+from scheduler import DelayScheduler, supervise
+from logwriter import CsvLogWriter, ColumnarLogWriter
+from control import ControlState
+from telemetry import Telemetry
+import frame
 
 MEAN_DELAY = float(os.getenv("MEAN_DELAY_SEC", "0.05"))
-FLAG_FILE  = "/tmp/channel_flag"
-RUN_FILE   = "/tmp/run_id"
-CFG_FILE   = "/tmp/config_str"
-RAW_CSV    = "/tmp/logs_raw.csv"
-DELAY_FILE = "/tmp/delay_sec"
+DEBUG      = os.getenv("PROC_DEBUG", "0") == "1"   # per-frame LOG lines, full scapy dissection
+MAX_INFLIGHT   = int(os.getenv("DELAY_MAX_INFLIGHT", "10000"))
+PRESERVE_ORDER = os.getenv("DELAY_PRESERVE_ORDER", "1") == "1"   # 0: independent Exp delays, frames may overtake
+LOG_BATCH      = int(os.getenv("LOG_BATCH_ROWS", "512"))
+LOG_INTERVAL   = float(os.getenv("LOG_FLUSH_SEC", "0.5"))
+RAW_CSV    = os.getenv("RAW_CSV", "/tmp/logs_raw.csv")
+RAW_COLS   = os.getenv("RAW_COLS", "")            # columnar log dir (collog.py) instead of RAW_CSV
+SHARD      = os.getenv("PROC_SHARD")          # set by cluster.py per worker
+PER_FLOW   = os.getenv("DET_PER_FLOW", "0") == "1"
+FLOW_PORTS = os.getenv("DET_FLOW_PORTS", "0") == "1"  # 5-tuple flows (see frame.flow_key)
+METRICS    = os.getenv("PROC_METRICS", "1") == "1"
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9102"))
+FEAT_CSV   = os.getenv("FEAT_CSV", "")            # per-packet features for sweep.py
 
-det = SlidingEntropyDetector(
+DETECTORS  = os.getenv("DET_PIPELINE", "entropy")   # pipeline.DETECTORS, comma-separated
+DET_VOTE   = os.getenv("DET_VOTE", "any")           # any | all | majority | <k>
+
+DET_PARAMS = dict(
     win_sec     = float(os.getenv("DET_WIN_SEC",  "2")),
     thr_opts    = float(os.getenv("DET_THR_OPTS", "0.01")),
     thr_entropy = float(os.getenv("DET_THR_ENT",  "1.0")),
     thr_comp    = float(os.getenv("DET_THR_COMP", "0.5")),
+    thr_types   = float(os.getenv("DET_THR_TYPES", "0.01")),
+    opt_types   = [int(t) for t in os.getenv("DET_OPT_TYPES", "68,1,7,131,137").split(",")],
+    thr_cv      = float(os.getenv("DET_THR_CV",   "0.1")),
+    min_pkts    = int(os.getenv("DET_MIN_PKTS",   "4")),
+    thr_ipid    = float(os.getenv("DET_THR_IPID", "0.5")),
+    thr_ttl     = float(os.getenv("DET_THR_TTL",  "0.5")),
+    thr_sport   = float(os.getenv("DET_THR_SPORT", "2.0")),
 )
+DET_PARAMS = {k: v for k, v in DET_PARAMS.items() if k in param_names(DETECTORS)}
+FEAT_GROUPS = FEATURES if FEAT_CSV else ()        # else only what the detectors read
+if PER_FLOW:
+    det = FlowTable(Pipeline, detectors=DETECTORS, vote=DET_VOTE, features=FEAT_GROUPS, **DET_PARAMS,
+                    max_flows = int(os.getenv("DET_MAX_FLOWS", "4096")),
+                    idle_sec  = float(os.getenv("DET_FLOW_IDLE_SEC", "30")),
+                    max_win   = int(os.getenv("DET_FLOW_MAX_WIN", "4096")))
+else:
+    det = Pipeline(DETECTORS, DET_VOTE, features=FEAT_GROUPS, **DET_PARAMS)
+ctl = ControlState(det)
+tm  = Telemetry(METRICS)
+
+RAW_HEADER  = ["ts","run","truth","pred","config","delay","src","dst","proto"]
+FEAT_HEADER = ["ts","run","truth","config","nops","opt_len","comp_len",
+               "opt_types","ttl","ipid","dt","dipid","sport","sport_ent"]
 
-if not os.path.exists(RAW_CSV):
-    with open(RAW_CSV, "w", newline="") as f:
-        csv.writer(f).writerow(
-            ["ts","run","truth","pred","config","delay","src","dst","proto"]        
-        )
+async def make_handler(nc: NATS, sched: DelayScheduler, log: CsvLogWriter,
+                       feat: CsvLogWriter = None):
+    pc    = time.perf_counter
+    stage = tm.stage
 
-async def make_handler(nc: NATS):
     async def handler(msg):
+        t0   = pc()
         data = msg.data
-        pkt  = Ether(data)
+        fr   = frame.parse(memoryview(data))
+        tm.frame(msg.subject)
 
-        print(f"Received on '{msg.subject}' len={len(data)}")
-        print(pkt.show())
+        if DEBUG:
+            from scapy.all import Ether
+            print(f"Received on '{msg.subject}' len={len(data)}")
+            Ether(data).show()
 
-        truth  = int(open(FLAG_FILE).read().strip())   if os.path.exists(FLAG_FILE) else 0
-        run_id = int(open(RUN_FILE ).read().strip())   if os.path.exists(RUN_FILE ) else 0
-        cfg    =     open(CFG_FILE ).read().strip()    if os.path.exists(CFG_FILE ) else "unknown"
-        delay  = float(open(DELAY_FILE).read().strip()) if os.path.exists(DELAY_FILE) else -1
+        t1 = pc()
+        truth, run_id, cfg, delay = ctl.truth, ctl.run, ctl.config, ctl.delay
+        t2 = pc()
 
-        pred   = int(det.feed(pkt))
-        ts     = time.time()
+        # one feature vector per frame, whichever detectors vote on it
+        now = time.time()
+        if PER_FLOW:
+            pred = int(det.feed(frame.flow_key(fr, data, FLOW_PORTS), fr, data, now))
+        else:
+            pred = int(det.feed_frame(fr, data, now))
+        if feat is not None:
+            f = det.last
+            feat.write([f"{now:.6f}", run_id, truth, cfg, f.raw_nops, len(f.opts), comp_len(f.opts),
+                        f.types_str(), f.ttl, f.ipid, f"{f.dt:.6f}", f.dipid, f.sport,
+                        f"{f.sport_ent:.4f}"])
+        ts_ns  = time.time_ns()
+        ts     = ts_ns / 1e9
+        t3     = pc()
 
-        ip_src = pkt[IP].src if IP in pkt else ""
-        ip_dst = pkt[IP].dst if IP in pkt else ""
-        l4name = pkt.payload.__class__.__name__
-        with open(RAW_CSV, "a", newline="") as f:
-            csv.writer(f).writerow(
-                [f"{ts:.6f}", run_id, truth, pred, cfg, delay, ip_src, ip_dst, l4name]
-        )        
-        
-        print(f"LOG {ts:.3f} {run_id} {truth} {pred} {cfg}")
+        ip_src, ip_dst, l4name = fr.src, fr.dst, fr.name
+        if RAW_COLS:
+            log.write((ts_ns, run_id, truth, pred, cfg, delay, ip_src, ip_dst, l4name))
+        else:
+            log.write([f"{ts:.6f}", run_id, truth, pred, cfg, delay, ip_src, ip_dst, l4name])
+        t4 = pc()
+        if DEBUG:
+            print(f"LOG {ts:.3f} {run_id} {truth} {pred} {cfg}")
 
         if pred:
+            tm.alert()
             alert = f"[ALERT] covert-detected run={run_id} cfg={cfg} ts={ts:.3f}"
             print(alert, flush=True)
             await nc.publish("covert.alert", alert.encode())
 
-        await asyncio.sleep(random.expovariate(1 / MEAN_DELAY))
-        subj_out = "outpktinsec" if msg.subject == "inpktsec" else "outpktsec"
-        await nc.publish(subj_out, data)
+        base     = msg.subject.split(".", 1)[0]
+        subj_out = "outpktinsec" if base == "inpktsec" else "outpktsec"
+        await sched.submit(subj_out, data)
+
+        stage["parse"].observe(t1 - t0)
+        stage["control"].observe(t2 - t1)
+        stage["detect"].observe(t3 - t2)
+        stage["log"].observe(t4 - t3)
+        stage["publish"].observe(pc() - t4)
     return handler
 
 async def main():
     nc = NATS()
     await nc.connect(os.getenv("NATS_SURVEYOR_SERVERS", "nats://nats:4222"))
-    handler = await make_handler(nc)
+    sched = DelayScheduler(nc.publish, MEAN_DELAY,
+                           max_inflight=MAX_INFLIGHT,
+                           preserve_order=PRESERVE_ORDER,
+                           lat_hist=tm.delay)
+    relay = asyncio.create_task(supervise("delay stage relay", sched.run))
+    if RAW_COLS:
+        log = ColumnarLogWriter(RAW_COLS, batch=LOG_BATCH, interval=LOG_INTERVAL)
+    else:
+        log = CsvLogWriter(RAW_CSV, RAW_HEADER, batch=LOG_BATCH, interval=LOG_INTERVAL)
+    feat = CsvLogWriter(FEAT_CSV, FEAT_HEADER) if FEAT_CSV else None
+    ctl.logs = [w for w in (log, feat) if w is not None]
+    handler = await make_handler(nc, sched, log, feat)
+
+    if METRICS:
+        tm.gauge("processor_delay_queue_depth", "Frames parked in the delay stage.",
+                 lambda: len(sched))
+        tm.gauge("processor_log_queue_depth", "Rows waiting for the log writer.",
+                 log.qsize)
+        tm.gauge("processor_log_dropped_rows", "Rows dropped: log queue full or writer failed.",
+                 lambda: log.dropped)
+        if PER_FLOW:
+            tm.gauge("processor_active_flows", "Flows in the detector flow table.",
+                     lambda: len(det))
+        port = METRICS_PORT + (int(SHARD) if SHARD is not None else 0)
+        await tm.serve(port)
+        print(f"metrics on :{port}/metrics")
+
+    ctl.poll_files()
+    watcher = asyncio.create_task(ctl.watch_files())
+    await ctl.subscribe(nc)
+
+    stop = asyncio.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        asyncio.get_running_loop().add_signal_handler(sig, stop.set)
 
-    await nc.subscribe("inpktsec",   cb=handler)
-    await nc.subscribe("inpktinsec", cb=handler)
-    print("python-processor online – relaying & detecting")
+    suffix = "" if SHARD is None else f".{SHARD}"
+    await nc.subscribe("inpktsec"   + suffix, cb=handler)
+    await nc.subscribe("inpktinsec" + suffix, cb=handler)
+    print(f"python-processor{suffix} online – relaying & detecting "
+          f"({DETECTORS}, vote {DET_VOTE})")
 
     try:
-        while True:
-            await asyncio.sleep(3600)
+        await stop.wait()
     finally:
+        relay.cancel()
+        watcher.cancel()
+        await asyncio.gather(relay, return_exceptions=True)   # a frame mid-publish goes back to the heap
+        await sched.flush()
+        log.close()
+        if feat is not None:
+            feat.close()
+        print(f"delay stage: {sched.stats()}  log rows: {log.written} "
+              f"(dropped {log.dropped})")
+        if PER_FLOW:
+            print(f"flow table: {det.stats()}")
         await nc.close()
 
 if __name__ == "__main__":
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+pipeline.py  –  pluggable detectors voting on one shared feature vector
+
+A Pipeline runs FeatureExtractor once per frame and hands the same
+features.Features to every enabled detector; none of them looks at the
+frame again. The extractor fills only the feature groups (FEATURES) the
+enabled detectors read, plus any asked for with `features` (main.py asks
+for all of them when it writes FEAT_CSV). Each detector keeps its own
+sliding window but only adds and evicts numbers from the vector, so a
+detector costs O(1) amortised per frame; that constant is paid once per
+enabled detector, so the pipeline's cost grows with the detector count.
+The votes are combined by `vote`:
+
+    any        at least one detector fires (default)
+    all        every detector fires
+    majority   more than half fire
+    <k>        at least k fire
+
+Detectors (DETECTORS), each with the parameters it takes:
+
+    entropy   SlidingEntropyDetector: NOP share, NOP-count entropy, compressibility
+              win_sec, thr_opts, thr_entropy, thr_comp
+    options   share of frames carrying any option type in `opt_types`
+              win_sec, thr_types, opt_types
+    timing    inter-arrival coefficient of variation below thr_cv (paced sender)
+              win_sec, thr_cv, min_pkts
+    ipid      share of IP ID deltas other than 0 or 1 (IDs carrying data)
+              win_sec, thr_ipid
+    ttl       share of frames whose TTL differs from the previous one
+              win_sec, thr_ttl
+    sport     source-port entropy of the window above thr_sport bits
+              thr_sport
+
+Every parameter is an attribute of the Pipeline as well, so ControlState
+(and FlowTable) can retune a running pipeline with a plain setattr().
+"""
+
+import math, time
+from abc import ABC, abstractmethod
+from collections import deque
+from detector import SlidingEntropyDetector
+from features import FeatureExtractor
+
+# Timestamp, NOP, Record Route, loose and strict source route
+OPT_TYPES = (68, 1, 7, 131, 137)
+
+class _Windowed(ABC):
+    """Sliding window of one number per frame with its running sum and sum
+    of squares. value() returns None for frames the detector skips."""
+
+    PARAMS   = ("win_sec",)
+    FEATURES = ()
+    __slots__ = ("win_sec", "max_len", "_ts", "_val", "s", "ss")
+
+    def __init__(self, win_sec: float = 2.0, max_len: int = None):
+        self.win_sec = win_sec
+        self.max_len = max_len
+        self._ts:  deque = deque()
+        self._val: deque = deque()
+        self.s = self.ss = 0.0
+
+    def __len__(self) -> int:
+        return len(self._ts)
+
+    @abstractmethod
+    def value(self, f):
+        ...
+
+    @abstractmethod
+    def decide(self) -> bool:
+        ...
+
+    def update(self, f) -> bool:
+        v = self.value(f)
+        ts, val = self._ts, self._val
+        if v is not None:
+            ts.append(f.ts)
+            val.append(v)
+            self.s  += v
+            self.ss += v * v
+        while ts and (f.ts - ts[0] > self.win_sec or
+                      (self.max_len is not None and len(ts) > self.max_len)):
+            ts.popleft()
+            v = val.popleft()
+            self.s  -= v
+            self.ss -= v * v
+        if not ts:
+            self.s = self.ss = 0.0      # drop accumulated float error
+        return self.decide()
+
+class _Share(_Windowed):
+    """Fires when the share of flagged (1.0) frames in the window exceeds `thr`."""
+
+    __slots__ = ()
+
+    def share(self) -> float:
+        return self.s / len(self._ts) if self._ts else 0.0
+
+class OptionTypeDetector(_Share):
+    PARAMS   = ("win_sec", "thr_types", "opt_types")
+    FEATURES = ("types",)
+    __slots__ = ("thr_types", "_mask")
+
+    def __init__(self, win_sec: float = 2.0, thr_types: float = 0.01,
+                 opt_types=OPT_TYPES, max_len: int = None):
+        super().__init__(win_sec, max_len)
+        self.thr_types = thr_types
+        self.opt_types = opt_types
+
+    @property
+    def opt_types(self) -> tuple:
+        return tuple(t for t in range(256) if self._mask >> t & 1)
+
+    @opt_types.setter
+    def opt_types(self, types):
+        self._mask = 0
+        for t in types:
+            self._mask |= 1 << int(t)
+
+    def value(self, f):
+        return 1.0 if f.mask & self._mask else 0.0
+
+    def decide(self) -> bool:
+        return self.share() > self.thr_types
+
+class TimingDetector(_Windowed):
+    PARAMS   = ("win_sec", "thr_cv", "min_pkts")
+    FEATURES = ("dt",)
+    __slots__ = ("thr_cv", "min_pkts")
+
+    def __init__(self, win_sec: float = 2.0, thr_cv: float = 0.1, min_pkts: int = 4,
+                 max_len: int = None):
+        super().__init__(win_sec, max_len)
+        self.thr_cv   = thr_cv
+        self.min_pkts = min_pkts
+
+    def value(self, f):
+        return f.dt if f.dt > 0 else None
+
+    def cv(self) -> float:
+        n = len(self._ts)
+        if n < 2 or self.s <= 0:
+            return math.inf
+        mean = self.s / n
+        var  = max(0.0, self.ss / n - mean * mean)
+        return math.sqrt(var) / mean
+
+    def decide(self) -> bool:
+        return len(self._ts) >= self.min_pkts and self.cv() < self.thr_cv
+
+class IpidDetector(_Share):
+    PARAMS   = ("win_sec", "thr_ipid")
+    FEATURES = ("ip",)
+    __slots__ = ("thr_ipid",)
+
+    def __init__(self, win_sec: float = 2.0, thr_ipid: float = 0.5, max_len: int = None):
+        super().__init__(win_sec, max_len)
+        self.thr_ipid = thr_ipid
+
+    def value(self, f):
+        return None if f.dipid < 0 else float(f.dipid > 1)
+
+    def decide(self) -> bool:
+        return self.share() > self.thr_ipid
+
+class TtlDetector(_Share):
+    PARAMS   = ("win_sec", "thr_ttl")
+    FEATURES = ("ip",)
+    __slots__ = ("thr_ttl", "_last")
+
+    def __init__(self, win_sec: float = 2.0, thr_ttl: float = 0.5, max_len: int = None):
+        super().__init__(win_sec, max_len)
+        self.thr_ttl = thr_ttl
+        self._last   = None
+
+    def value(self, f):
+        if not f.ttl:
+            return None
+        last, self._last = self._last, f.ttl
+        return None if last is None else float(f.ttl != last)
+
+    def decide(self) -> bool:
+        return self.share() > self.thr_ttl
+
+class SportDetector:
+    """Reads sport_ent straight off the vector; the extractor owns the window."""
+
+    PARAMS   = ("thr_sport",)
+    FEATURES = ("sport",)
+    __slots__ = ("thr_sport",)
+
+    def __init__(self, thr_sport: float = 2.0, max_len: int = None):
+        self.thr_sport = thr_sport
+
+    def __len__(self) -> int:
+        return 0
+
+    def update(self, f) -> bool:
+        return f.sport_ent > self.thr_sport
+
+DETECTORS = {
+    "entropy": SlidingEntropyDetector,
+    "options": OptionTypeDetector,
+    "timing":  TimingDetector,
+    "ipid":    IpidDetector,
+    "ttl":     TtlDetector,
+    "sport":   SportDetector,
+}
+
+def detector_names(spec) -> list:
+    """"entropy,timing" (or a list) -> validated detector names, in order."""
+    names = [n.strip() for n in spec.split(",")] if isinstance(spec, str) else list(spec)
+    names = [n for n in names if n]
+    bad = [n for n in names if n not in DETECTORS]
+    if bad or not names:
+        raise ValueError(f"unknown detector(s) {bad or spec!r}; choose from {', '.join(DETECTORS)}")
+    return list(dict.fromkeys(names))
+
+def param_names(spec) -> set:
+    """Parameters the detectors of `spec` take (win_sec always, it sizes the sport window)."""
+    return {"win_sec"}.union(*(DETECTORS[n].PARAMS for n in detector_names(spec)))
+
+def quorum(vote, n: int) -> int:
+    """Number of detectors out of `n` that must fire for `vote`."""
+    vote = str(vote).strip().lower()
+    if vote == "any":
+        return 1
+    if vote == "all":
+        return n
+    if vote == "majority":
+        return n // 2 + 1
+    if vote.isdigit() and 1 <= int(vote) <= n:
+        return int(vote)
+    raise ValueError(f"vote must be any, all, majority or 1..{n}, not {vote!r}")
+
+class Pipeline:
+    __slots__ = ("names", "dets", "extractor", "quorum", "last", "_vote", "_owners")
+
+    def __init__(self, detectors="entropy", vote: str = "any", max_len: int = None,
+                 features=(), **params):
+        unknown = set(params) - param_names(detectors)
+        if unknown:
+            raise TypeError(f"parameters {sorted(unknown)} not taken by detectors {detectors!r}")
+        set_ = object.__setattr__
+        set_(self, "names", detector_names(detectors))
+        need = set(features).union(*(DETECTORS[n].FEATURES for n in self.names))
+        set_(self, "extractor", FeatureExtractor(params.get("win_sec", 2.0), max_len, need))
+        set_(self, "dets", [])
+        set_(self, "_owners", {"win_sec": [self.extractor]})
+        for name in self.names:
+            cls = DETECTORS[name]
+            det = cls(max_len=max_len, **{k: params[k] for k in cls.PARAMS if k in params})
+            self.dets.append(det)
+            for k in cls.PARAMS:
+                self._owners.setdefault(k, []).append(det)
+        set_(self, "last", None)        # Features of the latest frame (FEAT_CSV)
+        self.vote = vote
+
+    @property
+    def vote(self) -> str:
+        return self._vote
+
+    @vote.setter
+    def vote(self, vote):
+        object.__setattr__(self, "quorum", quorum(vote, len(self.dets)))
+        object.__setattr__(self, "_vote", str(vote).strip().lower())
+
+    def __getattr__(self, name):
+        # only reached for names that are not slots: the detector parameters
+        if not name.startswith("_") and name not in Pipeline.__slots__:
+            owners = self._owners.get(name)
+            if owners:
+                return getattr(owners[-1], name)
+        raise AttributeError(name)
+
+    def __setattr__(self, name, val):
+        if name in Pipeline.__slots__ or name == "vote":
+            object.__setattr__(self, name, val)
+            return
+        owners = self._owners.get(name)
+        if not owners:
+            raise AttributeError(f"no enabled detector takes {name!r}")
+        for o in owners:
+            setattr(o, name, val)
+
+    def __len__(self) -> int:
+        return len(self.extractor) + sum(len(d) for d in self.dets)
+
+    def feed_frame(self, fr, data, now: float = None) -> bool:
+        """Extract the vector of one frame (frame.parse result + raw bytes) and vote."""
+        if now is None:
+            now = time.time()
+        f = self.extractor.extract(fr, data, now)
+        object.__setattr__(self, "last", f)
+        hits = 0
+        for det in self.dets:
+            hits += det.update(f)
+        return hits >= self.quorum
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+scheduler.py  –  delayed publishing without blocking the NATS callback
+
+Every frame gets a release time (now + expovariate(1/mean)) and is parked
+in a heap; one task publishes frames as they come due, so the per-frame
+delays overlap instead of serialising behind nats-py's sequential
+subscription callbacks.
+
+Frames of one subject still leave in arrival order by default (a frame is
+never released before the previous one), as they did when the callback
+slept: the framed covert receiver cannot decode reordered frames. The
+delay a frame actually gets is then max(sample, previous release - now),
+which is NOT Exp(1/mean): whenever frames arrive faster than the mean
+delay it is stretched towards the queueing delay of the subject. stats()
+reports both the sampled and the applied mean so a run labelled with
+MEAN_DELAY can be checked against what the channel saw.
+preserve_order=False gives every frame its own independent Exp(1/mean)
+delay and lets them overtake each other.
+"""
+
+import asyncio, heapq, itertools, random
+
+class DelayScheduler:
+    def __init__(self, publish, mean_delay: float,
+                 max_inflight: int = 10000,
+                 preserve_order: bool = True,
+                 lat_hist=None):
+        self.publish        = publish          # async (subject, data) -> None
+        self.mean_delay     = mean_delay
+        self.max_inflight   = max_inflight
+        self.preserve_order = preserve_order
+        self._heap  = []
+        self._seq   = itertools.count()
+        self._wake  = asyncio.Event()
+        self._slots = asyncio.Semaphore(max_inflight)
+        self._last  = {}                       # subject -> last release time
+        self.submitted, self.sampled_sum, self.applied_sum = 0, 0.0, 0.0
+        self.sent, self.lat_sum, self.lat_max = 0, 0.0, 0.0
+        self.errors = 0                        # publishes that raised (frame dropped)
+        self.lat_hist = lat_hist               # optional telemetry.Histogram
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def sample(self) -> float:
+        return random.expovariate(1 / self.mean_delay) if self.mean_delay > 0 else 0.0
+
+    def release_time(self, subject: str, now: float) -> float:
+        """When a frame for `subject` submitted at `now` is due (see simulate.py)."""
+        d   = self.sample()
+        due = now + d
+        if self.preserve_order:
+            # FIFO per subject: never release before the previous frame
+            due = max(due, self._last.get(subject, 0.0))
+            self._last[subject] = due
+        self.submitted   += 1
+        self.sampled_sum += d
+        self.applied_sum += due - now
+        return due
+
+    async def submit(self, subject: str, data: bytes):
+        """Queue `data` for `subject`; only waits when max_inflight is reached."""
+        await self._slots.acquire()
+        now = asyncio.get_running_loop().time()
+        due = self.release_time(subject, now)
+        heapq.heappush(self._heap, (due, next(self._seq), now, subject, data))
+        self._wake.set()
+
+    async def _emit(self):
+        item = heapq.heappop(self._heap)
+        _, _, t_in, subject, data = item
+        parked = False
+        try:
+            await self.publish(subject, data)
+        except asyncio.CancelledError:
+            heapq.heappush(self._heap, item)   # still parked: flush() sends it
+            parked = True
+            raise
+        except Exception as e:
+            self.errors += 1
+            print(f"delay stage: publish to {subject} failed: {e!r}", flush=True)
+            return
+        finally:
+            if not parked:
+                self._slots.release()
+        lat = asyncio.get_running_loop().time() - t_in
+        self.sent    += 1
+        self.lat_sum += lat
+        self.lat_max  = max(self.lat_max, lat)
+        if self.lat_hist is not None:
+            self.lat_hist.observe(lat)
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            if not self._heap:
+                self._wake.clear()
+                await self._wake.wait()
+                continue
+            now  = loop.time()
+            wait = self._heap[0][0] - now
+            if wait > 0:
+                self._wake.clear()
+                try:
+                    await asyncio.wait_for(self._wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            while self._heap and self._heap[0][0] <= now:
+                await self._emit()
+
+    async def flush(self):
+        """Publish everything still parked, regardless of release time."""
+        while self._heap:
+            await self._emit()
+
+    def stats(self) -> dict:
+        return {
+            "sent":     self.sent,
+            "inflight": len(self._heap),
+            "lat_mean": self.lat_sum / self.sent if self.sent else 0.0,
+            "lat_max":  self.lat_max,
+            # sampled ~ Exp(1/mean); applied >= sampled once order is kept
+            "delay_sampled_mean": self.sampled_sum / self.submitted if self.submitted else 0.0,
+            "delay_applied_mean": self.applied_sum / self.submitted if self.submitted else 0.0,
+            "errors":   self.errors,
+        }
+
+async def supervise(name: str, task_fn, backoff: float = 0.5):
+    """Run `task_fn()` until cancelled, restarting it (after `backoff` s) if it raises."""
+    while True:
+        try:
+            await task_fn()
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"{name} died: {e!r}; restarting", flush=True)
+            await asyncio.sleep(backoff)
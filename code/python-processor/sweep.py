@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+sweep.py  –  offline threshold sweep for SlidingEntropyDetector
+
+Loads a per-packet feature log (run main.py with FEAT_CSV=/tmp/feat.csv)
+once into NumPy arrays. For every window length it derives the detector's
+three features for all packets at the same time: searchsorted gives each
+packet's window start and cumulative sums give the window totals. The
+(thr_opts, thr_ent, thr_comp) grid is then evaluated by broadcasting over
+blocks of packets (at most --chunk packet × grid cells at a time, so
+memory stays bounded for long logs and large grids), and each block's
+per-config confusion counts are added up with a bincount.
+
+Only the entropy detector is swept. The other pipeline detectors (types,
+dt, ipid/ttl, sport) are not; tune those with simulate.py or live
+through control.py.
+
+Usage:
+    python3 sweep.py feat.csv --win 1,2,4 --thr-opts 0.01,0.05 \\
+        --thr-ent 0.5,1,1.5 --thr-comp 0.3,0.5 -o sweep.csv
+
+Output rows: win_sec,thr_opts,thr_ent,thr_comp,config,tp,tn,fp,fn,acc,prec,rec,f1
+(config "ALL" is the overall row, same formulas as metrics.py).
+"""
+
+import sys, csv, time, argparse, itertools
+import numpy as np
+
+def load(path: str) -> dict:
+    with open(path, newline="") as f:
+        r = csv.reader(f)
+        cols = {name: i for i, name in enumerate(next(r))}
+        rows = list(r)
+    col = lambda name, dt: np.array([row[cols[name]] for row in rows], dtype=dt)
+    cfg_names, cfg = np.unique(np.array([row[cols["config"]] for row in rows]),
+                               return_inverse=True)
+    ts = col("ts", np.float64)
+    order = np.argsort(ts, kind="stable")
+    return {
+        "ts":       ts[order],
+        "truth":    col("truth",    np.int8)[order],
+        "nops":     col("nops",     np.int16)[order],
+        "opt_len":  col("opt_len",  np.int64)[order],
+        "comp_len": col("comp_len", np.int64)[order],
+        "cfg":      cfg[order],
+        "cfg_names": list(cfg_names),
+    }
+
+def _csum(x):
+    return np.concatenate(([0], np.cumsum(x, dtype=np.float64)))
+
+def window_features(d: dict, win_sec: float):
+    """pct_opts, entropy, comp_ratio per packet, as the detector sees them."""
+    ts, nops = d["ts"], d["nops"]
+    hi = np.arange(1, len(ts) + 1)
+    lo = np.searchsorted(ts, ts - win_sec, side="left")
+    n  = hi - lo
+
+    has = nops > 0
+    cs_opt = _csum(has)
+    n_opts = cs_opt[hi] - cs_opt[lo]
+
+    ent = np.zeros(len(ts))
+    safe_n = np.where(n_opts > 0, n_opts, 1)
+    for v in np.unique(nops[has]):
+        cs = _csum(nops == v)
+        p  = (cs[hi] - cs[lo]) / safe_n
+        ent -= np.where(p > 0, p * np.log2(np.where(p > 0, p, 1)), 0.0)
+
+    cs_raw, cs_comp = _csum(d["opt_len"]), _csum(d["comp_len"])
+    raw  = cs_raw[hi]  - cs_raw[lo]
+    comp = cs_comp[hi] - cs_comp[lo]
+    return n_opts / n, ent, comp / np.where(raw > 0, raw, 1)
+
+def sweep(d: dict, wins, t_opts, t_ent, t_comp, chunk: int = 1 << 22):
+    grid  = np.array(list(itertools.product(t_opts, t_ent, t_comp)))   # (G, 3)
+    G     = len(grid)
+    ncfg  = len(d["cfg_names"])
+    truth = d["truth"].astype(np.int64)
+    # combined index: (config, truth, pred) -> 0..4*ncfg
+    base  = d["cfg"] * 4 + truth * 2
+    goff  = (np.arange(G) * 4 * ncfg)[None, :]
+    rows  = max(1, chunk // G)                  # packets per (rows, G) block
+    out = []
+    for win in wins:
+        pct, ent, cr = window_features(d, win)
+        cm = np.zeros(G * 4 * ncfg, dtype=np.int64)
+        for a in range(0, len(base), rows):
+            b    = slice(a, a + rows)
+            pred = ((pct[b, None] > grid[None, :, 0]) &
+                    (ent[b, None] > grid[None, :, 1]) &
+                    (cr[b, None]  > grid[None, :, 2]))                 # (rows, G)
+            idx  = base[b, None] + pred + goff
+            cm  += np.bincount(idx.ravel(), minlength=G * 4 * ncfg)
+        out.append((win, grid, cm.reshape(G, ncfg, 4)))
+    return out
+
+def _scores(tn, fp, fn, tp):
+    n    = tp + tn + fp + fn
+    acc  = np.divide(tp + tn, n, out=np.zeros(n.shape), where=n > 0)
+    prec = np.divide(tp, tp + fp, out=np.zeros(n.shape), where=(tp + fp) > 0)
+    rec  = np.divide(tp, tp + fn, out=np.zeros(n.shape), where=(tp + fn) > 0)
+    den  = 2 * tp + fp + fn
+    f1   = np.divide(2 * tp, den, out=np.zeros(n.shape), where=den > 0)
+    return acc, prec, rec, f1
+
+def write(results, cfg_names, path: str):
+    names = list(cfg_names) + ["ALL"]
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["win_sec","thr_opts","thr_ent","thr_comp","config",
+                    "tp","tn","fp","fn","acc","prec","rec","f1"])
+        for win, grid, cm in results:
+            cm = np.concatenate((cm, cm.sum(axis=1, keepdims=True)), axis=1)
+            tn, fp, fn, tp = (cm[..., k] for k in range(4))
+            acc, prec, rec, f1 = _scores(tn, fp, fn, tp)
+            for g, (to, te, tc) in enumerate(grid):
+                for c, name in enumerate(names):
+                    w.writerow([win, to, te, tc, name,
+                                tp[g, c], tn[g, c], fp[g, c], fn[g, c],
+                                acc[g, c], prec[g, c], rec[g, c], f1[g, c]])
+
+def _floats(s: str):
+    return [float(x) for x in s.split(",")]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("features", help="FEAT_CSV written by main.py")
+    ap.add_argument("--win",      type=_floats, default=[2.0])
+    ap.add_argument("--thr-opts", type=_floats, default=[0.01])
+    ap.add_argument("--thr-ent",  type=_floats, default=[1.0])
+    ap.add_argument("--thr-comp", type=_floats, default=[0.5])
+    ap.add_argument("--chunk",    type=int, default=1 << 22,
+                    help="packet × grid cells evaluated at a time (bounds memory)")
+    ap.add_argument("-o", "--out", default="sweep.csv")
+    args = ap.parse_args()
+
+    t0 = time.time()
+    d  = load(args.features)
+    t1 = time.time()
+    res = sweep(d, args.win, args.thr_opts, args.thr_ent, args.thr_comp, args.chunk)
+    t2 = time.time()
+    write(res, d["cfg_names"], args.out)
+
+    pts = len(args.win) * len(args.thr_opts) * len(args.thr_ent) * len(args.thr_comp)
+    print(f"{len(d['ts'])} packets, {pts} grid points: "
+          f"load {t1 - t0:.2f}s, sweep {t2 - t1:.2f}s → {args.out}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
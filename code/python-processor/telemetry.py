@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+telemetry.py  –  low-overhead Prometheus instrumentation for the processor
+
+Fixed-bucket histograms (one bisect + two adds per observation), plain
+counters and callback gauges, exposed in the Prometheus text format on
+http://<host>:METRICS_PORT/metrics by a tiny asyncio server. Telemetry(False)
+hands out no-op instruments so the handler code stays the same whether
+instrumentation is on or off.
+"""
+
+import asyncio, bisect
+
+# seconds; hot-path stages are µs-scale, the delay stage is ms-scale
+STAGE_BUCKETS = (5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3,
+                 2.5e-3, 5e-3, 1e-2)
+DELAY_BUCKETS = (1e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+STAGES = ("parse", "control", "detect", "log", "publish")
+
+class Histogram:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum    = 0.0
+
+    def observe(self, v: float):
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+
+    def render(self, name: str, labels: str = "") -> list:
+        sep, out, acc = ("," if labels else ""), [], 0
+        for b, c in zip(self.bounds, self.counts):
+            acc += c
+            out.append(f'{name}_bucket{{{labels}{sep}le="{b:g}"}} {acc}')
+        acc += self.counts[-1]
+        out.append(f'{name}_bucket{{{labels}{sep}le="+Inf"}} {acc}')
+        lb = f"{{{labels}}}" if labels else ""
+        out.append(f"{name}_sum{lb} {self.sum}")
+        out.append(f"{name}_count{lb} {acc}")
+        return out
+
+class _Null:
+    __slots__ = ()
+    def observe(self, v: float):
+        pass
+
+_NULL = _Null()
+
+class Telemetry:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stage   = {s: Histogram(STAGE_BUCKETS) if enabled else _NULL for s in STAGES}
+        self.delay   = Histogram(DELAY_BUCKETS) if enabled else _NULL
+        self.frames  = {}                   # subject -> count
+        self.alerts  = 0
+        self.gauges  = {}                   # name -> (help, callable)
+
+    def frame(self, subject: str):
+        if self.enabled:
+            self.frames[subject] = self.frames.get(subject, 0) + 1
+
+    def alert(self):
+        self.alerts += 1
+
+    def gauge(self, name: str, help_: str, fn):
+        self.gauges[name] = (help_, fn)
+
+    def render(self) -> str:
+        out = ["# HELP processor_stage_seconds Handler time per stage.",
+               "# TYPE processor_stage_seconds histogram"]
+        for s, h in self.stage.items():
+            out += h.render("processor_stage_seconds", f'stage="{s}"')
+        out += ["# HELP processor_delay_seconds Time frames spend in the delay stage.",
+                "# TYPE processor_delay_seconds histogram"]
+        out += self.delay.render("processor_delay_seconds")
+        out += ["# HELP processor_frames_total Frames received per subject.",
+                "# TYPE processor_frames_total counter"]
+        out += [f'processor_frames_total{{subject="{k}"}} {v}' for k, v in self.frames.items()]
+        out += ["# HELP processor_alerts_total Covert-channel alerts raised.",
+                "# TYPE processor_alerts_total counter",
+                f"processor_alerts_total {self.alerts}"]
+        for name, (help_, fn) in self.gauges.items():
+            out += [f"# HELP {name} {help_}", f"# TYPE {name} gauge", f"{name} {fn()}"]
+        return "\n".join(out) + "\n"
+
+    async def serve(self, port: int, host: str = "0.0.0.0"):
+        async def on_conn(reader, writer):
+            try:
+                req = await reader.readline()
+                while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    pass
+                if req.split(b" ")[1:2] == [b"/metrics"]:
+                    body, status = self.render().encode(), "200 OK"
+                else:
+                    body, status = b"not found\n", "404 Not Found"
+                writer.write(f"HTTP/1.1 {status}\r\n"
+                             "Content-Type: text/plain; version=0.0.4\r\n"
+                             f"Content-Length: {len(body)}\r\n"
+                             "Connection: close\r\n\r\n".encode() + body)
+                await writer.drain()
+            finally:
+                writer.close()
+        return await asyncio.start_server(on_conn, host, port)
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+rawtx.py  –  persistent raw-socket transmit engine for the covert senders
+
+One IP_HDRINCL socket is opened for the whole run. Every distinct
+(options, payload) pair is serialised once into an IPv4/UDP byte template;
+per packet only the UDP source port, the UDP checksum (incremental
+one's-complement update) and optionally the IP ID are patched. The kernel
+fills in the total length, the IP checksum and, when left at 0, the IP ID. Packets are paced on deadlines taken from
+time.monotonic(). Packets already due are flushed together with
+sendmmsg(2), falling back to sendto() where libc lacks it.
+"""
+
+import os, time, random, socket, struct, ctypes, ctypes.util
+
+IPPROTO_UDP = 17
+
+def _csum_add(s: int, data: bytes) -> int:
+    if len(data) & 1:
+        data += b"\x00"
+    s += sum(struct.unpack(f"!{len(data) // 2}H", data))
+    while s >> 16:
+        s = (s & 0xFFFF) + (s >> 16)
+    return s
+
+def _fold(s: int) -> int:
+    while s >> 16:
+        s = (s & 0xFFFF) + (s >> 16)
+    return s
+
+# ───────── sendmmsg via ctypes ───────── #
+class _iovec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+class _msghdr(ctypes.Structure):
+    _fields_ = [("msg_name", ctypes.c_void_p), ("msg_namelen", ctypes.c_uint32),
+                ("msg_iov", ctypes.POINTER(_iovec)), ("msg_iovlen", ctypes.c_size_t),
+                ("msg_control", ctypes.c_void_p), ("msg_controllen", ctypes.c_size_t),
+                ("msg_flags", ctypes.c_int)]
+
+class _mmsghdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _msghdr), ("msg_len", ctypes.c_uint)]
+
+def _load_sendmmsg():
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fn = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    fn.restype  = ctypes.c_int
+    return fn
+
+_sendmmsg = _load_sendmmsg()
+
+class RawSender:
+    def __init__(self, dst: str, dport: int, iface: str = None, batch: int = 64):
+        self.dst, self.dport, self.batch = dst, dport, batch
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_RAW)
+        self.sock.setsockopt(socket.IPPROTO_IP, socket.IP_HDRINCL, 1)
+        if iface:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, iface.encode())
+        self.src = self._source_ip(dst, iface)
+        self._templates = {}
+        self._addr = struct.pack("=HH4s8x", socket.AF_INET, 0, socket.inet_aton(dst))
+        self.sent  = 0
+
+    @staticmethod
+    def _source_ip(dst: str, iface: str = None) -> str:
+        # the UDP checksum covers the source address, so learn it up front
+        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            if iface:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, iface.encode())
+            s.connect((dst, 9))
+            return s.getsockname()[0]
+        finally:
+            s.close()
+
+    def close(self):
+        self.sock.close()
+
+    def template(self, opts: bytes, payload: bytes):
+        """(bytes with sport=0, folded checksum base, UDP offset), cached."""
+        key = (opts, payload)
+        t = self._templates.get(key)
+        if t is not None:
+            return t
+        ihl   = 5 + len(opts) // 4
+        ulen  = 8 + len(payload)
+        iph   = struct.pack("!BBHHHBBH4s4s", 0x40 | ihl, 0, ihl * 4 + ulen, 0, 0,
+                            64, IPPROTO_UDP, 0,
+                            socket.inet_aton(self.src), socket.inet_aton(self.dst)) + opts
+        udp   = struct.pack("!HHHH", 0, self.dport, ulen, 0) + payload
+        pseudo = struct.pack("!4s4sBBH", socket.inet_aton(self.src),
+                             socket.inet_aton(self.dst), 0, IPPROTO_UDP, ulen)
+        base  = _csum_add(_csum_add(0, pseudo), udp)
+        t = (iph + udp, base, ihl * 4)
+        self._templates[key] = t
+        return t
+
+    def packet(self, opts: bytes, payload: bytes, sport: int = None, ipid: int = 0) -> bytes:
+        raw, base, off = self.template(opts, payload)
+        if sport is None:
+            sport = random.randint(1024, 65535)
+        ck = ~_fold(base + sport) & 0xFFFF or 0xFFFF
+        buf = bytearray(raw)
+        struct.pack_into("!H", buf, off, sport)
+        struct.pack_into("!H", buf, off + 6, ck)
+        if ipid:
+            struct.pack_into("!H", buf, 4, ipid)
+        return bytes(buf)
+
+    def flush(self, pkts: list):
+        if not pkts:
+            return
+        if _sendmmsg is None:
+            for p in pkts:
+                self.sock.sendto(p, (self.dst, 0))
+            self.sent += len(pkts)
+            pkts.clear()
+            return
+        n     = len(pkts)
+        bufs  = [ctypes.create_string_buffer(p, len(p)) for p in pkts]
+        iovs  = (_iovec * n)(*[_iovec(ctypes.addressof(b), len(p)) for b, p in zip(bufs, pkts)])
+        addr  = ctypes.create_string_buffer(self._addr, len(self._addr))
+        msgs  = (_mmsghdr * n)()
+        for i in range(n):
+            h = msgs[i].msg_hdr
+            h.msg_name, h.msg_namelen = ctypes.addressof(addr), len(self._addr)
+            h.msg_iov, h.msg_iovlen   = ctypes.pointer(iovs[i]), 1
+        done = 0
+        while done < n:
+            r = _sendmmsg(self.sock.fileno(), ctypes.addressof(msgs) + done * ctypes.sizeof(_mmsghdr),
+                          n - done, 0)
+            if r < 0:
+                err = ctypes.get_errno()
+                raise OSError(err, os.strerror(err))
+            done += r
+        self.sent += n
+        pkts.clear()
+
+    def send(self, items):
+        """Send (opts, payload[, sport[, ipid]]) items right away, in one batch."""
+        self.flush([self.packet(*item) for item in items])
+
+    def run(self, seq, gap):
+        """Send every (opts, payload[, sport[, ipid]]) in `seq`; gap() is the spacing after each.
+
+        Packets are released on absolute monotonic deadlines, so time spent
+        building/sending does not add to the configured spacing; whatever
+        is already due goes out in one sendmmsg batch.
+        """
+        pending, deadline = [], time.monotonic()
+        for item in seq:
+            wait = deadline - time.monotonic()
+            if wait > 0:
+                self.flush(pending)
+                time.sleep(wait)
+            pending.append(self.packet(*item))
+            if len(pending) >= self.batch:
+                self.flush(pending)
+            deadline += gap()
+        self.flush(pending)
+        wait = deadline - time.monotonic()      # trailing gap, like sleep() did
+        if wait > 0:
+            time.sleep(wait)
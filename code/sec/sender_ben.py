@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
-import csv, pathlib, time, socket, os
+import csv, pathlib, time, socket, os, sys, argparse
 
-def udp_sender():
+def udp_sender(message=None, timeout=None):
     csv_name = "sender_ben_log.csv"
     if not pathlib.Path(csv_name).exists():
         with open(csv_name, "w", newline="") as f:
@@ -9,17 +9,22 @@ def udp_sender():
 
     host = os.getenv("INSECURENET_HOST_IP")
     port = 8888
-    message = os.getenv("BENIGN_MSG", "Hello, InSecureNet!")
+    message = message or os.getenv("BENIGN_MSG", "Hello, InSecureNet!")
 
     if not host:
         print("INSECURENET_HOST_IP environment variable is not set.")
         return
 
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(timeout)
     try:
         t0 = time.time()
         sock.sendto(message.encode(), (host, port))
-        response, _ = sock.recvfrom(4096)          # echo from receiver
+        try:
+            response, _ = sock.recvfrom(4096)      # echo from receiver
+        except socket.timeout:
+            print(f"no echo within {timeout}s", flush=True)
+            return None
         t1 = time.time()
         rtt = t1 - t0
 
@@ -28,9 +33,27 @@ def udp_sender():
                 [f"{t1:.6f}", host, port, len(message), f"{rtt:.4f}"]
             )
 
-        print(f"TX→RX round-trip {rtt:.3f}s  (one-shot, exiting)")
+        print(f"TX→RX round-trip {rtt:.3f}s  (one-shot, exiting)", flush=True)
+        return rtt
     finally:
         sock.close()                               # process ends here
 
+def daemon(path: str):
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+    from covert.ctl import serve
+
+    def run(params):
+        # a daemon must not hang on a lost echo
+        return {"rtt": udp_sender(params.get("message"), float(params.get("timeout", 2.0)))}
+
+    serve(path, {"run": run})
+
 if __name__ == "__main__":
-    udp_sender()
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--daemon", default="", metavar="SOCK",
+                    help="take run commands on this unix socket (see covert/ctl.py)")
+    args = ap.parse_args()
+    if args.daemon:
+        daemon(args.daemon)
+    else:
+        udp_sender()
@@ -1,105 +1,295 @@
 #!/usr/bin/env python3
-import os, sys, time, argparse, random, csv, pathlib, hashlib
+import os, sys, time, argparse, random, csv, socket, select
 from datetime import datetime
-from scapy.all import IP, UDP, Raw, send
+from itertools import zip_longest
+from rawtx import RawSender
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from covert.codec import bytes_to_symbols, scramble, alphabet, stripe_tag, seq_to_ipid
+from covert.fec import parse_fec
+from covert.arq import SendWindow, parse_sack, ACK_PORT, GIVE_UP
+from covert.bulk import CHUNK, chunk_size, read_chunks, encode_chunks, Progress
+from covert.ctl import serve, coerce
+from covert.csvlog import start_log
 
-# ── SCRAMBLE SETTINGS ────────────────────────────────────────────────────
-SESSION_KEY = b"2444172"  # shared secret for XOR masking
+CSV_NAME   = "sender_log.csv"
+CSV_HEADER = ["run_idx","message","nop_bits","pps","delay","target_ip","port",
+              "bits","duration","bps","timestamp","flows","encoding","fec","retx"]
 
-def pad4(opt: bytes) -> bytes:
-    return opt + b"\x00" * ((4 - (len(opt) & 3)) & 3)
+def scapy_send(cfg, opts, tag, sport=None, ipid=0):
+    from scapy.all import IP, UDP, Raw, send
+    send(IP(dst=cfg.target_ip, options=opts, **({"id": ipid} if ipid else {}))
+         / UDP(sport=sport or random.randint(1024, 65535), dport=cfg.port)
+         / Raw(load=tag), iface=cfg.iface, verbose=False)
 
-def build_opts(n: int) -> bytes:
-    # 4-byte fake Timestamp header followed by NOPs
-    if n == 0:
-        return b""
-    TS = b"\x44\x04\x00\x00"         # Type=68 (Timestamp), Len=4, dummy data
-    raw_opts = TS + b"\x01" * n
-    return pad4(raw_opts)
+def send_arq(cfg, tx, enc, masked, START, END) -> int:
+    """Selective-repeat transfer of `masked` on one flow; returns retransmissions."""
+    n, run = len(masked), random.getrandbits(16)
+    win = SendWindow(n, cfg.window, cfg.rto)
 
-def text_to_symbols(txt: str, bits: int):
-    bitstr = "".join(f"{ord(c):08b}" for c in txt)
-    bitstr += "0" * ((-len(bitstr)) % bits)
-    return [int(bitstr[i : i + bits], 2) for i in range(0, len(bitstr), bits)]
+    def emit(items):
+        if tx is not None:
+            tx.send(items)
+        else:
+            for item in items:
+                scapy_send(cfg, *item)
+        if cfg.delay:
+            time.sleep(max(0, cfg.delay + random.gauss(0, 0.3 * cfg.delay)))
 
-def send_once(cfg):
-    if cfg.nop_bits > 5:
-        sys.exit("nop-mapping-bits cannot exceed 5")
+    ack = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    ack.bind(("", cfg.ack_port))
+    ack.setblocking(False)
+    try:
+        for _ in range(3):
+            emit([(enc(START), stripe_tag(b"START", 0, 1, n, run), None, 0)])
+        last = time.monotonic()
+        while not win.done():
+            now = time.monotonic()
+            while True:                     # drain pending SACKs
+                try:
+                    sack = parse_sack(ack.recv(2048))
+                except BlockingIOError:
+                    break
+                if sack and sack[0] == run and win.ack(sack[1], sack[2], now):
+                    last = now
+            if win.done():
+                break
+            # paced: one symbol per gap, so SACKs are seen between packets
+            due = win.due(now, 1 if cfg.delay else None)
+            if due:
+                emit([(enc(masked[i]), stripe_tag(b"DATA", 0, 1, run=run), None, seq_to_ipid(i))
+                      for i in due])
+                continue
+            if now - last > GIVE_UP:
+                print(f"[!] no ACK progress for {GIVE_UP:.0f}s, {n - win.base} symbols unacked")
+                break
+            select.select([ack], [], [], win.wait(now))
+        for _ in range(3):
+            emit([(enc(END), stripe_tag(b"END", 0, 1, n, run), None, 0)])
+    finally:
+        ack.close()
+    return win.retx
 
-    # framing symbols
-    START, END = (1 << cfg.nop_bits), (1 << cfg.nop_bits) + 1
-    symbols = text_to_symbols(cfg.message, cfg.nop_bits)
-
-    # helper to scramble/descramble a symbol
-    def make_mask(idx: int, bits: int) -> int:
-        data = SESSION_KEY + str(idx).encode()
-        digest = hashlib.sha256(data).digest()
-        return int.from_bytes(digest, byteorder='big') % (1 << bits)
-    
-    def pkt(sym, tag=b"DATA"):
-        return (IP(dst=cfg.target_ip, options=build_opts(sym))
-                / UDP(sport=random.randint(1024, 65535), dport=cfg.port)
-                / Raw(load=tag))
+def send_bulk(cfg, tx, alpha, code):
+    """Stream --file through the framed single-flow path; constant memory."""
+    enc, bits = alpha.encode, cfg.nop_bits
+    prog = Progress("tx", cfg.progress)
+    sent = {"bytes": 0, "syms": 0}
 
-    t0 = time.time()
-    # send START markers
-    for _ in range(3):
-        send(pkt(START, b"START"), iface=cfg.iface, verbose=False)
+    def frames():
+        f = sys.stdin.buffer if cfg.file == "-" else open(cfg.file, "rb")
+        try:
+            for _ in range(3):
+                yield enc(alpha.START), b"START"
+            for masked, n in encode_chunks(read_chunks(f, chunk_size(cfg.chunk, bits)), bits, code):
+                for v in masked.tolist():
+                    for _ in range(cfg.pps):
+                        yield enc(v), b"DATA"
+                    sent["syms"] += 1
+                    prog.update(sent["syms"] * bits)
+                sent["bytes"] += n
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+        for _ in range(3):                  # END carries the payload length
+            yield enc(alpha.END), stripe_tag(b"END", 0, 1, sent["bytes"])
+
+    def gap():
         jitter = random.gauss(0, 0.3 * cfg.delay)
-        time.sleep(max(0, cfg.delay + jitter))
-
-    # send data symbols (scrambled)
-    for idx, s in enumerate(symbols):
-        masked = s ^ make_mask(idx, cfg.nop_bits)  # ✅ Correct
-        for _ in range(cfg.pps):
-            send(pkt(masked), iface=cfg.iface, verbose=False)
-            jitter = random.gauss(0, 0.3 * cfg.delay)
-            time.sleep(max(0, cfg.delay + jitter))
-
-    # send END markers
-    for _ in range(3):
-        send(pkt(END, b"END"), iface=cfg.iface, verbose=False)
+        return max(0, cfg.delay + jitter)
+
+    t0 = time.time()
+    if tx is not None:
+        tx.run(frames(), gap)
+    else:
+        for item in frames():
+            scapy_send(cfg, *item)
+            time.sleep(gap())
+    dur  = time.time() - t0
+    bits = sent["syms"] * bits if code is None else sent["bytes"] * 8
+    return bits, dur, bits / dur, 0
+
+def covert_frames(cfg, alpha, code):
+    """(enc, frames, gap, masked, bits) for sending --message.
+
+    `frames` yields (opts, tag, sport, ipid) items; gap() is the pause after
+    the item just taken from it. `masked` are the scrambled data symbols and
+    `bits` the message bits (parity excluded under FEC).
+    """
+    # framing symbols
+    START, END = alpha.START, alpha.END
+    data    = cfg.message.encode("latin-1")
+    if code is None:
+        symbols = bytes_to_symbols(data, cfg.nop_bits)
+    else:                                   # RS blocks, interleaved
+        symbols = code.encode(data)
+    enc     = alpha.encode
+
+    K       = cfg.flows
+    masked  = scramble(symbols, cfg.nop_bits).tolist()
+    # one fixed source port per flow when striping; random per packet otherwise
+    sports  = random.sample(range(1024, 65536), K) if K > 1 else [None]
+    slot_end = [True]
+
+    # sequence mode: symbol i carries i in the IP ID, markers carry the length,
+    # every tag carries a run id so stragglers cannot leak into the next run
+    total   = len(masked) if cfg.seq else None
+    run     = random.getrandbits(16) if cfg.seq else None
+
+    def stripe(k):
+        # START markers, scrambled data symbols (every K-th), END markers
+        sport = sports[k]
+        for _ in range(3):
+            yield enc(START), stripe_tag(b"START", k, K, total, run), sport, 0
+        for i in range(k, len(masked), K):
+            ipid = seq_to_ipid(i) if cfg.seq else 0
+            for _ in range(cfg.pps):
+                yield enc(masked[i]), stripe_tag(b"DATA", k, K, run=run), sport, ipid
+        for _ in range(3):
+            yield enc(END), stripe_tag(b"END", k, K, total, run), sport, 0
+
+    def frames():
+        # one packet per live flow per time slot; the gap follows the slot
+        for slot in zip_longest(*(stripe(k) for k in range(K))):
+            slot = [p for p in slot if p is not None]
+            for i, pkt in enumerate(slot):
+                slot_end[0] = i == len(slot) - 1
+                yield pkt
+
+    def gap():
+        if not slot_end[0]:
+            return 0.0
         jitter = random.gauss(0, 0.3 * cfg.delay)
-        time.sleep(max(0, cfg.delay + jitter))
+        return max(0, cfg.delay + jitter)
+
+    if code is not None:
+        bits = code.data_bits(len(data))
+    else:
+        bits = len(symbols) * cfg.nop_bits
+    return enc, frames(), gap, masked, bits
+
+def send_once(cfg, tx=None):
+    """(bits, duration, bps, retransmissions); ValueError on a bad configuration."""
+    alpha = alphabet(cfg.nop_bits, cfg.encoding)
+    code  = parse_fec(cfg.fec, cfg.nop_bits)
+    if cfg.file and (cfg.seq or cfg.arq or cfg.flows > 1):
+        raise ValueError("--file streams over one framed flow (no --seq, --arq or --flows)")
+    if cfg.file:
+        return send_bulk(cfg, tx, alpha, code)
+
+    if cfg.arq and cfg.flows > 1:
+        raise ValueError("--arq sends on a single flow")
+    enc, frames, gap, masked, bits = covert_frames(cfg, alpha, code)
+
+    t0 = time.time()
+    retx = 0
+    if cfg.arq:
+        retx = send_arq(cfg, tx, enc, masked, alpha.START, alpha.END)
+    elif tx is not None:
+        tx.run(frames, gap)
+    else:
+        for item in frames:
+            scapy_send(cfg, *item)
+            time.sleep(gap())
 
     dur  = time.time() - t0
-    bits = len(symbols) * cfg.nop_bits
-    return bits, dur, bits / dur
+    return bits, dur, bits / dur, retx
 
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--repeat", type=int, default=1,
                     help="Run this configuration N times")
     ap.add_argument("--message", default="Hello, InSecureNet!")
+    ap.add_argument("--file",      default="",
+                    help="Stream this file ('-' for stdin) instead of --message")
+    ap.add_argument("--chunk",     type=int, default=CHUNK,
+                    help="--file: bytes read and encoded at a time (match the receiver under --fec)")
+    ap.add_argument("--progress",  type=float, default=1.0,
+                    help="--file: seconds between progress lines (0 = off)")
     ap.add_argument("--nop-bits",  dest="nop_bits", type=int, default=3,
-                    help="Bits per symbol (max 5)")
+                    help="Bits per symbol (max 5 for --encoding nop, 60 for ts)")
+    ap.add_argument("--encoding",  choices=("nop", "ts"), default="nop",
+                    help="nop: NOP count; ts: Timestamp-option data + NOP run")
     ap.add_argument("--delay",     type=float, default=0.1,
                     help="Inter-packet delay (s)")
     ap.add_argument("--pps",       type=int, default=1,
-                    help="Packets per symbol (redundancy)")
+                    help="Packets per symbol (redundancy; ignored with --arq)")
+    ap.add_argument("--fec",       default="none",
+                    help="none, or rs:N:K for Reed-Solomon over interleaved byte blocks")
+    ap.add_argument("--seq",       action="store_true",
+                    help="Number data symbols in the IP ID so the receiver can reorder them")
+    ap.add_argument("--arq",       action="store_true",
+                    help="Selective-repeat ARQ on receiver SACKs instead of --pps copies")
+    ap.add_argument("--window",    type=int, default=64,
+                    help="--arq: symbols in flight beyond the cumulative ACK")
+    ap.add_argument("--rto",       type=float, default=0.2,
+                    help="--arq: initial retransmission timeout (s), then RTT-driven")
+    ap.add_argument("--ack-port",  type=int, default=ACK_PORT,
+                    help="--arq: UDP port the receiver's SACKs arrive on")
+    ap.add_argument("--flows",     type=int, default=1,
+                    help="Stripe the symbols across K concurrent UDP flows")
     ap.add_argument("--target-ip",
                     default=os.getenv("INSECURENET_HOST_IP", "10.0.0.15"))
     ap.add_argument("--port", type=int, default=8888)
     ap.add_argument("-i", "--iface", default=os.getenv("SND_IFACE", "eth0"))
+    ap.add_argument("--engine", choices=("raw", "scapy"), default="raw",
+                    help="raw: one persistent socket + templates; scapy: send() per packet")
+    ap.add_argument("--daemon",    default="", metavar="SOCK",
+                    help="Stay up and take run commands on this unix socket (see covert/ctl.py)")
     args = ap.parse_args()
+    if args.file == "-" and args.repeat > 1:
+        sys.exit("stdin can only be streamed once")
 
-    csv_name = "sender_log.csv"
-    if not pathlib.Path(csv_name).exists():
-        with open(csv_name, "w", newline="") as f:
-            csv.writer(f).writerow(
-                ["run_idx","message","nop_bits","pps","delay","target_ip","port",
-                 "bits","duration","bps","timestamp"]
-            )
+    moved = start_log(CSV_NAME, CSV_HEADER)
+    if moved:
+        print(f"{CSV_NAME} had an older header, moved to {moved}")
 
+    if args.daemon:
+        return daemon(args)
+
+    tx = RawSender(args.target_ip, args.port, args.iface) if args.engine == "raw" else None
     for idx in range(1, args.repeat + 1):
-        bits, dur, bps = send_once(args)
-        print(f"[run {idx}/{args.repeat}] {bits} bits in {dur:.2f}s → {bps:.2f} bps")
-        with open(csv_name, "a", newline="") as f:
-            csv.writer(f).writerow(
-                [idx, args.message, args.nop_bits, args.pps, args.delay,
-                 args.target_ip, args.port, bits, f"{dur:.4f}",
-                 f"{bps:.2f}", datetime.now().isoformat()]
-            )
+        try:
+            bits, dur, bps, retx = send_once(args, tx)
+        except ValueError as e:
+            sys.exit(str(e))
+        log_run(args, idx, bits, dur, bps, retx)
+
+def log_row(cfg, idx, bits, dur, bps, retx, when: datetime = None) -> list:
+    """One sender_log.csv row (CSV_HEADER)."""
+    return [idx, cfg.file or cfg.message, cfg.nop_bits, cfg.pps, cfg.delay,
+            cfg.target_ip, cfg.port, bits, f"{dur:.4f}",
+            f"{bps:.2f}", (when or datetime.now()).isoformat(), cfg.flows, cfg.encoding, cfg.fec, retx]
+
+def log_run(cfg, idx, bits, dur, bps, retx):
+    note = f"  retx={retx}" if cfg.arq else ""
+    print(f"[run {idx}/{cfg.repeat}] {bits} bits in {dur:.2f}s → {bps:.2f} bps{note}", flush=True)
+    with open(CSV_NAME, "a", newline="") as f:
+        csv.writer(f).writerow(log_row(cfg, idx, bits, dur, bps, retx))
+
+def daemon(args):
+    """Serve "run" commands; raw sockets stay open across runs, one per destination."""
+    txs = {}
+
+    def run(params):
+        cfg = coerce(args, params)
+        tx  = None
+        if cfg.engine == "raw":
+            key = (cfg.target_ip, cfg.port, cfg.iface)
+            tx  = txs.get(key)
+            if tx is None:
+                tx = txs[key] = RawSender(*key)
+        out = []
+        for idx in range(1, cfg.repeat + 1):
+            bits, dur, bps, retx = send_once(cfg, tx)
+            log_run(cfg, idx, bits, dur, bps, retx)
+            out.append({"bits": bits, "duration": round(dur, 4), "bps": round(bps, 2), "retx": retx})
+        return {"runs": out}
+
+    try:
+        serve(args.daemon, {"run": run})
+    finally:
+        for tx in txs.values():
+            tx.close()
 
 if __name__ == "__main__":
     main()
@@ -1,36 +1,34 @@
 import os, sys, time, argparse, random, csv, pathlib
 from datetime import datetime
-from scapy.all import IP, UDP, Raw, send
+from rawtx import RawSender
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from covert.codec import text_to_symbols, framing, alphabet
 
-def pad4(opt: bytes) -> bytes:
-    return opt + b"\x00" * ((4 - (len(opt) & 3)) & 3)
 
-def build_opts(n: int) -> bytes:
-    return b"" if n == 0 else pad4(b"\x01" * n)
-
-def text_to_symbols(txt: str, bits: int):
-    bitstr = "".join(f"{ord(c):08b}" for c in txt)
-    bitstr += "0" * ((-len(bitstr)) % bits)
-    return [int(bitstr[i : i + bits], 2) for i in range(0, len(bitstr), bits)]
-
-def send_once(cfg):
+def send_once(cfg, tx=None):
     if cfg.nop_bits > 5:
         sys.exit("nop‑mapping‑bits cannot exceed 5")
 
-    START, END = (1 << cfg.nop_bits), (1 << cfg.nop_bits) + 1
+    START, END = framing(cfg.nop_bits)
     symbols = text_to_symbols(cfg.message, cfg.nop_bits)
+    optab   = alphabet(cfg.nop_bits, "plain").table
 
-    def pkt(sym, tag=b"DATA"):
-        return (IP(dst=cfg.target_ip, options=build_opts(sym))
-                / UDP(sport=random.randint(1024, 65535), dport=cfg.port)
-                / Raw(load=tag))
+    def frames():
+        for _ in range(3):          yield optab[START], b"START"
+        for s in symbols.tolist():
+            for _ in range(cfg.pps): yield optab[s], b"DATA"
+        for _ in range(3):          yield optab[END], b"END"
 
     t0 = time.time()
-    for _ in range(3):              send(pkt(START, b"START"), iface=cfg.iface, verbose=False); time.sleep(cfg.delay)
-    for s in symbols:
-        for _ in range(cfg.pps):
-            send(pkt(s), iface=cfg.iface, verbose=False); time.sleep(cfg.delay)
-    for _ in range(3):              send(pkt(END,   b"END"),   iface=cfg.iface, verbose=False); time.sleep(cfg.delay)
+    if tx is not None:
+        tx.run(frames(), lambda: cfg.delay)
+    else:
+        from scapy.all import IP, UDP, Raw, send
+        for opts, tag in frames():
+            send(IP(dst=cfg.target_ip, options=opts)
+                 / UDP(sport=random.randint(1024, 65535), dport=cfg.port)
+                 / Raw(load=tag), iface=cfg.iface, verbose=False)
+            time.sleep(cfg.delay)
 
     dur  = time.time() - t0
     bits = len(symbols) * cfg.nop_bits
@@ -51,6 +49,8 @@ def main():
                     default=os.getenv("INSECURENET_HOST_IP", "10.0.0.15"))
     ap.add_argument("--port", type=int, default=8888)
     ap.add_argument("-i", "--iface", default=os.getenv("SND_IFACE", "eth0"))
+    ap.add_argument("--engine", choices=("raw", "scapy"), default="raw",
+                    help="raw: one persistent socket + templates; scapy: send() per packet")
     args = ap.parse_args()
 
     csv_name = "sender_log.csv"
@@ -61,8 +61,10 @@ def main():
                  "bits","duration","bps","timestamp"]
             )
 
+    tx = RawSender(args.target_ip, args.port, args.iface) if args.engine == "raw" else None
+
     for idx in range(1, args.repeat + 1):
-        bits, dur, bps = send_once(args)
+        bits, dur, bps = send_once(args, tx)
         print(f"[run {idx}/{args.repeat}] {bits} bits in {dur:.2f}s → {bps:.2f} bps")
         with open(csv_name, "a", newline="") as f:
             csv.writer(f).writerow(
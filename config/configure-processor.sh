@@ -3,6 +3,12 @@
 set -e
 
 PY_MAIN="/code/python-processor/main.py"
+PY_CLUSTER="/code/python-processor/cluster.py"
+
+if [ -f "$PY_MAIN" ] && [ "${PROC_WORKERS:-1}" -gt 1 ]; then
+    echo "[configure-processor] starting $PROC_WORKERS Python detector workers: $PY_CLUSTER"
+    exec python3 "$PY_CLUSTER" -n "$PROC_WORKERS"
+fi
 
 if [ -f "$PY_MAIN" ]; then
     echo "[configure-processor] starting Python detector: $PY_MAIN"
@@ -10,4 +16,4 @@ if [ -f "$PY_MAIN" ]; then
 fi
 
 echo "[configure-processor] WARNING: $PY_MAIN not found – sleeping forever"
-exec sleep infinity
\ No newline at end of file
+exec sleep infinity
@@ -3,56 +3,154 @@
 metrics.py  –  Analyse logs_raw.csv produced by python_processor.py
 
 Usage:
-    python metrics.py [logs_raw.csv]
+    python metrics.py [logs_raw.csv | logs_raw.cols ...] [-o results_by_config.csv]
 
 Outputs:
     • prints overall Accuracy/Precision/Recall/F1 with 95 % Wilson CIs
-    • prints per-configuration confusion matrix (+ F1)
-    • writes per-config summary to results_by_config.csv
+    • prints per-configuration confusion counts, accuracy CI and F1
+    • writes per-config summary to results_by_config.csv; with several
+      logs, one table with a leading "log" column for comparison
+
+Only the truth/pred/config columns are read, in chunks, so logs of any
+size stream through in constant memory. Every chunk adds to one count
+array indexed by config*4 + truth*2 + pred (a single bincount), so all
+confusion matrices come out at once and single-class configs just have
+zero cells. The Wilson intervals are computed for all rows together.
+A columnar log (collog.py) is counted straight from its memory-mapped
+segments; its config codes already are the group ids.
 """
 
-import sys, pandas as pd, numpy as np
-from sklearn.metrics import confusion_matrix
-from statsmodels.stats.proportion import proportion_confint as wilson
-
-logfile = sys.argv[1] if len(sys.argv) > 1 else "logs_raw.csv"
-df = pd.read_csv(logfile)
-
-# ───────── helpers ───────── #
-def cm_counts(sub):
-    tn, fp, fn, tp = confusion_matrix(sub.truth, sub.pred).ravel()
-    return tp, tn, fp, fn
-
-def f1(tp, fp, fn):
-    return 2*tp / (2*tp + fp + fn) if (2*tp + fp + fn) else 0
-
-def ci(p, n):
-    lo, hi = wilson(p*n, n, method="wilson")
-    return f"[{lo:.3f},{hi:.3f}]"
-
-# ───────── per-configuration table ───────── #
-rows = []
-for cfg, g in df.groupby("config"):
-    tp, tn, fp, fn = cm_counts(g)
-    acc = (tp+tn)/len(g)
-    prec = tp/(tp+fp) if tp+fp else 0
-    rec  = tp/(tp+fn) if tp+fn else 0
-    rows.append([cfg, tp, tn, fp, fn, acc, prec, rec, f1(tp,fp,fn)])
-
-pd.DataFrame(rows, columns=[
-    "config","tp","tn","fp","fn","acc","prec","rec","f1"
-]).to_csv("results_by_config.csv", index=False)
-print("✔ results_by_config.csv written")
-
-# ───────── overall metrics ───────── #
-tp, tn, fp, fn = cm_counts(df)
-N = len(df)
-acc = (tp+tn)/N
-prec = tp/(tp+fp) if tp+fp else 0
-rec  = tp/(tp+fn) if tp+fn else 0
-F1   = f1(tp,fp,fn)
-
-print("\n=== OVERALL ===")
-for name,val in [("Accuracy",acc),("Precision",prec),("Recall",rec),("F1",F1)]:
-    print(f"{name:<9}: {val:.3f}  CI95 {ci(val,N)}")
-print(f"TP={tp}  TN={tn}  FP={fp}  FN={fn}")
+import os, sys, csv, argparse
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "code", "python-processor"))
+import collog
+
+CHUNK = 1 << 20                     # rows per read_csv chunk
+Z95   = NormalDist().inv_cdf(0.975)
+COLUMNS = ["config", "tp", "tn", "fp", "fn", "acc", "prec", "rec", "f1"]
+
+# ───────── counting ───────── #
+def confusion(path: str, chunksize: int = CHUNK) -> tuple:
+    """(config names sorted, counts[n_cfg, 4] as tn, fp, fn, tp) of one log."""
+    if collog.is_columnar(path):
+        return _confusion_cols(path)
+    ids, counts = {}, np.zeros(0, dtype=np.int64)
+    for chunk in pd.read_csv(path, usecols=["truth", "pred", "config"],
+                             dtype={"truth": np.int8, "pred": np.int8, "config": "category"},
+                             chunksize=chunksize):
+        truth, pred = chunk.truth.to_numpy(), chunk.pred.to_numpy()
+        if ((truth | pred) & ~1).any():
+            raise ValueError(f"{path}: truth/pred must be 0 or 1")
+        cats = chunk.config.cat
+        gid  = np.array([ids.setdefault(c, len(ids)) for c in cats.categories], dtype=np.int64)
+        idx  = gid[cats.codes.to_numpy()] * 4 + truth * 2 + pred
+        add  = np.bincount(idx, minlength=4 * len(ids))
+        counts = np.concatenate((counts, np.zeros(len(add) - len(counts), dtype=np.int64))) + add
+    names = sorted(ids)
+    order = np.array([ids[n] for n in names], dtype=np.int64)
+    return names, counts.reshape(-1, 4)[order] if len(names) else counts.reshape(0, 4)
+
+def _confusion_cols(path: str) -> tuple:
+    cfgs   = collog.read_meta(path)["dicts"]["config"]
+    counts = np.zeros(4 * len(cfgs), dtype=np.int64)
+    for seg in collog.segments(path):
+        truth, pred = seg["truth"], seg["pred"]
+        if ((truth | pred) & ~1).any():
+            raise ValueError(f"{path}: truth/pred must be 0 or 1")
+        idx = seg["config"].astype(np.int64) * 4 + truth * 2 + pred
+        counts += np.bincount(idx, minlength=len(counts))
+    cm    = counts.reshape(-1, 4)
+    names = sorted(c for i, c in enumerate(cfgs) if cm[i].any())
+    return names, cm[[cfgs.index(n) for n in names]].reshape(-1, 4)
+
+# ───────── metrics, all rows at once ───────── #
+def _ratio(num, den):
+    den = np.asarray(den)
+    return np.where(den > 0, num / np.where(den > 0, den, 1), 0.0)
+
+def scores(cm) -> dict:
+    """tp/tn/fp/fn and acc/prec/rec/f1 arrays from [..., 4] counts (tn, fp, fn, tp)."""
+    tn, fp, fn, tp = (cm[..., i] for i in range(4))
+    n = tn + fp + fn + tp
+    return {
+        "tp": tp, "tn": tn, "fp": fp, "fn": fn, "n": n,
+        "acc":  _ratio(tp + tn, n),
+        "prec": _ratio(tp, tp + fp),
+        "rec":  _ratio(tp, tp + fn),
+        "f1":   _ratio(2 * tp, 2 * tp + fp + fn),
+    }
+
+def wilson(k, n, z: float = Z95) -> tuple:
+    """Wilson score intervals for k successes out of n, element-wise (0..1 where n == 0)."""
+    k, n = np.asarray(k, dtype=np.float64), np.asarray(n, dtype=np.float64)
+    safe = np.where(n > 0, n, 1)
+    p    = k / safe
+    z2   = z * z
+    den  = 1 + z2 / safe
+    mid  = (p + z2 / (2 * safe)) / den
+    half = z * np.sqrt(p * (1 - p) / safe + z2 / (4 * safe * safe)) / den
+    return np.where(n > 0, mid - half, 0.0), np.where(n > 0, mid + half, 1.0)
+
+def intervals(s: dict) -> dict:
+    """95 % Wilson CI per metric, each over its own denominator."""
+    tp, tn, fp, fn = s["tp"], s["tn"], s["fp"], s["fn"]
+    return {
+        "acc":  wilson(tp + tn, s["n"]),
+        "prec": wilson(tp, tp + fp),
+        "rec":  wilson(tp, tp + fn),
+        "f1":   wilson(2 * tp, 2 * tp + fp + fn),
+    }
+
+# ───────── output ───────── #
+def table_rows(names, s) -> list:
+    return [[name, int(s["tp"][i]), int(s["tn"][i]), int(s["fp"][i]), int(s["fn"][i]),
+             float(s["acc"][i]), float(s["prec"][i]), float(s["rec"][i]), float(s["f1"][i])]
+            for i, name in enumerate(names)]
+
+def write_table(path: str, rows: list, header: list):
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f, lineterminator="\n")
+        w.writerow(header)
+        w.writerows(rows)
+
+def report(label: str, names, cm):
+    s  = scores(cm)
+    ci = intervals(s)
+    print(f"\n=== {label}: per configuration ===")
+    print(f"{'config':<24}{'TP':>7}{'TN':>7}{'FP':>7}{'FN':>7}  {'acc':>6} {'CI95':<15} {'F1':>6}")
+    for i, name in enumerate(names):
+        lo, hi = ci["acc"][0][i], ci["acc"][1][i]
+        print(f"{name:<24}{s['tp'][i]:>7}{s['tn'][i]:>7}{s['fp'][i]:>7}{s['fn'][i]:>7}  "
+              f"{s['acc'][i]:>6.3f} [{lo:.3f},{hi:.3f}] {s['f1'][i]:>6.3f}")
+
+    tot = scores(cm.sum(axis=0))
+    tci = intervals(tot)
+    print(f"\n=== {label}: OVERALL ===")
+    for name, key in [("Accuracy", "acc"), ("Precision", "prec"), ("Recall", "rec"), ("F1", "f1")]:
+        lo, hi = tci[key]
+        print(f"{name:<9}: {tot[key]:.3f}  CI95 [{lo:.3f},{hi:.3f}]")
+    print(f"TP={tot['tp']}  TN={tot['tn']}  FP={tot['fp']}  FN={tot['fn']}")
+    return s
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-config detection metrics from processor logs")
+    ap.add_argument("logs", nargs="*", default=["logs_raw.csv"])
+    ap.add_argument("-o", "--out", default="results_by_config.csv")
+    ap.add_argument("--chunksize", type=int, default=CHUNK)
+    args = ap.parse_args(argv)
+
+    rows = []
+    for path in args.logs:
+        names, cm = confusion(path, args.chunksize)
+        s = report(path, names, cm)
+        rows += [([path] if len(args.logs) > 1 else []) + r for r in table_rows(names, s)]
+
+    header = (["log"] if len(args.logs) > 1 else []) + COLUMNS
+    write_table(args.out, rows, header)
+    print(f"\n✔ {args.out} written")
+
+if __name__ == "__main__":
+    main()
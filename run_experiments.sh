@@ -8,16 +8,21 @@ REPEAT=10
 PPS_LIST=(1 2 3)
 NOP_LIST=(2 3 4)
 DELAY_LIST=(0 0.01 0.05)
+FLOWS_LIST=(1)                # >1 stripes each covert message across K flows
+ENCODING=nop                  # ts: Timestamp-option alphabet, NOP_LIST up to 60
+FEC=none                      # rs:N:K (N <= 2^nop - 1 for nop 3..8), e.g. rs:7:3 with PPS_LIST=(1)
+SEQ=0                         # 1: IP-ID sequence numbers, reorder/loss tolerant (gaps -> FEC erasures)
+ARQ=0                         # 1: selective-repeat ARQ on receiver SACKs (implies SEQ, set PPS_LIST=(1))
+LOSS_LIST=(0)                 # netem loss % on sec's eth0 during covert slices, for goodput-vs-loss curves
+DAEMON=1                      # 1: long-lived tools driven over unix sockets; 0: new processes per slice
 
 SENDER_CVT="/code/sec/sender_covert.py"
 RECV_CVT="/code/insec/receiver_covert.py"
 SENDER_BEN="/code/sec/sender_ben.py"
 RECV_BEN="/code/insec/receiver.py"
-
-FLAG_FILE=/tmp/channel_flag
-RUN_FILE=/tmp/run_id
-CFG_FILE=/tmp/config_str
-DELAY_FILE=/tmp/delay_sec
+CONTROL="/code/python-processor/control.py"
+CTL="/code/covert/ctl.py"
+SOCKS="/tmp/ctl"
 ##########################################################################
 
 echo "⚙️  Restarting core containers…"
@@ -28,13 +33,44 @@ sleep 2
 wait_ready() { until docker exec "$1" bash -c 'echo ok' &>/dev/null; do sleep 0.5; done; }
 wait_ready python-processor; wait_ready sec; wait_ready insec
 
-docker exec insec mkdir -p /tmp/doneflags
+# label the processor's packet log: run truth config delay (one NATS request)
+label() {
+  docker exec python-processor python3 "$CONTROL" \
+      --run "$1" --truth "$2" --config "$3" --delay "$4" >/dev/null
+}
+
+# one command to a daemon: container socket cmd [key=value ...]
+ctl() {
+  docker exec "$1" python3 "$CTL" "$SOCKS/$2.sock" "${@:3}" >/dev/null
+}
 
-total=$(( REPEAT * ${#PPS_LIST[@]} * ${#NOP_LIST[@]} * ${#DELAY_LIST[@]} * 2 ))
+docker exec insec mkdir -p /tmp/doneflags
+SEQ_FLAG=""; [ "$SEQ" -eq 0 ] || SEQ_FLAG="--seq"
+[ "$ARQ" -eq 0 ] || SEQ_FLAG="--arq"
+
+if [ "$DAEMON" -eq 1 ]; then
+  echo "⚙️  Starting sender/receiver daemons…"
+  for c in sec insec; do
+    docker exec "$c" pkill -f -- "--daemon $SOCKS" || true     # leftovers of an aborted run
+    docker exec "$c" mkdir -p "$SOCKS"
+  done
+  docker exec -d insec bash -c "python3 $RECV_BEN   --daemon $SOCKS/receiver.sock"
+  docker exec -d insec bash -c "python3 $RECV_CVT   --daemon $SOCKS/receiver_covert.sock"
+  docker exec -d sec   bash -c "python3 $SENDER_BEN --daemon $SOCKS/sender_ben.sock"
+  docker exec -d sec   bash -c "python3 $SENDER_CVT --daemon $SOCKS/sender_covert.sock"
+  ctl insec receiver        ping --wait-ready 30
+  ctl insec receiver_covert ping --wait-ready 30
+  ctl sec   sender_ben      ping --wait-ready 30
+  ctl sec   sender_covert   ping --wait-ready 30
+fi
+
+total=$(( REPEAT * ${#PPS_LIST[@]} * ${#NOP_LIST[@]} * ${#DELAY_LIST[@]} * ${#FLOWS_LIST[@]} * ${#LOSS_LIST[@]} * 2 ))
 echo "✅  Will run $total labelled slices."
 
 run_id=0    # monotonic counter
 
+for loss in "${LOSS_LIST[@]}"; do
+for flows in "${FLOWS_LIST[@]}"; do
 for delay in "${DELAY_LIST[@]}"; do
   for pps in "${PPS_LIST[@]}";  do
     for nop in "${NOP_LIST[@]}"; do
@@ -42,44 +78,79 @@ for delay in "${DELAY_LIST[@]}"; do
 
         ((run_id+=1))
         cfg="pps${pps}_nop${nop}_d${delay}"
+        [ "$flows" -le 1 ] || cfg="${cfg}_k${flows}"
+        [ "$ENCODING" = nop ] || cfg="${cfg}_${ENCODING}"
+        [ "$FEC" = none ] || cfg="${cfg}_${FEC//:/-}"
+        [ "$SEQ" -eq 0 ]  || cfg="${cfg}_seq"
+        [ "$ARQ" -eq 0 ]  || cfg="${cfg}_arq"
+        [ "$loss" = 0 ]   || cfg="${cfg}_l${loss}"
         flag="/tmp/doneflags/run_$run_id"
 
         # ---------- BENIGN ----------
         echo "run $run_id  benign  LEN=$LEN"
-        docker exec python-processor bash -c "echo $run_id  > $RUN_FILE"
-        docker exec python-processor bash -c "echo 0       > $FLAG_FILE"
-        docker exec python-processor bash -c "echo benign  > $CFG_FILE"
-        docker exec python-processor bash -c "echo 0       > $DELAY_FILE"
-
-        docker exec -d insec bash -c "python3 $RECV_BEN"
-        docker exec -d sec   bash -c "python3 $SENDER_BEN"
-        sleep "$LEN"
-        docker exec insec pkill -f "$RECV_BEN"  || true
-        docker exec sec   pkill -f "$SENDER_BEN" || true
+        label "$run_id" 0 benign 0
+
+        if [ "$DAEMON" -eq 1 ]; then
+          ctl insec receiver start
+          ctl sec   sender_ben run || true
+          sleep "$LEN"
+          ctl insec receiver stop
+        else
+          docker exec -d insec bash -c "python3 $RECV_BEN"
+          docker exec -d sec   bash -c "python3 $SENDER_BEN"
+          sleep "$LEN"
+          docker exec insec pkill -f "$RECV_BEN"  || true
+          docker exec sec   pkill -f "$SENDER_BEN" || true
+        fi
 
         # ---------- COVERT ----------
         echo "run $run_id  covert ($cfg)"
-        docker exec python-processor bash -c "echo $run_id  > $RUN_FILE"
-        docker exec python-processor bash -c "echo 1        > $FLAG_FILE"
-        docker exec python-processor bash -c "echo $cfg     > $CFG_FILE"
-        docker exec python-processor bash -c "echo $delay   > $DELAY_FILE"
-
-        docker exec -d insec bash -c \
-            "python3 $RECV_CVT --nop-bits $nop --pps $pps --done-flag $flag"
-
-        docker exec -d sec bash -c \
-            "python3 $SENDER_CVT --nop-bits $nop --pps $pps --delay $delay"
-
-        timeout 90s bash -c "until docker exec insec test -f '$flag'; do sleep 0.2; done"
-
-        docker exec insec rm -f  "$flag"          || true
-        docker exec insec pkill -f "$RECV_CVT"    || true
-        docker exec sec   pkill -f "$SENDER_CVT"  || true
+        label "$run_id" 1 "$cfg" "$delay"
+        [ "$loss" = 0 ] || docker exec sec tc qdisc replace dev eth0 root netem loss "${loss}%"
+
+        if [ "$DAEMON" -eq 1 ]; then
+          # start returns once the capture is attached; run returns when sent
+          common="nop_bits=$nop pps=$pps encoding=$ENCODING fec=$FEC seq=$SEQ arq=$ARQ"
+          ctl insec receiver_covert start $common
+          ctl sec   sender_covert   run   $common delay=$delay flows=$flows || true
+          ctl insec receiver_covert wait  timeout=90 || true
+        else
+          docker exec -d insec bash -c \
+              "python3 $RECV_CVT --nop-bits $nop --pps $pps --encoding $ENCODING --fec $FEC ${SEQ_FLAG} --done-flag $flag"
+
+          docker exec -d sec bash -c \
+              "python3 $SENDER_CVT --nop-bits $nop --pps $pps --delay $delay --flows $flows --encoding $ENCODING --fec $FEC ${SEQ_FLAG}"
+
+          timeout 90s bash -c "until docker exec insec test -f '$flag'; do sleep 0.2; done"
+
+          docker exec insec rm -f  "$flag"          || true
+          docker exec insec pkill -f "$RECV_CVT"    || true
+          docker exec sec   pkill -f "$SENDER_CVT"  || true
+        fi
+        [ "$loss" = 0 ] || docker exec sec tc qdisc del dev eth0 root || true
       done
     done
   done
 done
+done
+done
 
 echo "🟢  All slices finished."
+if [ "$DAEMON" -eq 1 ]; then
+  for d in receiver receiver_covert; do ctl insec "$d" quit || true; done
+  for d in sender_ben sender_covert;  do ctl sec   "$d" quit || true; done
+fi
+# answered once every processor's log writer has written out its last batch
+docker exec python-processor python3 "$CONTROL" --flush >/dev/null \
+    || echo "⚠️  processor log flush not confirmed"
+docker exec python-processor bash -c \
+    '[ "${PROC_WORKERS:-1}" -le 1 ] || python3 /code/python-processor/cluster.py --merge'
+RAW_COLS=$(docker exec python-processor printenv RAW_COLS || true)
+if [ -n "$RAW_COLS" ]; then   # columnar log: keep it, export the CSV view below
+  docker exec python-processor python3 /code/python-processor/collog.py export "$RAW_COLS" -o /tmp/logs_raw.csv
+  rm -rf ./logs_raw.cols
+  docker cp "python-processor:$RAW_COLS" ./logs_raw.cols
+  echo "📄  Columnar log saved → logs_raw.cols"
+fi
 docker cp python-processor:/tmp/logs_raw.csv ./logs_raw.csv
 echo "📄  Packet log saved → logs_raw.csv"
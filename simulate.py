@@ -0,0 +1,448 @@
+#!/usr/bin/env python3
+"""
+simulate.py  –  virtual-time run of the run_experiments.sh grid, no docker
+
+Plays the benign/covert slice schedule of run_experiments.sh as a
+discrete-event simulation on a virtual clock, with the real code wired
+together in-process:
+
+    sender_covert.covert_frames ─▶ mitm/NATS stand-in ─▶ processor stand-in
+        (ControlState labels, detector Pipeline or FlowTable of them,
+         DelayScheduler release times)
+    ─▶ receiver_covert.Decoder / UDP echo receiver on insec
+
+The three logs come out with the schemas of a live run: logs_raw.csv
+(processor), sender_log.csv and receiver_log.csv. Only the wire is
+modelled: a per-packet send/publish cost (--pkt-time), a per-hop latency (--hop),
+netem-style loss on sec's egress during covert slices (--loss) and
+optional Poisson background traffic without IP options (--background).
+
+Every covert config (its --repeat runs, in grid order) is one job. Jobs run
+in parallel (--jobs) with their own detector and random seed and are then
+laid end to end on one timeline, so the output does not depend on --jobs;
+the first slice of a job starts with an empty detector window.
+--arq and --file are not simulated (no SACK return path, no bulk streams).
+
+Usage:
+    python3 simulate.py                                  # the run_experiments.sh grid
+    python3 simulate.py --repeat 3 --pps 1 --nop 3 --delay 0.01 --seq --loss 5
+    python3 simulate.py -j 8 -o sim && python3 metrics.py sim/logs_raw.csv
+"""
+
+import os, io, sys, csv, time, heapq, random, argparse, itertools, contextlib
+from datetime import datetime
+from multiprocessing import Pool
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+for sub in ("python-processor", "insec", "sec", ""):
+    sys.path.insert(0, os.path.join(HERE, "code", sub))
+
+import frame
+from control import ControlState
+from flows import FlowTable
+from pipeline import Pipeline, param_names, detector_names, quorum
+from scheduler import DelayScheduler
+from collog import RAW_HEADER
+from rawtx import RawSender
+import sender_covert, receiver_covert
+from covert.codec import alphabet
+from covert.fec import parse_fec
+from covert.ctl import coerce
+
+SEC_IP, INSEC_IP = "10.1.0.21", "10.0.0.21"     # .env
+SEC_MAC, INSEC_MAC = bytes.fromhex("02420a010015"), bytes.fromhex("02420a000015")
+PORT      = 8888
+BG_PORT   = 53                  # background traffic, never seen by the receivers
+POLL      = 0.1                 # receiver poll interval (RingCapture.loop)
+BEN_TIMEOUT = 2.0               # sender_ben daemon echo timeout
+WAIT_TIMEOUT = 90.0             # run_experiments.sh: receiver_covert wait timeout=90
+
+# ───────── virtual clock ───────── #
+class Signal:
+    def __init__(self):
+        self.fired, self._waiters = False, []
+
+    def fire(self, loop):
+        if not self.fired:
+            self.fired = True
+            for w in self._waiters:
+                loop.after(0, w, True)
+            self._waiters.clear()
+
+    def wait(self, loop, cb, timeout=None):
+        if self.fired:
+            return loop.after(0, cb, True)
+        box = [cb]
+
+        def once(fired):
+            if box:
+                box.pop()(fired)
+        self._waiters.append(once)
+        if timeout is not None:
+            loop.after(timeout, once, False)
+
+class Loop:
+    """Event heap on a virtual clock. A process is a generator that yields a
+    sleep in seconds or (Signal, timeout); the latter resumes with True if
+    the signal fired and False on timeout."""
+
+    def __init__(self):
+        self.now  = 0.0
+        self._q   = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self.now
+
+    def at(self, t: float, fn, *args):
+        heapq.heappush(self._q, (t, next(self._seq), fn, args))
+
+    def after(self, dt: float, fn, *args):
+        self.at(self.now + dt, fn, *args)
+
+    def spawn(self, gen):
+        self.after(0, self._step, gen, None)
+
+    def _step(self, gen, val):
+        try:
+            y = gen.send(val)
+        except StopIteration:
+            return
+        if isinstance(y, tuple):
+            y[0].wait(self, lambda fired: self._step(gen, fired), y[1])
+        else:
+            self.after(y, self._step, gen, None)
+
+    def run(self):
+        q = self._q
+        while q:
+            t, _, fn, args = heapq.heappop(q)
+            self.now = t
+            fn(*args)
+
+# ───────── wire, mitm and processor ───────── #
+class WireTx(RawSender):
+    """RawSender's packet templates without a socket; frames go to the Net."""
+
+    def __init__(self, net, subject: str, src: str, dst: str, dport: int):
+        self.src, self.dst, self.dport = src, dst, dport
+        self._templates, self.sent = {}, 0
+        self.net, self.subject = net, subject
+        macs = (INSEC_MAC, SEC_MAC) if subject == "inpktsec" else (SEC_MAC, INSEC_MAC)
+        self.eth = macs[0] + macs[1] + b"\x08\x00"
+
+    def emit(self, item):
+        self.sent += 1
+        self.net.send(self.subject, self.eth + self.packet(*item))
+
+def udp_ports(data: bytes) -> tuple:
+    ihl = (data[14] & 0x0F) * 4
+    return (data[14 + ihl] << 8 | data[15 + ihl]), (data[16 + ihl] << 8 | data[17 + ihl])
+
+class Net:
+    """sec ⇄ mitm ⇄ processor ⇄ insec. The processor step mirrors
+    main.make_handler: label, detect, log a logs_raw row, delay, publish."""
+
+    def __init__(self, loop: Loop, opts, rows: list):
+        self.loop, self.hop, self.loss = loop, opts.hop, 0.0
+        self.pkt_time = opts.pkt_time
+        self._out_at  = {}                      # out subject -> last publish time
+        if opts.per_flow:
+            self.det = FlowTable(Pipeline, detectors=opts.detectors, vote=opts.vote,
+                                 **det_params(opts), max_flows=4096, idle_sec=30.0, max_win=4096)
+        else:
+            self.det = Pipeline(opts.detectors, opts.vote, **det_params(opts))
+        self.per_flow, self.flow_ports = opts.per_flow, opts.flow_ports
+        self.ctl   = ControlState(self.det)
+        self.sched = DelayScheduler(None, opts.mean_delay, preserve_order=not opts.reorder)
+        self.rows  = rows
+        self.hosts = {}                         # out subject -> rx(frame)
+
+    def send(self, subject: str, data: bytes):
+        if subject == "inpktsec" and self.loss and random.random() < self.loss:
+            return                              # netem on sec's egress
+        self.loop.after(self.hop, self.process, subject, data)
+
+    def process(self, subject: str, data: bytes):
+        now = self.loop.now
+        fr  = frame.parse(memoryview(data))
+        if self.per_flow:
+            pred = int(self.det.feed(frame.flow_key(fr, data, self.flow_ports), fr, data, now))
+        else:
+            pred = int(self.det.feed_frame(fr, data, now))
+        c = self.ctl
+        self.rows.append((now, c.run, c.truth, pred, c.config, c.delay, fr.src, fr.dst, fr.name))
+        out = "outpktinsec" if subject == "inpktsec" else "outpktsec"
+        due = self.sched.release_time(out, now)
+        if self.sched.preserve_order:
+            # in order, frames can share a release time; the relay task still
+            # publishes them one at a time, pkt_time apart
+            due = max(due, self._out_at.get(out, -1.0) + self.pkt_time)
+            self._out_at[out] = due
+        self.loop.at(due + self.hop, self.deliver, out, data)
+
+    def deliver(self, subject: str, data: bytes):
+        rx = self.hosts.get(subject)
+        if rx is not None:
+            rx(data)
+
+def det_params(opts) -> dict:
+    params = dict(win_sec=opts.win_sec, thr_opts=opts.thr_opts,
+                  thr_entropy=opts.thr_ent, thr_comp=opts.thr_comp,
+                  thr_types=opts.thr_types, thr_cv=opts.thr_cv, thr_ipid=opts.thr_ipid,
+                  thr_ttl=opts.thr_ttl, thr_sport=opts.thr_sport)
+    return {k: v for k, v in params.items() if k in param_names(opts.detectors)}
+
+# ───────── hosts ───────── #
+class Hosts:
+    """The sec and insec ends: sender_ben, the echo receiver, the covert
+    Decoder of the current slice and background traffic."""
+
+    def __init__(self, loop: Loop, net: Net, opts, recv_rows: list):
+        self.loop, self.net, self.opts = loop, net, opts
+        self.to_insec = WireTx(net, "inpktsec",   SEC_IP,   INSEC_IP, PORT)
+        self.bg_tx    = {d: WireTx(net, d, *ips, BG_PORT) for d, ips in
+                         (("inpktsec", (SEC_IP, INSEC_IP)), ("inpktinsec", (INSEC_IP, SEC_IP)))}
+        self.echo_on  = False
+        self.waiting  = {}                      # sender_ben sport -> Signal
+        self.decoder, self.decoded = None, None
+        self.recv_rows = recv_rows
+        net.hosts.update(outpktinsec=self.insec_rx, outpktsec=self.sec_rx)
+
+    def insec_rx(self, data: bytes):
+        if len(data) < 42 or data[23] != 17:
+            return
+        sport, dport = udp_ports(data)
+        if dport != PORT:
+            return
+        if self.decoder is not None:
+            self.decoder.on_frame(data)
+            if self.decoder.done:
+                self.decoded.fire(self.loop)
+        if self.echo_on:                        # receiver.py echoes whatever arrives
+            reply = WireTx(self.net, "inpktinsec", INSEC_IP, SEC_IP, sport)
+            reply.emit((b"", receiver_covert.frame_payload(data), PORT))
+
+    def sec_rx(self, data: bytes):
+        if len(data) < 42 or data[23] != 17:
+            return
+        sig = self.waiting.pop(udp_ports(data)[1], None)
+        if sig is not None:
+            sig.fire(self.loop)
+
+    def echo(self, message: str) -> Signal:
+        """sender_ben.udp_sender: one datagram, fires when the echo is back."""
+        sport = random.randint(32768, 60999)
+        sig = self.waiting[sport] = Signal()
+        self.to_insec.emit((b"", message.encode(), sport))
+        return sig
+
+    def start_decoder(self, rargs):
+        self.decoded = Signal()
+        self.decoder = receiver_covert.Decoder(
+            rargs, clock=self.loop.time,
+            log=lambda row: self.recv_rows.append((self.loop.now, row)))
+        if rargs.seq:
+            self.loop.spawn(self._poll(self.decoder))
+
+    def _poll(self, dec):
+        while self.decoder is dec and not dec.done:
+            dec.tick()
+            if dec.done:
+                self.decoded.fire(self.loop)
+            yield POLL
+
+    def stop_decoder(self) -> list:
+        dec, self.decoder = self.decoder, None
+        return dec.results
+
+    def background(self, until: float):
+        """Poisson option-less UDP in both directions until `until`."""
+        rate = self.opts.background
+        while rate > 0:
+            yield random.expovariate(rate)
+            if self.loop.now >= until:
+                return
+            tx = self.bg_tx["inpktsec" if random.random() < 0.5 else "inpktinsec"]
+            tx.emit((b"", b"background", None))
+
+# ───────── one job: the runs of one covert config ───────── #
+def config_name(o, pps, nop, delay, flows, loss) -> str:
+    """The cfg label run_experiments.sh gives this slice."""
+    cfg = f"pps{pps}_nop{nop}_d{delay}"
+    if flows > 1:
+        cfg += f"_k{flows}"
+    if o.encoding != "nop":
+        cfg += f"_{o.encoding}"
+    if o.fec != "none":
+        cfg += "_" + o.fec.replace(":", "-")
+    if o.seq:
+        cfg += "_seq"
+    if loss != "0":
+        cfg += f"_l{loss}"
+    return cfg
+
+def slices(loop: Loop, net: Net, hosts: Hosts, job: dict, send_rows: list, out: dict):
+    o = job["opts"]
+    scfg = argparse.Namespace(message=o.message, file="", nop_bits=job["nop"], pps=job["pps"],
+                              delay=float(job["delay"]), flows=job["flows"], encoding=o.encoding,
+                              fec=o.fec, seq=o.seq, arq=False, target_ip=INSEC_IP, port=PORT)
+    rargs = coerce(receiver_covert.parser().parse_args([]),
+                   dict(nop_bits=job["nop"], pps=job["pps"], encoding=o.encoding,
+                        fec=o.fec, seq=o.seq, port=PORT))
+    alpha = alphabet(scfg.nop_bits, scfg.encoding)
+    code  = parse_fec(scfg.fec, scfg.nop_bits)
+
+    for run_id in job["runs"]:
+        # ---------- BENIGN ----------
+        net.ctl.apply({"run": run_id, "truth": 0, "config": "benign", "delay": 0})
+        hosts.echo_on = True
+        yield hosts.echo(o.message), BEN_TIMEOUT
+        loop.spawn(hosts.background(loop.now + o.len))
+        yield o.len
+        hosts.echo_on = False
+
+        # ---------- COVERT ----------
+        net.ctl.apply({"run": run_id, "truth": 1, "config": job["cfg"], "delay": float(job["delay"])})
+        net.loss = float(job["loss"]) / 100
+        t0 = loop.now
+        hosts.start_decoder(coerce(rargs, {}))
+        _, frames, gap, _, bits = sender_covert.covert_frames(scfg, alpha, code)
+        t = t0
+        for item in frames:
+            loop.at(t, hosts.to_insec.emit, item)
+            t += gap() + o.pkt_time
+        loop.spawn(hosts.background(t))
+        yield t - t0                            # sender run returns
+        dur = t - t0
+        send_rows.append((loop.now, sender_covert.log_row(scfg, 1, bits, dur, bits / dur, 0)))
+        yield hosts.decoded, max(0.0, min(t0 + rargs.timeout, loop.now + WAIT_TIMEOUT) - loop.now)
+        res = hosts.stop_decoder()
+        out["ok"] += any(r["message"] == o.message for r in res)
+        net.loss = 0.0
+    out["end"] = loop.now
+
+def run_job(job: dict) -> dict:
+    o = job["opts"]
+    random.seed(f"{o.seed}/{job['index']}")
+    loop = Loop()
+    raw, send_rows, recv_rows, out = [], [], [], {"ok": 0, "end": 0.0}
+    net   = Net(loop, o, raw)
+    hosts = Hosts(loop, net, o, recv_rows)
+    loop.spawn(slices(loop, net, hosts, job, send_rows, out))
+    with contextlib.redirect_stdout(io.StringIO()) if not o.verbose else contextlib.nullcontext():
+        loop.run()
+    return {"cfg": job["cfg"], "runs": len(job["runs"]), "ok": out["ok"], "duration": out["end"],
+            "raw": raw, "send": send_rows, "recv": recv_rows}
+
+# ───────── grid, merge, output ───────── #
+def grid(o) -> list:
+    jobs, run_id = [], 0
+    for loss, flows, delay, pps, nop in itertools.product(o.loss, o.flows, o.delay, o.pps, o.nop):
+        runs = list(range(run_id + 1, run_id + o.repeat + 1))
+        run_id += o.repeat
+        jobs.append({"index": len(jobs), "opts": o, "runs": runs, "pps": pps, "nop": nop,
+                     "delay": delay, "flows": flows, "loss": loss,
+                     "cfg": config_name(o, pps, nop, delay, flows, loss)})
+    return jobs
+
+def write_csv(path: str, header: list, rows):
+    with open(path, "w", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(header)
+        w.writerows(rows)
+
+def main():
+    ap = argparse.ArgumentParser(description="Virtual-time simulation of the experiment grid")
+    ap.add_argument("--len",    type=float, default=5.0, help="seconds per benign slice (LEN)")
+    ap.add_argument("--repeat", type=int,   default=10)
+    ap.add_argument("--pps",    type=int,   nargs="+", default=[1, 2, 3])
+    ap.add_argument("--nop",    type=int,   nargs="+", default=[2, 3, 4])
+    ap.add_argument("--delay",  nargs="+", default=["0", "0.01", "0.05"],
+                    help="sender inter-packet delays, as written in the cfg label")
+    ap.add_argument("--flows",  type=int,   nargs="+", default=[1])
+    ap.add_argument("--loss",   nargs="+", default=["0"], help="loss %% on sec's egress")
+    ap.add_argument("--encoding", choices=("nop", "ts"), default="nop")
+    ap.add_argument("--fec",    default="none")
+    ap.add_argument("--seq",    action="store_true")
+    ap.add_argument("--message", default="Hello, InSecureNet!")
+    ap.add_argument("--mean-delay", dest="mean_delay", type=float,
+                    default=float(os.getenv("MEAN_DELAY_SEC", "0.05")),
+                    help="processor delay mean (MEAN_DELAY_SEC)")
+    ap.add_argument("--reorder", action="store_true",
+                    help="independent per-frame delays (DELAY_PRESERVE_ORDER=0)")
+    ap.add_argument("--per-flow", dest="per_flow", action="store_true", help="DET_PER_FLOW=1")
+    ap.add_argument("--flow-ports", dest="flow_ports", action="store_true",
+                    help="per-flow keys include the ports (DET_FLOW_PORTS=1)")
+    ap.add_argument("--win-sec",  dest="win_sec",  type=float, default=2.0)
+    ap.add_argument("--thr-opts", dest="thr_opts", type=float, default=0.01)
+    ap.add_argument("--thr-ent",  dest="thr_ent",  type=float, default=1.0)
+    ap.add_argument("--thr-comp", dest="thr_comp", type=float, default=0.5)
+    ap.add_argument("--detectors", default="entropy",
+                    help="comma-separated pipeline detectors (DET_PIPELINE)")
+    ap.add_argument("--vote", default="any", help="any, all, majority or k (DET_VOTE)")
+    ap.add_argument("--thr-types", dest="thr_types", type=float, default=0.01)
+    ap.add_argument("--thr-cv",    dest="thr_cv",    type=float, default=0.1)
+    ap.add_argument("--thr-ipid",  dest="thr_ipid",  type=float, default=0.5)
+    ap.add_argument("--thr-ttl",   dest="thr_ttl",   type=float, default=0.5)
+    ap.add_argument("--thr-sport", dest="thr_sport", type=float, default=2.0)
+    ap.add_argument("--pkt-time", dest="pkt_time", type=float, default=1e-4,
+                    help="per-packet cost (s): added to every sender gap and "
+                         "between the relay's publishes")
+    ap.add_argument("--hop",    type=float, default=2e-4,
+                    help="latency of each host/mitm/processor hop (s)")
+    ap.add_argument("--background", type=float, default=0.0,
+                    help="option-less background packets per second, both directions")
+    ap.add_argument("--seed",   type=int,   default=0)
+    ap.add_argument("--epoch",  type=float, default=None,
+                    help="wall-clock time of the first slice (default: now)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1)
+    ap.add_argument("-o", "--out-dir", default=".")
+    ap.add_argument("-v", "--verbose", action="store_true", help="show the receivers' output")
+    o = ap.parse_args()
+    try:
+        parse_fec(o.fec, min(o.nop))
+        for nop in o.nop:
+            alphabet(nop, o.encoding)
+        quorum(o.vote, len(detector_names(o.detectors)))
+    except ValueError as e:
+        sys.exit(str(e))
+
+    jobs = grid(o)
+    print(f"simulating {len(jobs)} configs × {o.repeat} runs on {min(o.jobs, len(jobs))} processes")
+    t_wall = time.time()
+    if o.jobs > 1 and len(jobs) > 1:
+        with Pool(min(o.jobs, len(jobs))) as pool:
+            results = pool.map(run_job, jobs)
+    else:
+        results = [run_job(j) for j in jobs]
+
+    # lay the jobs end to end, in grid order
+    epoch = time.time() if o.epoch is None else o.epoch
+    raw, send, recv, t0 = [], [], [], epoch
+    for r in results:
+        raw  += [(t0 + row[0],) + row[1:] for row in r["raw"]]
+        send += [(t0 + t, row) for t, row in r["send"]]
+        recv += [(t0 + t, row) for t, row in r["recv"]]
+        print(f"{r['cfg']:<28} decoded {r['ok']:>3}/{r['runs']:<3} in {r['duration']:8.1f}s virtual")
+        t0 += r["duration"]
+    raw.sort(key=lambda row: row[0])
+
+    def stamped(rows, col):
+        for t, row in rows:
+            row = list(row)
+            row[col] = datetime.fromtimestamp(t).isoformat()
+            yield row
+
+    os.makedirs(o.out_dir, exist_ok=True)
+    write_csv(os.path.join(o.out_dir, "logs_raw.csv"), RAW_HEADER,
+              ([f"{ts:.6f}", *row] for ts, *row in raw))
+    write_csv(os.path.join(o.out_dir, sender_covert.CSV_NAME), sender_covert.CSV_HEADER,
+              stamped(send, sender_covert.CSV_HEADER.index("timestamp")))
+    write_csv(os.path.join(o.out_dir, receiver_covert.CSV_NAME), receiver_covert.CSV_HEADER,
+              stamped(recv, receiver_covert.CSV_HEADER.index("timestamp")))
+    print(f"✔ {len(raw)} packets, {t0 - epoch:.0f}s of experiment time in "
+          f"{time.time() - t_wall:.1f}s → {o.out_dir}/")
+
+if __name__ == "__main__":
+    main()
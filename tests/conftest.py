@@ -0,0 +1,5 @@
+import os, sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for d in ("code/python-processor", "code", ""):
+    sys.path.insert(0, os.path.join(ROOT, d))
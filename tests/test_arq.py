@@ -0,0 +1,65 @@
+import random
+import pytest
+from covert.arq import (SendWindow, pack_sack, parse_sack, sack_bitmap,
+                        RTO_MAX)
+
+def test_sack_round_trip():
+    have = {0, 1, 2, 5, 7, 12}
+    sack = pack_sack(77, 3, sack_bitmap(have, 3, 2))
+    run, base, bitmap = parse_sack(sack)
+    assert (run, base) == (77, 3)
+    w = SendWindow(16)
+    w.due(0.0)
+    assert w.ack(base, bitmap, 0.1)
+    assert sorted(i for i in range(16) if w.acked[i]) == [0, 1, 2, 5, 7, 12]
+    assert w.base == 3
+    assert parse_sack(b"not a sack") is None
+
+@pytest.mark.parametrize("loss", [0.0, 0.2, 0.5])
+def test_lossy_transfer_delivers_everything(loss):
+    rnd, n, rtt = random.Random(int(loss * 10)), 300, 0.05
+    w, got, now = SendWindow(n, size=32, rto=0.2), set(), 0.0
+    acks = []                                      # (arrival time, base, bitmap)
+    for _ in range(100000):
+        if w.done():
+            break
+        for i in w.due(now):
+            if rnd.random() >= loss:
+                got.add(i)
+                base = next(j for j in range(n + 1) if j not in got)
+                if rnd.random() >= loss:
+                    acks.append((now + rtt, base, sack_bitmap(got, base, 8)))
+        ready = [a for a in acks if a[0] <= now]
+        acks  = [a for a in acks if a[0] > now]
+        for _, base, bitmap in ready:
+            w.ack(base, bitmap, now)
+        now += min([w.wait(now)] + [a[0] - now for a in acks]) + 1e-4
+    assert w.done() and got == set(range(n))
+    assert w.retx == w.sent - n and (w.retx > 0) == (loss > 0)
+
+def test_rto_backs_off_and_resets():
+    w = SendWindow(4, size=1, rto=0.2)
+    assert w.due(0.0) == [0]
+    rtos = []
+    t = 0.0
+    for _ in range(8):                             # return path dead
+        t += w.wait(t)
+        assert w.due(t) == [0]
+        rtos.append(w.rto)
+    assert rtos[:3] == [0.4, 0.8, 1.6] and max(rtos) == RTO_MAX
+    w.ack(1, b"", t + 0.01)                        # retransmitted: no sample (Karn)
+    assert w.rto == RTO_MAX
+    assert w.due(t + 0.01) == [1]
+    w.ack(2, b"", t + 0.06)                        # first try: resets from the sample
+    assert w.rto < 0.2
+
+def test_paced_retransmissions_back_off_once():
+    w = SendWindow(4, size=4, rto=0.2)
+    for i in range(4):
+        assert w.due(i * 0.01, 1) == [i]
+    t = 0.2
+    for i in range(4):                             # one timeout, paced one per call
+        t += w.wait(t)
+        assert w.due(t, 1) == [i]
+        t += 0.01
+    assert w.rto == 0.4
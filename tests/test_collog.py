@@ -0,0 +1,41 @@
+import os
+import numpy as np
+import collog, metrics
+from logwriter import ColumnarLogWriter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW  = os.path.join(ROOT, "tpphase3/initial_covert_channel/logs_raw.csv")
+
+def test_import_export_round_trip(tmp_path):
+    cols, out = str(tmp_path / "raw.cols"), str(tmp_path / "raw.csv")
+    n = collog.import_csv(RAW, cols)
+    assert collog.export_csv(cols, out) == n
+    with open(RAW) as a, open(out) as b:
+        assert a.read().splitlines() == b.read().splitlines()
+
+def test_metrics_read_columnar_like_csv(tmp_path):
+    cols = str(tmp_path / "raw.cols")
+    collog.import_csv(RAW, cols)
+    names, cm = metrics.confusion(RAW)
+    cnames, ccm = metrics.confusion(cols)
+    assert cnames == names and np.array_equal(cm, ccm)
+
+def test_writer_and_merge(tmp_path):
+    rows = [(1_000_000_000 * (i + 1) + i, 1, i % 2, 0, f"cfg{i % 3}", 0.01, "10.0.0.1", "", "UDP")
+            for i in range(100)]
+    parts = []
+    for k in range(2):
+        path = str(tmp_path / f"raw.{k}.cols")
+        w = ColumnarLogWriter(path, batch=7)
+        for r in rows[k::2]:
+            w.write(r)
+        w.close()
+        assert w.written == 50 and w.dropped == 0
+        parts.append(path)
+    merged = str(tmp_path / "raw.cols")
+    assert collog.merge(parts, merged) == 100
+    recs, meta = collog.load(merged)
+    assert recs["ts_ns"].tolist() == [r[0] for r in rows]
+    cfgs = meta["dicts"]["config"]
+    assert [cfgs[c] for c in recs["config"]] == [r[4] for r in rows]
+    assert collog.ip_str(recs["src"][0]) == "10.0.0.1" and recs["dst"][0] == 0
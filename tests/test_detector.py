@@ -0,0 +1,76 @@
+import math, zlib, random, struct
+from collections import deque, Counter
+import pytest
+import frame
+from detector import SlidingEntropyDetector
+from pipeline import Pipeline
+from covert.codec import build_opts
+
+class BaselineDetector:
+    """The detector as it was before the incremental rewrite (recomputes
+    the whole window per packet), fed option bytes and a clock instead of
+    scapy packets."""
+
+    def __init__(self, win_sec=2.0, thr_opts=0.01, thr_entropy=1.0, thr_comp=0.5):
+        self.win_sec, self.thr_opts = win_sec, thr_opts
+        self.thr_entropy, self.thr_comp = thr_entropy, thr_comp
+        self.win = deque()
+
+    def feed(self, opts: bytes, now: float) -> bool:
+        nop_cnt   = opts.count(0x01)
+        opt_bytes = b"" if nop_cnt == 0 else opts
+        self.win.append((now, nop_cnt, opt_bytes))
+        while self.win and now - self.win[0][0] > self.win_sec:
+            self.win.popleft()
+        n        = len(self.win)
+        pct_opts = sum(1 for _, c, _ in self.win if c > 0) / n
+        counts   = Counter(c for _, c, _ in self.win if c > 0)
+        total    = sum(counts.values())
+        ent      = -sum(k / total * math.log2(k / total) for k in counts.values()) if counts else 0.0
+        raw_len  = sum(len(o) for *_, o in self.win) or 1
+        comp     = sum(len(zlib.compress(o)) for *_, o in self.win) / raw_len
+        return pct_opts > self.thr_opts and ent > self.thr_entropy and comp > self.thr_comp
+
+def traffic(n=4000, seed=7):
+    """(time, option bytes): benign frames without options, covert bursts
+    of NOP symbols, the odd Router Alert option."""
+    rnd, t, out = random.Random(seed), 0.0, []
+    for i in range(n):
+        t += rnd.expovariate(50 if (i // 500) % 2 else 5)
+        r = rnd.random()
+        if (i // 500) % 2 and r < 0.7:
+            opts = build_opts(rnd.randint(1, 7), ts=rnd.random() < 0.5)
+        elif r < 0.05:
+            opts = b"\x94\x04\x00\x00"
+        else:
+            opts = b""
+        out.append((t, opts))
+    return out
+
+def eth_ipv4(opts: bytes) -> bytes:
+    ihl = 5 + len(opts) // 4
+    ip  = struct.pack("!BBHHHBBH4s4s", 0x40 | ihl, 0, ihl * 4 + 8, 0, 0, 64, 17, 0,
+                      b"\x0a\x01\x00\x02", b"\x0a\x00\x00\x02") + opts
+    return b"\x02" + bytes(5) + b"\x02" + bytes(5) + b"\x08\x00" + ip + struct.pack("!HHHH", 1, 2, 8, 0)
+
+GRID = [dict(win_sec=w, thr_opts=o, thr_entropy=e, thr_comp=c)
+        for w in (0.5, 2.0) for o in (0.01, 0.3) for e in (0.5, 1.0, 1.5) for c in (0.3, 0.5)]
+
+@pytest.mark.parametrize("params", GRID, ids=lambda p: "-".join(map(str, p.values())))
+def test_incremental_matches_baseline(params):
+    base, inc = BaselineDetector(**params), SlidingEntropyDetector(**params)
+    pipe = Pipeline("entropy", **params)
+    hits = 0
+    for t, opts in traffic():
+        want = base.feed(opts, t)
+        assert inc.feed_opts(opts, t) == want
+        data = eth_ipv4(opts)
+        assert pipe.feed_frame(frame.parse(memoryview(data)), data, t) == want
+        hits += want
+    assert 0 < hits                   # the grid point actually fires somewhere
+
+def test_max_len_caps_window():
+    det = SlidingEntropyDetector(win_sec=100.0, max_len=16)
+    for t, opts in traffic(200):
+        det.feed_opts(opts, t)
+        assert len(det) <= 16
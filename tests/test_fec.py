@@ -0,0 +1,66 @@
+import random
+import numpy as np
+import pytest
+from covert.fec import RSCode, ChannelFEC, parse_fec
+from covert.codec import merge_stripes
+
+@pytest.mark.parametrize("n,k,m", [(7, 3, 3), (15, 9, 4), (31, 21, 5), (255, 223, 8)])
+def test_rs_corrects_errors_and_erasures(n, k, m):
+    rnd  = random.Random(n)
+    code = RSCode(n, k, m)
+    data = np.array([rnd.randrange(1 << m) for _ in range(5 * k - 2)])
+    cw   = code.encode(data)
+    blocks, t = len(cw) // n, (n - k) // 2
+    # one block: t errors; another: n - k erasures
+    bad = cw.copy()
+    for j in rnd.sample(range(n), t):
+        bad[j * blocks] ^= 1 + rnd.randrange((1 << m) - 1)
+    era = [j * blocks + 1 for j in rnd.sample(range(n), n - k)]
+    bad[era] = 0
+    out, fixed, failed = code.decode(bad, era)
+    assert failed == 0 and fixed > 0
+    assert out[:len(data)].tolist() == data.tolist()
+
+def test_interleaving_spreads_a_burst():
+    code  = RSCode(15, 11, 4)                      # corrects 2 per block
+    data  = np.arange(11 * 8) % 16
+    cw    = code.encode(data)
+    blocks = len(cw) // 15
+    bad   = cw.copy()
+    bad[20:20 + 2 * blocks] ^= 5                   # burst of 2 symbols per codeword
+    out, _, failed = code.decode(bad)
+    assert failed == 0 and out.tolist() == data.tolist()
+
+def test_uncorrectable_block_is_reported():
+    code = RSCode(7, 5, 3)
+    data = np.arange(5) % 8
+    cw   = code.encode(data)
+    cw[:3] ^= 1                                    # 3 erasures > n - k
+    out, _, failed = code.decode(cw, [0, 1, 2])
+    assert failed == 1
+    assert out[3:].tolist() == data[3:].tolist()   # systematic: data as received
+
+@pytest.mark.parametrize("bits", [1, 2, 3, 4, 6, 8, 10])
+def test_channel_fec_round_trip(bits):
+    fec = parse_fec("rs:7:3" if 3 <= bits <= 8 else "rs:15:9", bits)
+    msg = b"covert channel test"
+    sym = fec.encode(msg)
+    erased = [0, len(sym) // 2]
+    sym = sym.copy()
+    sym[erased] = 0
+    out, _, failed = fec.decode(sym, erased)
+    assert failed == 0 and out[:len(msg)] == msg
+    assert fec.data_bits(len(msg)) == len(out) * 8
+
+def test_parse_fec():
+    assert parse_fec("none", 3) is None
+    assert str(parse_fec("rs:7:3", 3)) == "rs:7:3"
+    with pytest.raises(ValueError):
+        parse_fec("ldpc:7:3", 3)
+    with pytest.raises(ValueError):
+        ChannelFEC(9, 3, 3)                        # n > 2^3 - 1
+
+def test_merge_stripes_round_robin():
+    msg     = list(range(23))
+    stripes = [msg[k::3] for k in range(3)]
+    assert merge_stripes(stripes) == msg
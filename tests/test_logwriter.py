@@ -0,0 +1,24 @@
+import csv
+from logwriter import CsvLogWriter
+
+def rows(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))[1:]
+
+def test_flush_writes_everything_queued(tmp_path):
+    path = tmp_path / "raw.csv"
+    w = CsvLogWriter(str(path), ["a", "b"], batch=10**6, interval=60)
+    for i in range(1000):
+        w.write([i, i * 2])
+    assert w.flush(5)
+    assert len(rows(path)) == 1000
+    w.write([1000, 2000])
+    w.close()
+    assert len(rows(path)) == 1001 and w.dropped == 0
+
+def test_full_queue_counts_drops(tmp_path):
+    w = CsvLogWriter(str(tmp_path / "raw.csv"), ["a"], batch=10**6, interval=60, maxsize=10)
+    for i in range(10000):
+        w.write([i])
+    w.close()
+    assert w.written + w.dropped == 10000 and w.dropped > 0
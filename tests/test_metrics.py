@@ -0,0 +1,16 @@
+import os
+import pytest
+import pandas as pd
+import metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = ["tpphase3/initial_covert_channel", "tpphase3/revised_covert_channel_xor_scramble"]
+
+@pytest.mark.parametrize("run", RUNS)
+@pytest.mark.parametrize("chunksize", [metrics.CHUNK, 1000])
+def test_matches_committed_results(run, chunksize, tmp_path):
+    out = tmp_path / "results_by_config.csv"
+    metrics.main([os.path.join(ROOT, run, "logs_raw.csv"), "-o", str(out),
+                  "--chunksize", str(chunksize)])
+    want = pd.read_csv(os.path.join(ROOT, run, "results_by_config.csv"))
+    pd.testing.assert_frame_equal(pd.read_csv(out), want)
@@ -0,0 +1,35 @@
+import random
+import pytest
+from scheduler import DelayScheduler
+
+MEAN = 0.01
+
+def release_delays(preserve_order: bool, gap: float, n: int = 20000):
+    random.seed(1)
+    s = DelayScheduler(None, MEAN, preserve_order=preserve_order)
+    due = [s.release_time("outpktinsec", i * gap) for i in range(n)]
+    return s, due, [t - i * gap for i, t in enumerate(due)]
+
+def test_independent_delays_are_exponential():
+    stats = pytest.importorskip("scipy.stats")
+    s, _, d = release_delays(False, gap=MEAN / 10)
+    assert stats.kstest(d, "expon", args=(0, MEAN)).pvalue > 0.01
+    assert s.stats()["delay_applied_mean"] == pytest.approx(s.stats()["delay_sampled_mean"])
+
+def test_ordered_delays_report_sampled_and_applied():
+    stats = pytest.importorskip("scipy.stats")
+    s, due, d = release_delays(True, gap=MEAN / 10)
+    st = s.stats()
+    # the samples are still Exp(1/mean) ...
+    assert st["delay_sampled_mean"] == pytest.approx(MEAN, rel=0.05)
+    # ... but clamping to the running max stretches what is applied
+    assert st["delay_applied_mean"] == pytest.approx(sum(d) / len(d))
+    assert st["delay_applied_mean"] > 2 * MEAN
+    assert stats.kstest(d, "expon", args=(0, MEAN)).pvalue < 1e-6
+    assert due == sorted(due)
+
+def test_sparse_ordered_delays_stay_exponential():
+    # frames far apart never wait for each other
+    stats = pytest.importorskip("scipy.stats")
+    _, _, d = release_delays(True, gap=MEAN * 100)
+    assert stats.kstest(d, "expon", args=(0, MEAN)).pvalue > 0.01